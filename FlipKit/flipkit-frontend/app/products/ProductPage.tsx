@@ -2,6 +2,7 @@
 import React, { useEffect, useState, useMemo } from "react";
 import dynamic from "next/dynamic";
 import ProductCard from "./components/ProductCard";
+import { PRODUCTS_API_URL } from "./api";
 
 
 const Banner = dynamic(() => import("./components/Banner"), {
@@ -199,8 +200,8 @@ const ProductPage: React.FC = () => {
 
   useEffect(() => {
     const endpoint = selectedCategory === "all" 
-      ? "https://storer-1.onrender.com/products/"
-      : `https://storer-1.onrender.com/products/${selectedCategory}`;
+      ? `${PRODUCTS_API_URL}/products/`
+      : `${PRODUCTS_API_URL}/products/${selectedCategory}`;
     
     fetch(endpoint)
       .then((res) => res.json())
@@ -228,8 +229,8 @@ const ProductPage: React.FC = () => {
   const handleRefresh = () => {
     setIsRefreshing(true);
     const endpoint = selectedCategory === "all" 
-      ? "https://storer-1.onrender.com/products"
-      : `https://storer-1.onrender.com/products/${selectedCategory}`;
+      ? `${PRODUCTS_API_URL}/products`
+      : `${PRODUCTS_API_URL}/products/${selectedCategory}`;
     
     fetch(endpoint)
       .then((res) => res.json())
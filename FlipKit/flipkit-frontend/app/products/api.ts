@@ -0,0 +1,5 @@
+// Base URL of flipkit-service, which serves the product catalog and the image proxy.
+// Set NEXT_PUBLIC_PRODUCTS_API_URL to point the app at another deployment (e.g. http://localhost:8000).
+export const PRODUCTS_API_URL = (
+  process.env.NEXT_PUBLIC_PRODUCTS_API_URL ?? "https://storer-1.onrender.com"
+).replace(/\/+$/, "");
@@ -1,5 +1,6 @@
 "use client";
 import React from "react";
+import { PRODUCTS_API_URL } from "../api";
 
 type Product = {
   itemId: string;
@@ -16,6 +17,12 @@ type ProductCardProps = {
   product: Product;
 };
 
+// Resized copies served (and cached) by flipkit-service instead of full-size CDN originals
+const IMAGE_PROXY = `${PRODUCTS_API_URL}/image`;
+
+const thumbnail = (url: string, width: number) =>
+  `${IMAGE_PROXY}?url=${encodeURIComponent(url)}&w=${width}`;
+
 const ProductCard: React.FC<ProductCardProps> = ({ product }) => {
   const isPopular = product.viewCount && product.viewCount > 1000;
   const isNew =
@@ -122,7 +129,10 @@ const ProductCard: React.FC<ProductCardProps> = ({ product }) => {
           }}
         />
         <img
-          src={product.imageUrl}
+          src={thumbnail(product.imageUrl, 320)}
+          srcSet={`${thumbnail(product.imageUrl, 320)} 320w, ${thumbnail(product.imageUrl, 640)} 640w`}
+          sizes="300px"
+          loading="lazy"
           alt={product.title}
           style={{
             height: "100%",
@@ -133,7 +143,14 @@ const ProductCard: React.FC<ProductCardProps> = ({ product }) => {
             filter: "drop-shadow(0 8px 16px rgba(0, 0, 0, 0.3))",
           }}
           onError={(e) => {
-            e.currentTarget.src = "https://via.placeholder.com/300";
+            const img = e.currentTarget;
+            if (img.src.startsWith(IMAGE_PROXY)) {
+              // Proxy refused or failed: fall back to the original image
+              img.removeAttribute("srcset");
+              img.src = product.imageUrl;
+            } else {
+              img.src = "https://via.placeholder.com/300";
+            }
           }}
         />
       </div>
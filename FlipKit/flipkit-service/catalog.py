@@ -0,0 +1,317 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from pricing import parse_price
+
+# Map categories to their respective JSON files
+CATEGORY_FILES = {
+    "skincare": "./products/skincare_products.json",
+    "fashion": "./products/fashion_acc_products.json",
+    "fragrances": "./products/fragrances_products.json",
+    "pets": "./products/pets_products.json",
+    "necklace": "./products/necklace_products.json",
+}
+
+PRODUCTS_FILE = "./products/products.json"
+
+
+def _link(p: dict) -> str:
+    # StockX records carry `url` where eBay/DHgate use `link`
+    return (p.get("link") or p.get("url") or "").strip()
+
+
+def _image(p: dict) -> str:
+    # eBay records carry `image` where DHgate uses `img`
+    return p.get("img") or p.get("image") or ""
+
+
+def product_id(p: dict) -> str:
+    """
+    Stable id for a scraped product.
+
+    Derived from the product link with its query string and fragment dropped
+    (DHgate and eBay append per-session tracking parameters), or from the
+    record's content when there is no link.
+    """
+    link = _link(p)
+    if link:
+        parts = urlsplit(link)
+        key = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), "", ""))
+    else:
+        key = json.dumps([p.get("title"), _image(p), p.get("price")], ensure_ascii=False)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+class FirstSeenRegistry:
+    """
+    Persistent itemId -> first-seen timestamp map.
+
+    Lets `listingDate` report when a product first appeared in a catalog
+    rather than when it was last loaded. Stored as a small JSON file next to
+    the service and rewritten atomically only when new ids were stamped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._seen: Dict[str, str] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._seen = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                print(f"⚠️ Ignoring unreadable first-seen file: {path}")
+
+    def stamp(self, item_id: str) -> str:
+        with self._lock:
+            seen = self._seen.get(item_id)
+            if seen is None:
+                seen = self._seen[item_id] = datetime.now().isoformat()
+                self._dirty = True
+            return seen
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._seen, f)
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+
+def normalize_product(p: dict, item_id: Optional[str] = None, listing_date: Optional[str] = None) -> dict:
+    """Map a scraped product record onto the shape the frontend expects"""
+    price = parse_price(p.get("price"))
+    return {
+        "itemId": item_id or product_id(p),
+        "title": p.get("title", ""),
+        "imageUrl": _image(p),
+        "priceText": p.get("price", ""),
+        "priceMin": price.min if price else None,
+        "priceMax": price.max if price else None,
+        "currency": price.currency if price else None,
+        "shipping": "",  # Scraped data doesn't have this
+        "url": _link(p),
+        "viewCount": 0,  # Scraped data doesn't have this
+        "listingDate": listing_date or datetime.now().isoformat(),
+    }
+
+
+def normalize_records(records: Iterable[dict], registry: Optional[FirstSeenRegistry] = None) -> Iterator[dict]:
+    """Normalize scraped records, keeping ids unique within one catalog"""
+    used: Dict[str, int] = {}
+    for p in records:
+        item_id = product_id(p)
+        n = used.get(item_id, 0)
+        used[item_id] = n + 1
+        if n:
+            item_id = f"{item_id}-{n + 1}"  # Same product listed twice in one file
+        listing_date = registry.stamp(item_id) if registry else None
+        yield normalize_product(p, item_id, listing_date)
+    if registry:
+        registry.flush()
+
+
+def content_etag(products: List[dict]) -> str:
+    """Strong validator for one catalog version, derived from its content"""
+    digest = hashlib.sha1()
+    for p in products:
+        digest.update(json.dumps(p, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# Characters that can continue a JSON number
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+
+def iter_json_array(path: str, chunk_size: int = 1 << 16) -> Iterator:
+    """
+    Yield the elements of a top-level JSON array one at a time.
+
+    The file is read in `chunk_size` pieces and each element is decoded as soon
+    as it is complete, so memory stays bounded by the largest single element
+    rather than the whole file. Malformed arrays (missing or doubled commas,
+    a trailing comma, no closing bracket) raise ValueError.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as file:
+        buf = ""
+        pos = 0
+
+        def more() -> bool:
+            nonlocal buf, pos
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def peek() -> str:
+            """Next non-whitespace character, reading on as needed ('' at end of file)"""
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buf):
+                    return buf[pos]
+                if not more():
+                    return ""
+
+        if peek() != "[":
+            raise ValueError(f"Expected a JSON array in {path}")
+        pos += 1
+        if peek() == "]":
+            return
+        while True:
+            if peek() == "":
+                raise ValueError(f"Unexpected end of JSON array in {path}")
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if more():
+                        continue
+                    raise
+                # An element decoded up to the edge of the buffer, or a number followed by
+                # something that could still extend it ("12." / "1.5e"), may continue in the next chunk
+                at_edge = end == len(buf) or (type(item) in (int, float) and buf[end] in _NUMBER_CHARS)
+                if at_edge and more():
+                    continue
+                break
+            pos = end
+            yield item
+
+            separator = peek()
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' between array elements in {path}")
+            pos += 1
+            if peek() == "]":
+                raise ValueError(f"Trailing comma in JSON array in {path}")
+
+
+class JsonFileSource:
+    """A catalog backed by one JSON array file on disk"""
+
+    def __init__(self, path: str, registry: Optional[FirstSeenRegistry] = None):
+        self.path = path
+        self.registry = registry
+
+    def version(self) -> Tuple[int, int]:
+        """Cheap change token; raises FileNotFoundError if the file is gone"""
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def load(self) -> List[dict]:
+        with open(self.path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        return list(normalize_records(data, self.registry))
+
+    def iter_products(self) -> Iterator[dict]:
+        """Stream normalized products without loading the whole file"""
+        return normalize_records(iter_json_array(self.path), self.registry)
+
+
+class CatalogEntry:
+    """Normalized products for one category at one source version"""
+
+    def __init__(self, version, products: List[dict]):
+        self.version = version
+        self.products = products
+        self.loaded_at = datetime.now().isoformat()
+        self._derived = {}
+        self._derive_lock = threading.Lock()
+
+    def derive(self, name: str, build):
+        """Compute `build(products)` once for this version and memoize it under `name`"""
+        value = self._derived.get(name)
+        if value is None:
+            with self._derive_lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = self._derived[name] = build(self.products)
+        return value
+
+
+class CatalogCache:
+    """
+    In-memory cache of normalized product lists keyed by category.
+
+    Each lookup compares the source's version (mtime/size for JSON files) with
+    the cached entry and only reloads when it changed. Loads for a key are
+    serialized by a per-key lock so a burst of cold requests runs the loader
+    once while the others wait for its result.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key: str, source) -> CatalogEntry:
+        version = source.version()
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version:
+            self._count("hits")
+            return entry
+
+        self._count("misses")
+        with self._key_lock(key):
+            # Another request may have finished the reload while we waited.
+            version = source.version()
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                return entry
+            entry = CatalogEntry(version, source.load())
+            self._entries[key] = entry
+            self._count("loads")
+            return entry
+
+    def entries(self) -> Dict[str, CatalogEntry]:
+        with self._lock:
+            return dict(self._entries)
+
+    def invalidate(self, key: str = None) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": {
+                    key: {"count": len(entry.products), "loadedAt": entry.loaded_at}
+                    for key, entry in self._entries.items()
+                },
+            }
@@ -0,0 +1,343 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from catalog import CATEGORY_FILES, PRODUCTS_FILE, normalize_records
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.getenv("CATALOG_DB", os.path.join(BASE_DIR, "catalog.db"))
+
+# Category the main products.json is served under (GET /products)
+ALL_CATEGORY = "all"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    revision INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    item_id TEXT NOT NULL,
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    source_id INTEGER REFERENCES sources(id),
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    image_url TEXT NOT NULL DEFAULT '',
+    price_text TEXT NOT NULL DEFAULT '',
+    price_min REAL,
+    price_max REAL,
+    currency TEXT,
+    url TEXT NOT NULL DEFAULT '',
+    raw TEXT,
+    offers TEXT,
+    first_seen TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    UNIQUE (category_id, item_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_products_category ON products (category_id, position);
+-- Nothing reads by price or url; drop the indexes older stores were created with
+DROP INDEX IF EXISTS idx_products_price;
+DROP INDEX IF EXISTS idx_products_url;
+"""
+
+_PRODUCT_COLUMNS = (
+    "item_id, title, image_url, price_text, price_min, price_max, currency, url, first_seen, offers"
+)
+
+
+def _row_to_product(row) -> dict:
+    """Rows are stored in served shape; this only renames columns"""
+    product = {
+        "itemId": row[0],
+        "title": row[1],
+        "imageUrl": row[2],
+        "priceText": row[3],
+        "priceMin": row[4],
+        "priceMax": row[5],
+        "currency": row[6],
+        "shipping": "",
+        "url": row[7],
+        "viewCount": 0,
+        "listingDate": row[8],
+    }
+    if row[9]:
+        product["offers"] = json.loads(row[9])
+    return product
+
+
+class CatalogStore:
+    """
+    SQLite-backed product catalog.
+
+    Products are stored already normalized, one row per (category, itemId),
+    with indexes on category order, price and link. Each ingest bumps the
+    category's revision, which the API's catalog cache uses as its version.
+    The database runs in WAL mode so scrapers can write while the API reads.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(products)")}
+            if "offers" not in columns:  # Stores created before merged offers existed
+                conn.execute("ALTER TABLE products ADD COLUMN offers TEXT")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _id_for(self, conn, table: str, name: str) -> int:
+        conn.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,))
+        return conn.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()[0]
+
+    # -------------------------------
+    # Ingest
+    # -------------------------------
+    def upsert_products(self, category: str, records: Iterable[dict], source: Optional[str] = None,
+                        replace: bool = False, first_seen: Optional[Dict[str, str]] = None) -> int:
+        """
+        Normalize scraped records and upsert them in one transaction.
+
+        Existing products keep their first-seen time and position; new ones
+        are appended to the category. With `replace=True` the batch becomes
+        the whole category: its order is taken from the batch and products
+        missing from it are deleted. `first_seen` optionally seeds timestamps
+        for new ids (used by the JSON importer).
+        """
+        records = list(records)
+        return self.upsert_served(category, normalize_records(records), source=source, replace=replace,
+                                  first_seen=first_seen, raw=records)
+
+    def upsert_served(self, category: str, products: Iterable[dict], source: Optional[str] = None,
+                      replace: bool = False, first_seen: Optional[Dict[str, str]] = None,
+                      raw: Optional[List[dict]] = None, delete: Iterable[str] = (),
+                      positions: Optional[List[int]] = None) -> int:
+        """
+        Upsert products that are already in served shape, and delete the
+        `delete` item ids, in one transaction. This is the ingest pipeline's
+        sink; `raw` optionally keeps the scraped record behind each product.
+        `positions` places each row (existing ones included), for a replace
+        written over several batches; `replace` places rows in batch order.
+        """
+        now = datetime.now().isoformat()
+        conn = self._connect()
+        with conn:
+            category_id = self._id_for(conn, "categories", category)
+            source_id = self._id_for(conn, "sources", source) if source else None
+            base = conn.execute(
+                "SELECT COALESCE(MAX(position), -1) + 1 FROM products WHERE category_id = ?",
+                (category_id,),
+            ).fetchone()[0]
+
+            moved = replace or positions is not None
+            rows = []
+            seen_ids = []
+            for i, product in enumerate(products):
+                item_id = product["itemId"]
+                seen_ids.append(item_id)
+                offers = product.get("offers")
+                if positions is not None:
+                    position = positions[i]
+                else:
+                    position = i if replace else base + i
+                rows.append((
+                    item_id, category_id, source_id, position,
+                    product["title"] or "", product["imageUrl"] or "", product["priceText"] or "",
+                    product["priceMin"], product["priceMax"], product["currency"], product["url"],
+                    json.dumps(raw[i], ensure_ascii=False) if raw is not None else None,
+                    json.dumps(offers, ensure_ascii=False) if offers else None,
+                    (first_seen or {}).get(item_id, now), now,
+                ))
+
+            conn.executemany(
+                "DELETE FROM products WHERE category_id = ? AND item_id = ?",
+                [(category_id, item_id) for item_id in delete],
+            )
+            conn.executemany(
+                f"""
+                INSERT INTO products (
+                    item_id, category_id, source_id, position, title, image_url, price_text,
+                    price_min, price_max, currency, url, raw, offers, first_seen, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (category_id, item_id) DO UPDATE SET
+                    source_id = COALESCE(excluded.source_id, products.source_id),
+                    position = {"excluded.position" if moved else "products.position"},
+                    title = excluded.title,
+                    image_url = excluded.image_url,
+                    price_text = excluded.price_text,
+                    price_min = excluded.price_min,
+                    price_max = excluded.price_max,
+                    currency = excluded.currency,
+                    url = excluded.url,
+                    raw = COALESCE(excluded.raw, products.raw),
+                    offers = excluded.offers,
+                    updated_at = excluded.updated_at
+                """,
+                rows,
+            )
+
+            if replace:
+                keep = set(seen_ids)
+                stale = [
+                    (category_id, item_id)
+                    for (item_id,) in conn.execute("SELECT item_id FROM products WHERE category_id = ?", (category_id,))
+                    if item_id not in keep
+                ]
+                conn.executemany("DELETE FROM products WHERE category_id = ? AND item_id = ?", stale)
+
+            conn.execute(
+                "UPDATE categories SET revision = revision + 1, updated_at = ? WHERE id = ?",
+                (now, category_id),
+            )
+        return len(rows)
+
+    def retain(self, category: str, keep: Iterable[str]) -> int:
+        """Delete the category's products whose item id isn't in `keep`"""
+        keep = set(keep)
+        conn = self._connect()
+        with conn:
+            category_id = self._id_for(conn, "categories", category)
+            stale = [
+                (category_id, item_id)
+                for (item_id,) in conn.execute("SELECT item_id FROM products WHERE category_id = ?", (category_id,))
+                if item_id not in keep
+            ]
+            conn.executemany("DELETE FROM products WHERE category_id = ? AND item_id = ?", stale)
+            if stale:
+                conn.execute(
+                    "UPDATE categories SET revision = revision + 1, updated_at = ? WHERE id = ?",
+                    (datetime.now().isoformat(), category_id),
+                )
+        return len(stale)
+
+    # -------------------------------
+    # Queries
+    # -------------------------------
+    def categories(self) -> List[str]:
+        return [name for (name,) in self._connect().execute("SELECT name FROM categories ORDER BY name")]
+
+    def revision(self, category: str) -> Optional[int]:
+        row = self._connect().execute("SELECT revision FROM categories WHERE name = ?", (category,)).fetchone()
+        return row[0] if row else None
+
+    def iter_category(self, category: str, batch_size: int = 500) -> Iterator[dict]:
+        """
+        Products of `category` in catalog order, fetched in batches from a cursor.
+
+        Uses its own connection because a streaming response may resume the
+        generator on a different worker thread.
+        """
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        try:
+            cursor = conn.execute(
+                f"""
+                SELECT {_PRODUCT_COLUMNS} FROM products
+                WHERE category_id = (SELECT id FROM categories WHERE name = ?)
+                ORDER BY position
+                """,
+                (category,),
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield _row_to_product(row)
+        finally:
+            conn.close()
+
+
+class StoreCategorySource:
+    """Catalog source reading one category from a CatalogStore"""
+
+    def __init__(self, store: CatalogStore, category: str):
+        self.store = store
+        self.category = category
+
+    def version(self):
+        revision = self.store.revision(self.category)
+        if revision is None:
+            raise FileNotFoundError(f"Category not in catalog store: {self.category}")
+        return revision
+
+    def load(self) -> List[dict]:
+        return list(self.store.iter_category(self.category))
+
+    def iter_products(self) -> Iterator[dict]:
+        return self.store.iter_category(self.category)
+
+
+def ingest(category: str, records: Iterable[dict], source: str, db_path: str = DEFAULT_DB,
+           replace: bool = False) -> int:
+    """
+    Normalize, validate and dedupe scraped records into the catalog store;
+    the entry point for synchronous scrapers. Runs the ingest pipeline's
+    stages in-line; code running an event loop feeds an IngestPipeline.
+    Does nothing when the store hasn't been created with `import`.
+    """
+    from ingest_pipeline import ingest_records  # The pipeline builds on this module
+
+    if not os.path.exists(db_path):
+        print(f"⚠️ No catalog store at {db_path}; skipping {source} ingest into '{category}'")
+        return 0
+    count = ingest_records(category, records, source, db_path=db_path, replace=replace)
+    print(f"🗄️ Ingested {count} {source} products into '{category}' ({db_path})")
+    return count
+
+
+def import_json_catalog(db_path: str = DEFAULT_DB, first_seen_path: Optional[str] = None) -> None:
+    """One-shot import of the flat JSON catalogs into the store, streamed through the ingest pipeline"""
+    from ingest_pipeline import import_file
+    first_seen = {}
+    if first_seen_path and os.path.exists(first_seen_path):
+        with open(first_seen_path, "r", encoding="utf-8") as f:
+            first_seen = json.load(f)
+
+    files = dict(CATEGORY_FILES)
+    files[ALL_CATEGORY] = PRODUCTS_FILE
+    for category, file_path in files.items():
+        full_path = os.path.join(BASE_DIR, file_path)
+        if not os.path.exists(full_path):
+            print(f"⚠️ Skipping {category}: {full_path} not found")
+            continue
+        stats = asyncio.run(import_file(category, full_path, db_path=db_path, first_seen=first_seen))
+        dropped = stats["stages"]["validate"]["dropped"]
+        print(f"✅ Imported {stats['dedupe']['products']} products into '{category}' as "
+              f"{stats['dedupe']['merged']} rows ({dropped or 'none'} dropped, {stats['wallSeconds']}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FlipKit catalog store")
+    parser.add_argument("command", choices=["import"], help="import: load ./products/*.json into the store")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--first-seen", default=os.path.join(BASE_DIR, "first_seen.json"))
+    args = parser.parse_args()
+    import_json_catalog(args.db, args.first_seen)
@@ -0,0 +1,407 @@
+import argparse
+import json
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from array import array
+from functools import lru_cache
+from random import Random
+from typing import Dict, Iterable, List, Set
+from urllib.parse import urlsplit, urlunsplit
+
+# Titles whose word sets overlap at least this much (Jaccard) are the same product
+NEAR_DUP_THRESHOLD = float(os.getenv("DEDUPE_THRESHOLD", "0.8"))
+
+# Sellers stuff the same keywords into different items' titles, so a near-identical
+# title also needs the same image or minimum prices within this fraction of each other
+PRICE_TOLERANCE = float(os.getenv("DEDUPE_PRICE_TOLERANCE", "0.25"))
+
+# MinHash signature = BANDS * ROWS values. Two titles become candidates when
+# any band matches, which for 10x3 catches ~99.9% of pairs at 0.8 similarity
+# and about a quarter at 0.3; candidates are then checked exactly.
+BANDS = 10
+ROWS = 3
+
+# Titles shorter than this are too generic ("Nike Shoes") to match on fuzzily
+MIN_TOKENS = 3
+
+# Items remembered per LSH bucket. A bucket this full holds one very common
+# title shape whose members are already merged, so later items only need a
+# few of them to find their cluster; this keeps the worst case linear.
+BUCKET_CAP = 32
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_EBAY_ITEM_RE = re.compile(r"^/itm/(?:[^/]+/)?(\d+)$")
+_MERSENNE = (1 << 61) - 1
+
+_rng = Random(0x5EED)  # Fixed seed: signatures must agree between runs
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(BANDS * ROWS)]
+
+# Marketplaces offers are attributed to, by host
+SOURCE_HOSTS = {
+    "ebay": "ebay",
+    "dhgate": "dhgate",
+    "stockx": "stockx",
+}
+
+
+def canonical_product_url(url: str) -> str:
+    """
+    One spelling per product page: https, no www./m. prefix, no query,
+    fragment or trailing slash, and eBay's `/itm/<slug>/<id>` reduced to
+    `/itm/<id>`. Query strings are dropped because every marketplace here
+    uses them only for tracking.
+    """
+    url = (url or "").strip()
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    path = parts.path.rstrip("/")
+    match = _EBAY_ITEM_RE.match(path) if "ebay." in host else None
+    if match:
+        path = f"/itm/{match.group(1)}"
+    return urlunsplit(("https", host, path, "", ""))
+
+
+def offer_source(url: str) -> str:
+    host = urlsplit(url or "").netloc.lower()
+    for needle, source in SOURCE_HOSTS.items():
+        if needle in host:
+            return source
+    return host or "unknown"
+
+
+def title_tokens(title: str) -> Set[str]:
+    text = unicodedata.normalize("NFKD", title or "").encode("ascii", "ignore").decode().lower()
+    return set(_TOKEN_RE.findall(text))
+
+
+@lru_cache(maxsize=1 << 17)
+def _token_hashes(token: str) -> array:
+    # Vocabulary repeats heavily across titles, so each token is permuted once
+    h = zlib.crc32(token.encode("utf-8"))
+    return array("I", (((a * h + b) % _MERSENNE) & 0xFFFFFFFF for a, b in _PERMUTATIONS))
+
+
+def minhash(tokens: Iterable[str]) -> List[int]:
+    """MinHash signature of a token set (empty list for no tokens)"""
+    vectors = [_token_hashes(t) for t in tokens]
+    if not vectors:
+        return []
+    if len(vectors) == 1:
+        return list(vectors[0])
+    return list(map(min, *vectors))
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    inter = len(a & b)
+    return inter / (len(a) + len(b) - inter)
+
+
+class ProductDeduper:
+    """
+    Groups normalized products that describe the same item.
+
+    Products are added one at a time. Two products are merged when they
+    share a canonical URL, share a title and image exactly, or have titles
+    whose word sets are near-identical and either the same image or a
+    similar minimum price (see PRICE_TOLERANCE). Near-duplicates are found with
+    MinHash/LSH: each title is bucketed by BANDS signature bands and only
+    products sharing a bucket are compared, so adding a product costs a
+    bounded number of comparisons regardless of catalog size. Clusters are
+    kept in a union-find and turned into merged records by `merged()`.
+
+    Already-merged records can be added too (e.g. rows read back from the
+    catalog store): every URL under their `offers` is matched, so a later
+    listing of any of those offers joins the same cluster.
+    """
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, fuzzy: bool = True,
+                 price_tolerance: float = PRICE_TOLERANCE):
+        self.threshold = threshold
+        self.fuzzy = fuzzy
+        self.price_tolerance = price_tolerance
+        self.products: List[dict] = []
+        self._parent: List[int] = []
+        self._members: Dict[int, List[int]] = {}
+        self._absorbed: List[int] = []
+        self._tokens: List[Set[str]] = []
+        self._images: List[str] = []
+        self._exact: Dict[tuple, int] = {}
+        self._buckets: Dict[int, List[int]] = {}
+        self.exact_matches = 0
+        self.near_matches = 0
+        self.comparisons = 0
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def root(self, i: int) -> int:
+        parent = self._parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def _union(self, i: int, j: int) -> bool:
+        ri, rj = self.root(i), self.root(j)
+        if ri == rj:
+            return False
+        # The earlier product stays the root, so a cluster keeps its first itemId
+        if rj < ri:
+            ri, rj = rj, ri
+        self._parent[rj] = ri
+        self._members[ri].extend(self._members.pop(rj))
+        self._absorbed.append(rj)
+        return True
+
+    def add(self, product: dict) -> int:
+        """Add one normalized product; returns its index"""
+        i = len(self.products)
+        self.products.append(product)
+        self._parent.append(i)
+        self._members[i] = [i]
+        tokens = title_tokens(product.get("title"))
+        self._tokens.append(tokens)
+
+        urls = {canonical_product_url(o.get("url")) for o in product.get("offers") or ()}
+        urls.add(canonical_product_url(product.get("url")))
+        keys = [("url", url) for url in sorted(urls) if url]
+        title = " ".join(sorted(tokens))
+        image = canonical_product_url(product.get("imageUrl"))
+        self._images.append(image)
+        if title and image:
+            keys.append(("title+image", title, image))
+        for key in keys:
+            j = self._exact.setdefault(key, i)
+            if j != i and self._union(i, j):
+                self.exact_matches += 1
+
+        if self.fuzzy and len(tokens) >= MIN_TOKENS:
+            self._match_near(i, tokens)
+        return i
+
+    def _match_near(self, i: int, tokens: Set[str]) -> None:
+        signature = minhash(tokens)
+        checked = set()
+        for band in range(BANDS):
+            key = hash((band, *signature[band * ROWS:(band + 1) * ROWS]))
+            bucket = self._buckets.setdefault(key, [])
+            for j in bucket:
+                if j in checked:
+                    continue
+                checked.add(j)
+                if self.root(i) == self.root(j):
+                    continue
+                self.comparisons += 1
+                if (jaccard(tokens, self._tokens[j]) >= self.threshold and self._corroborated(i, j)
+                        and self._union(i, j)):
+                    self.near_matches += 1
+            if len(bucket) < BUCKET_CAP:
+                bucket.append(i)
+
+    def _corroborated(self, i: int, j: int) -> bool:
+        """Whether two near-identical titles also agree on image or price"""
+        if self._images[i] and self._images[i] == self._images[j]:
+            return True
+        a, b = self.products[i].get("priceMin"), self.products[j].get("priceMin")
+        if a is None or b is None:
+            return False
+        return abs(a - b) <= self.price_tolerance * max(a, b)
+
+    def members(self, i: int) -> List[dict]:
+        """Products in the cluster `i` belongs to, in the order they were added"""
+        return [self.products[j] for j in sorted(self._members[self.root(i)])]
+
+    def pop_absorbed(self) -> List[int]:
+        """Former cluster roots merged into another cluster since the last call"""
+        absorbed, self._absorbed = self._absorbed, []
+        return absorbed
+
+    def clusters(self) -> List[List[int]]:
+        """Member indices per cluster, clusters in order of their first product"""
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(self.products)):
+            groups.setdefault(self.root(i), []).append(i)
+        return list(groups.values())
+
+    def merged(self) -> List[dict]:
+        return [merge_cluster([self.products[i] for i in members]) for members in self.clusters()]
+
+    def stats(self) -> dict:
+        clusters = len({self.root(i) for i in range(len(self.products))})
+        return {
+            "products": len(self.products),
+            "merged": clusters,
+            "removed": len(self.products) - clusters,
+            "exactMatches": self.exact_matches,
+            "nearMatches": self.near_matches,
+            "comparisons": self.comparisons,
+        }
+
+
+def _offer(p: dict) -> dict:
+    return {
+        "source": offer_source(p.get("url")),
+        "itemId": p.get("itemId"),
+        "url": p.get("url", ""),
+        "priceText": p.get("priceText", ""),
+        "priceMin": p.get("priceMin"),
+        "priceMax": p.get("priceMax"),
+        "currency": p.get("currency"),
+    }
+
+
+class MergedRecord:
+    """
+    A cluster's served record, kept up to date as members join.
+
+    `add` folds one more product in, touching only that product's offers,
+    so a cluster growing one listing at a time is never re-merged from
+    scratch; `row()` builds the dict to serve (see `merge_cluster`). One
+    thread may add while another reads rows.
+    """
+
+    def __init__(self, members: Iterable[dict] = ()):
+        self.first = None
+        self.offers: Dict[str, dict] = {}
+        self.best = None  # Key of the cheapest priced offer
+        self.display = None  # Longest-titled member with an image
+        self.fallback = None  # Longest-titled member, for clusters without images
+        self.listing_date = None
+        self._lock = threading.Lock()
+        for p in members:
+            self.add(p)
+
+    @property
+    def item_id(self) -> str:
+        return self.first["itemId"]
+
+    def add(self, product: dict) -> None:
+        with self._lock:
+            if self.first is None:
+                self.first = product
+            relisted = False
+            for offer in product.get("offers") or [_offer(product)]:
+                key = canonical_product_url(offer.get("url")) or offer.get("itemId")
+                relisted = relisted or key in self.offers
+                self.offers[key] = offer
+                price = offer.get("priceMin")
+                if relisted or price is None:
+                    continue
+                if self.best is None or price < self.offers[self.best]["priceMin"]:
+                    self.best = key
+            if relisted:
+                # A repriced copy of a known listing can dethrone the cheapest offer
+                priced = [(o["priceMin"], n, k) for n, (k, o) in enumerate(self.offers.items())
+                          if o.get("priceMin") is not None]
+                self.best = min(priced)[2] if priced else None
+
+            length = len(product.get("title") or "")
+            if product.get("imageUrl") and (self.display is None or length > len(self.display.get("title") or "")):
+                self.display = product
+            if self.fallback is None or length > len(self.fallback.get("title") or ""):
+                self.fallback = product
+            date = product.get("listingDate")
+            if date and (self.listing_date is None or date < self.listing_date):
+                self.listing_date = date
+
+    def row(self) -> dict:
+        with self._lock:
+            offers = list(self.offers.values())
+            display = self.display or self.fallback
+            best = self.offers[self.best] if self.best is not None else offers[0]
+            merged = dict(self.first)
+            merged.update({
+                "title": display.get("title", ""),
+                "imageUrl": display.get("imageUrl", ""),
+                "priceText": best.get("priceText", ""),
+                "priceMin": best.get("priceMin"),
+                "priceMax": best.get("priceMax"),
+                "currency": best.get("currency"),
+                "url": best.get("url", ""),
+                "listingDate": self.listing_date or self.first.get("listingDate"),
+                "offers": offers,
+            })
+            return merged
+
+
+def merge_cluster(members: List[dict]) -> dict:
+    """
+    One served record for a cluster of duplicates.
+
+    Keeps the first member's itemId and earliest listingDate, the longest
+    title that comes with an image, and the price and link of the cheapest
+    offer. Every distinct listing is kept under `offers`; when a listing
+    appears twice, the later copy's price wins.
+    """
+    return MergedRecord(members).row()
+
+
+def merge_products(products: Iterable[dict], threshold: float = NEAR_DUP_THRESHOLD) -> List[dict]:
+    """Collapse duplicate normalized products into merged records, in catalog order"""
+    deduper = ProductDeduper(threshold)
+    for p in products:
+        deduper.add(p)
+    return deduper.merged()
+
+
+class MergedSource:
+    """
+    Catalog source that serves one or more sources with duplicates merged.
+
+    Wraps JsonFileSource/StoreCategorySource; its version changes whenever
+    any wrapped source changes, so the catalog cache re-merges on reload.
+    A cluster isn't complete until every product has been read, so there is
+    no `iter_products`: serve merged rows from the catalog cache.
+    """
+
+    def __init__(self, *sources, threshold: float = NEAR_DUP_THRESHOLD):
+        self.sources = sources
+        self.threshold = threshold
+
+    def version(self):
+        return tuple(source.version() for source in self.sources)
+
+    def load(self) -> List[dict]:
+        return merge_products(self._iter_all(), self.threshold)
+
+    def _iter_all(self) -> Iterable[dict]:
+        for source in self.sources:
+            yield from source.iter_products()
+
+
+if __name__ == "__main__":
+    from catalog import CATEGORY_FILES, PRODUCTS_FILE, iter_json_array, normalize_records
+
+    arg_parser = argparse.ArgumentParser(description="Report duplicate products across the JSON catalogs")
+    arg_parser.add_argument("files", nargs="*", help="JSON array files (default: every catalog in ./products)")
+    arg_parser.add_argument("--threshold", type=float, default=NEAR_DUP_THRESHOLD)
+    arg_parser.add_argument("--show", type=int, default=10, help="Largest merged clusters to print")
+    args = arg_parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    files = args.files or [os.path.join(base_dir, p) for p in [*CATEGORY_FILES.values(), PRODUCTS_FILE]]
+    deduper = ProductDeduper(args.threshold)
+    for path in files:
+        if not os.path.exists(path):
+            print(f"⚠️ Skipping {path}: not found")
+            continue
+        for product in normalize_records(iter_json_array(path)):
+            deduper.add(product)
+
+    print(json.dumps(deduper.stats(), indent=2))
+    clusters = sorted((c for c in deduper.clusters() if len(c) > 1), key=len, reverse=True)
+    for members in clusters[:args.show]:
+        print(f"\n🔗 {len(members)} listings:")
+        for i in members:
+            p = deduper.products[i]
+            print(f"   [{offer_source(p['url'])}] {p['title'][:80]} — {p['priceText']}")
@@ -1,15 +1,271 @@
+import argparse
 import json
 import asyncio
+import os
+from typing import Optional
+from urllib.parse import urlsplit
 from playwright.async_api import async_playwright #type: ignore
 import sys
-import msvcrt
 import threading
 
-products = []
+try:
+    import msvcrt  # Windows-only; manual mode reads plain stdin lines elsewhere
+except ImportError:
+    msvcrt = None
+
+# Shared service modules live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from catalog import iter_json_array  # noqa: E402
+from ingest_pipeline import IngestPipeline, finish_pipeline, scraper_pipeline  # noqa: E402
+from request_filter import DEFAULT_DENY, default_filter  # noqa: E402
+
+# Catalog store category to also ingest into, e.g. "all" (what the API serves
+# DHgate's products.json as). Unset: listings only go to products.json.
+CATALOG_CATEGORY = os.getenv("DHGATE_CATEGORY") or None
+
+PRODUCTS_FILE = "products.json"
+START_URL = "https://www.dhgate.com"
+
+# Lazy-loaded cards are re-checked on this many drains before counting as incomplete
+MAX_ATTEMPTS = 5
+
 main_loop = None
 
+# Installs window.__flipkit in the page: a MutationObserver queues product links as
+# they're added, and drain() extracts only those, skipping links already seen.
+# Links are keyed by scheme, host and path so tracking query strings don't create duplicates.
+INCREMENTAL_JS = """(seedKeys) => {
+    if (window.__flipkit) return window.__flipkit.pending.size;
+    const LINK = 'a[href*="/product/"]';
+    const seen = new Set(seedKeys);
+    const pending = new Map();  // anchor -> drains attempted
+    let incomplete = 0;
+
+    const keyOf = (a) => a.protocol + '//' + a.host + a.pathname;
+    const queue = (node) => {
+        if (node.nodeType !== 1) return;
+        if (node.matches(LINK) && !pending.has(node)) pending.set(node, 0);
+        node.querySelectorAll(LINK).forEach(a => { if (!pending.has(a)) pending.set(a, 0); });
+    };
+    new MutationObserver(records => {
+        for (const r of records) r.addedNodes.forEach(queue);
+    }).observe(document.documentElement, {childList: true, subtree: true});
+    queue(document.documentElement);
+
+    // The listing card is the largest ancestor that holds no other product's link.
+    // Containers found to hold several products (the grid) are remembered, so each
+    // is scanned once rather than once per listing.
+    const shared = new WeakSet();
+    const cardOf = (a) => {
+        const key = keyOf(a);
+        let el = a;
+        for (let depth = 0; depth < 8 && el.parentElement; depth++) {
+            const parent = el.parentElement;
+            if (shared.has(parent)) break;
+            let other = false;
+            for (const o of parent.querySelectorAll(LINK)) {
+                if (keyOf(o) !== key) { other = true; break; }
+            }
+            if (other) { shared.add(parent); break; }
+            el = parent;
+        }
+        return el;
+    };
+    const firstText = (root, selectors) => {
+        for (const sel of selectors) {
+            const el = root.querySelector(sel);
+            const text = el && ((el.innerText || '').trim() || el.getAttribute('title') || '');
+            if (text) return text;
+        }
+        return '';
+    };
+    const imageOf = (root) => {
+        const img = root.querySelector('img');
+        if (!img) return '';
+        const src = img.currentSrc || img.getAttribute('src') || '';
+        const real = src && !src.startsWith('data:') ? img.src : '';
+        return real || img.getAttribute('data-src') || img.getAttribute('data-lazy') || '';
+    };
+    const extract = (a) => {
+        const item = cardOf(a);
+        return {
+            title: firstText(item, ['[class*="title"]', 'h3', 'h2', 'a[title]', '.product-name'])
+                || a.getAttribute('title') || '',
+            img: imageOf(item),
+            price: firstText(item, ['[class*="price"]', '.cost', '[class*="amount"]']),
+            link: a.href || '',
+        };
+    };
+
+    const drain = (maxAttempts) => {
+        const items = [];
+        for (const [a, attempts] of pending) {
+            const key = keyOf(a);
+            if (!a.isConnected || seen.has(key)) { pending.delete(a); continue; }
+            const p = extract(a);
+            if (p.title && p.img && p.price && p.link) {
+                seen.add(key);
+                items.push(p);
+                pending.delete(a);
+            } else if (attempts + 1 >= maxAttempts) {
+                pending.delete(a);
+                incomplete++;
+            } else {
+                pending.set(a, attempts + 1);
+            }
+        }
+        const dropped = incomplete;
+        incomplete = 0;
+        return {items, incomplete: dropped, pending: pending.size};
+    };
+
+    window.__flipkit = {seen, pending, drain};
+    return pending.size;
+}"""
+
+
+def link_key(link: str) -> str:
+    """Same key the page uses: scheme://host/path, query and fragment dropped"""
+    parts = urlsplit(link)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}"
+
+
+def load_saved_keys(path: str = PRODUCTS_FILE) -> set:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return set()
+    try:
+        return {link_key(p["link"]) for p in iter_json_array(path) if isinstance(p, dict) and p.get("link")}
+    except ValueError as e:
+        print(f"⚠️ Could not read {path}: {e}")
+        return set()
 
+
+def append_json_array(path: str, records: list) -> None:
+    """Append to a top-level JSON array file in place, without rewriting what's already there"""
+    if not records:
+        return
+    body = ",\n".join(
+        "  " + json.dumps(r, indent=2, ensure_ascii=False).replace("\n", "\n  ") for r in records
+    ).encode("utf-8")
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        with open(path, "wb") as f:
+            f.write(b"[\n" + body + b"\n]")
+            f.flush()
+            os.fsync(f.fileno())
+        return
+    with open(path, "r+b") as f:
+        # Walk back over trailing whitespace to the closing bracket, then to the last element
+        pos = f.seek(0, os.SEEK_END)
+        close = None
+        while pos > 0:
+            pos -= 1
+            f.seek(pos)
+            ch = f.read(1)
+            if ch.isspace():
+                continue
+            if close is None and ch == b"]":
+                close = pos
+                continue
+            break
+        if close is None:
+            raise ValueError(f"{path} is not a JSON array")
+        empty = ch == b"["
+        f.seek(pos + 1)
+        f.truncate()
+        f.write((b"\n" if empty else b",\n") + body + b"\n]")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class IncrementalExtractor:
+    """Pulls newly added listings out of a page and appends them to products.json (and `pipeline`, if given)"""
+
+    def __init__(self, path: str = PRODUCTS_FILE, pipeline: Optional[IngestPipeline] = None):
+        self.path = path
+        self.pipeline = pipeline
+        self.saved_keys = load_saved_keys(path)
+        self.saved = 0
+
+    async def drain(self, page) -> list:
+        result = await page.evaluate("(n) => window.__flipkit ? window.__flipkit.drain(n) : null", MAX_ATTEMPTS)
+        if result is None:
+            # First drain on this document (new page or the user navigated): seed it with what's saved
+            await page.evaluate(INCREMENTAL_JS, sorted(self.saved_keys))
+            result = await page.evaluate("(n) => window.__flipkit.drain(n)", MAX_ATTEMPTS)
+        fresh = [p for p in result["items"] if link_key(p["link"]) not in self.saved_keys]
+        if fresh:
+            await asyncio.to_thread(append_json_array, self.path, fresh)  # Writes and fsyncs
+            if self.pipeline is not None:
+                await self.pipeline.put_many(fresh)
+            self.saved_keys.update(link_key(p["link"]) for p in fresh)
+            self.saved += len(fresh)
+        if result["incomplete"]:
+            print(f"⚠️  Skipped {result['incomplete']} incomplete items (missing title/image/price/link)")
+        return fresh
+
+
+# -------------------------------
+# Headless crawl
+# -------------------------------
+async def crawl(url: str, max_items: int = 500, max_scrolls: int = 200, idle_rounds: int = 4,
+                scroll_pause: int = 1200, headless: bool = True, path: str = PRODUCTS_FILE,
+                category: Optional[str] = CATALOG_CATEGORY) -> int:
+    """
+    Auto-scroll `url` headlessly, appending listings as they load.
+
+    Stops after `max_items` new products, `max_scrolls` scrolls, or
+    `idle_rounds` scrolls in a row that neither add listings nor grow the
+    page. Works on file:// URLs, e.g. the fixture in dhgate/fixtures.
+    """
+    pipeline = scraper_pipeline(category, "dhgate")
+    if pipeline is not None:
+        await pipeline.start()
+    extractor = IncrementalExtractor(path, pipeline)
+    # Images are only read as URLs, so media, fonts and trackers can be skipped
+    request_filter = default_filter(block_types=("media", "font"), deny=DEFAULT_DENY)
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        try:
+            context = await browser.new_context(viewport={"width": 1366, "height": 900})
+            if request_filter is not None:
+                await request_filter.install(context)
+            page = await context.new_page()
+            print(f"🌐 Opening {url}")
+            await page.goto(url, wait_until="domcontentloaded")
+
+            idle = 0
+            last_height = 0
+            for scroll in range(max_scrolls):
+                fresh = await extractor.drain(page)
+                if fresh:
+                    print(f"💾 +{len(fresh)} items (total this run: {extractor.saved})")
+                if extractor.saved >= max_items:
+                    break
+                height = await page.evaluate("document.documentElement.scrollHeight")
+                idle = 0 if fresh or height > last_height else idle + 1
+                last_height = height
+                if idle >= idle_rounds:
+                    print("🏁 No new listings after scrolling; done")
+                    break
+                await page.evaluate("window.scrollBy(0, Math.round(window.innerHeight * 0.9))")
+                await page.wait_for_timeout(scroll_pause)
+            await extractor.drain(page)
+        finally:
+            await browser.close()
+            await finish_pipeline(pipeline)
+    print(f"✅ Crawl finished: {extractor.saved} new products appended to {path}")
+    return extractor.saved
+
+
+# -------------------------------
+# Manual mode
+# -------------------------------
 def read_keypress(callback):
+    if msvcrt is None:
+        # No raw key reads off Windows: take one command per line
+        for line in sys.stdin:
+            callback(line.strip()[:1] or "\n")
+        return
     while True:
         if msvcrt.kbhit():
             key = msvcrt.getwch()
@@ -17,9 +273,13 @@ def read_keypress(callback):
 
 
 async def main():
-    global products, main_loop
+    global main_loop
 
     main_loop = asyncio.get_running_loop()
+    pipeline = scraper_pipeline(CATALOG_CATEGORY, "dhgate")
+    if pipeline is not None:
+        await pipeline.start()
+    extractor = IncrementalExtractor(pipeline=pipeline)
 
     async with async_playwright() as p:
         browser = await p.chromium.launch(
@@ -29,18 +289,19 @@ async def main():
         context = await browser.new_context(viewport=None)
         page = await context.new_page()
 
+        save_hint = "Press 's'" if msvcrt is not None else "Type 's' and Enter"
         print("\n🚀 Scraper started.")
         print("👉 Navigate manually to ANY DHgate category/product page.")
         print("👉 Scroll manually to load products.")
-        print("👉 Press 's' in the terminal to SAVE visible products.")
+        print(f"👉 {save_hint} in the terminal to SAVE newly loaded products.")
         print("👉 Press CTRL+C to exit.\n")
 
-        await page.goto("https://www.dhgate.com")
+        await page.goto(START_URL)
 
         def on_keypress(key):
             if key.lower() == "s":
                 print("\n🔍 Triggered save...")
-                asyncio.run_coroutine_threadsafe(scrape_products(page), main_loop)
+                asyncio.run_coroutine_threadsafe(scrape_products(page, extractor), main_loop)
 
             if key == "\x03":  # CTRL+C
                 print("\n⛔ Exiting...")
@@ -48,123 +309,42 @@ async def main():
 
         threading.Thread(target=read_keypress, args=(on_keypress,), daemon=True).start()
 
-        while True:
-            await asyncio.sleep(1)
+        try:
+            while True:
+                await asyncio.sleep(1)
+        finally:
+            await finish_pipeline(pipeline)
 
 
-async def scrape_products(page):
-    global products
-
+async def scrape_products(page, extractor):
     print("\n🔍 Extracting products...")
+    fresh = await extractor.drain(page)
+    print(f"💾 Saved {len(fresh)} new items. Total this session: {extractor.saved}")
 
-    # More robust selector approach - finds ANY element with product data
-    scraped = await page.evaluate(
-        """() => {
-            const results = [];
-            
-            // Try multiple common DHgate selectors
-            const selectors = [
-                'li[data-iteminfo]',  // DHgate uses data-iteminfo
-                'div[class*="product"]',
-                'div[class*="item"]',
-                'a[href*="/product/"]',
-                '[class*="goods"]',
-                '[class*="prod-"]'
-            ];
-            
-            const foundElements = new Set();
-            
-            for (const selector of selectors) {
-                try {
-                    const elements = document.querySelectorAll(selector);
-                    elements.forEach(el => {
-                        // Avoid duplicates
-                        if (!foundElements.has(el)) {
-                            foundElements.add(el);
-                        }
-                    });
-                } catch (e) {
-                    console.log('Selector failed:', selector);
-                }
-            }
-            
-            // Extract data from found elements
-            foundElements.forEach(item => {
-                try {
-                    // Try to find title
-                    let title = '';
-                    const titleSelectors = ['[class*="title"]', 'h3', 'h2', 'a[title]', '.product-name'];
-                    for (const sel of titleSelectors) {
-                        const titleEl = item.querySelector(sel);
-                        if (titleEl) {
-                            title = titleEl.innerText?.trim() || titleEl.getAttribute('title') || '';
-                            if (title) break;
-                        }
-                    }
-                    
-                    // Try to find image
-                    let img = '';
-                    const imgEl = item.querySelector('img');
-                    if (imgEl) {
-                        img = imgEl.src || imgEl.getAttribute('data-src') || imgEl.getAttribute('data-lazy') || '';
-                    }
-                    
-                    // Try to find price
-                    let price = '';
-                    const priceSelectors = ['[class*="price"]', '.cost', '[class*="amount"]'];
-                    for (const sel of priceSelectors) {
-                        const priceEl = item.querySelector(sel);
-                        if (priceEl) {
-                            price = priceEl.innerText?.trim() || '';
-                            if (price) break;
-                        }
-                    }
-                    
-                    // Try to find link
-                    let link = '';
-                    const linkEl = item.querySelector('a[href]') || item.closest('a[href]');
-                    if (linkEl) {
-                        link = linkEl.href || '';
-                    }
-                    
-                    // Only add if we found at least a title or link
-                    if (title || link) {
-                        results.push({ title, img, price, link });
-                    }
-                } catch (e) {
-                    console.log('Error extracting item:', e);
-                }
-            });
-            
-            console.log('Found', results.length, 'products');
-            return results;
-        }"""
-    )
-
-    # Filter - only keep COMPLETE products with all fields
-    complete_products = [
-        p for p in scraped 
-        if p.get('title') and p.get('img') and p.get('price') and p.get('link')
-    ]
-    
-    # Show what was filtered out
-    incomplete = len(scraped) - len(complete_products)
-
-    products.extend(complete_products)
-
-    with open("products.json", "w", encoding='utf-8') as f:
-        json.dump(products, f, indent=2, ensure_ascii=False)
-
-    print(f"💾 Saved {len(complete_products)} complete items. Total collected: {len(products)}")
-    if incomplete > 0:
-        print(f"⚠️  Skipped {incomplete} incomplete items (missing title/image/price/link)")
-    
-    if len(valid_scraped) == 0:
-        print("⚠️  No products found. Try:")
+    if len(fresh) == 0:
+        print("⚠️  No new products found. Try:")
         print("   1. Make sure you're on a product listing page")
         print("   2. Scroll down to load products")
         print("   3. Wait a few seconds for dynamic content to load")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description="DHgate listing scraper")
+    sub = arg_parser.add_subparsers(dest="command")
+    crawl_parser = sub.add_parser("crawl", help="Headless auto-scrolling crawl of one listing page")
+    crawl_parser.add_argument("url", help="Listing/category URL (file:// URLs work for fixtures)")
+    crawl_parser.add_argument("--max-items", type=int, default=500)
+    crawl_parser.add_argument("--max-scrolls", type=int, default=200)
+    crawl_parser.add_argument("--scroll-pause", type=int, default=1200, help="Milliseconds to wait after each scroll")
+    crawl_parser.add_argument("--headed", action="store_true", help="Show the browser")
+    crawl_parser.add_argument("--out", default=PRODUCTS_FILE)
+    crawl_parser.add_argument("--category", default=CATALOG_CATEGORY,
+                              help="Also ingest into this catalog store category (default: $DHGATE_CATEGORY)")
+    args = arg_parser.parse_args()
+
+    if args.command == "crawl":
+        asyncio.run(crawl(args.url, max_items=args.max_items, max_scrolls=args.max_scrolls,
+                          scroll_pause=args.scroll_pause, headless=not args.headed, path=args.out,
+                          category=args.category))
+    else:
+        asyncio.run(main())
@@ -0,0 +1,4 @@
+"""
+eBay scrapers. Run them as modules from flipkit-service so the shared
+service modules are importable, e.g. `python -m ebay.crawler <url>`.
+"""
@@ -0,0 +1,86 @@
+import argparse
+import glob
+import multiprocessing
+import os
+import resource
+import time
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PARSERS = ("parse_listings", "parse_listings_fast")
+
+
+def _max_rss_kb() -> int:
+    # Peak resident set size of this process (kilobytes on Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _run(parser_name: str, pages, repeat: int, queue) -> None:
+    """
+    Benchmark one parser in a fresh process so RSS figures aren't shared.
+    Nothing traces allocations during the timed loop; memory is the process's peak RSS.
+    """
+    from ebay import scraper
+
+    parse = getattr(scraper, parser_name)
+    parse(pages[0])  # Warm imports and compiled XPath/selectors
+    baseline_rss = _max_rss_kb()
+
+    items = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            items += len(parse(html))
+    elapsed = time.perf_counter() - started
+
+    queue.put({
+        "parser": parser_name,
+        "pages": repeat * len(pages),
+        "items": items,
+        "seconds": elapsed,
+        "itemsPerSec": items / elapsed,
+        "peakRssKB": _max_rss_kb(),
+        "rssGrowthKB": _max_rss_kb() - baseline_rss,
+    })
+
+
+def check_identical(pages) -> None:
+    from ebay import scraper
+
+    for i, html in enumerate(pages):
+        slow = scraper.parse_listings(html)
+        fast = scraper.parse_listings_fast(html)
+        if slow != fast:
+            raise SystemExit(f"❌ Parsers disagree on fixture #{i}: {len(slow)} vs {len(fast)} items")
+    print(f"✅ Both parsers produce identical items on {len(pages)} fixture(s)")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Compare the BeautifulSoup and lxml eBay listing parsers")
+    arg_parser.add_argument("--repeat", type=int, default=20, help="Passes over the fixture set per parser")
+    arg_parser.add_argument("--fixtures", default=os.path.join(FIXTURES_DIR, "*.html"))
+    args = arg_parser.parse_args()
+
+    pages = []
+    for path in sorted(glob.glob(args.fixtures)):
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append(f.read())
+    if not pages:
+        raise SystemExit(f"No fixtures matched {args.fixtures}")
+
+    check_identical(pages)
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for name in PARSERS:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run, args=(name, pages, args.repeat, queue))
+        proc.start()
+        results.append(queue.get())
+        proc.join()
+
+    print(f"\n{'parser':<22}{'pages':>7}{'items':>8}{'items/s':>12}{'peak RSS KB':>13}{'RSS +KB':>10}")
+    for r in results:
+        print(f"{r['parser']:<22}{r['pages']:>7}{r['items']:>8}{r['itemsPerSec']:>12.0f}"
+              f"{r['peakRssKB']:>13}{r['rssGrowthKB']:>10}")
+    speedup = results[1]["itemsPerSec"] / results[0]["itemsPerSec"]
+    print(f"\n⚡ parse_listings_fast is {speedup:.1f}x faster")
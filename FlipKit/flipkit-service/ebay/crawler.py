@@ -0,0 +1,173 @@
+import argparse
+import asyncio
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx  # type: ignore
+
+from catalog_store import ingest
+from ebay.scraper import HEADERS, parse_listings_fast, save_products
+from fetch_cache import default_cache
+from rate_limit import request_with_backoff_async
+
+# -------------------------------
+# Configuration
+# -------------------------------
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MAX_PAGES = 20
+REQUEST_TIMEOUT = 15
+RETRIES = 3
+
+
+def page_url(url: str, page: int) -> str:
+    """Return `url` pointed at result page `page` via eBay's `_pgn` parameter."""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "_pgn"]
+    if page > 1:
+        query.append(("_pgn", str(page)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+
+
+class CrawlStats:
+    """Counters for one crawl; rates are measured from construction."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.pages = 0
+        self.items = 0
+        self.errors = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> Dict:
+        elapsed = self.elapsed or 1e-9
+        return {
+            "pages": self.pages,
+            "items": self.items,
+            "errors": self.errors,
+            "seconds": round(elapsed, 2),
+            "pagesPerSec": round(self.pages / elapsed, 2),
+            "itemsPerSec": round(self.items / elapsed, 2),
+        }
+
+
+async def fetch_html(client: httpx.AsyncClient, url: str, retries: int = RETRIES) -> str:
+    """Async counterpart of scraper.get_html on a shared, pooled client."""
+
+    async def download(extra_headers: Dict[str, str]) -> httpx.Response:
+        response = await request_with_backoff_async(
+            url, lambda: client.get(url, headers=extra_headers), retries=retries,
+        )
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
+    async def send(conditional: Dict[str, str]):
+        response = await download(conditional)
+        return response.status_code, dict(response.headers), response.content
+
+    cache = default_cache()
+    try:
+        if cache is None:
+            return (await download({})).text
+        return (await cache.fetch_async(url, send, HEADERS)).text
+    except httpx.HTTPError as e:
+        raise Exception(f"Failed to fetch URL after {retries} attempts: {url} ({e})") from e
+
+
+async def crawl(category_urls: Iterable[str], limit: int = 1000, max_pages: int = DEFAULT_MAX_PAGES,
+                concurrency: int = DEFAULT_CONCURRENCY, stats: Optional[CrawlStats] = None) -> AsyncIterator[Dict]:
+    """
+    Crawl eBay category/search pages concurrently and yield items as pages finish.
+
+    Every (category, page) pair is a task, scheduled page-first across
+    categories, with at most `concurrency` fetches in flight on one pooled
+    HTTP client. A category stops paginating once a page comes back empty,
+    and the whole crawl is cancelled as soon as `limit` unique items (by
+    link) have been yielded. HTML parsing runs in a worker thread so it
+    doesn't stall in-flight fetches.
+    """
+    category_urls = list(category_urls)
+    stats = stats if stats is not None else CrawlStats()
+    semaphore = asyncio.Semaphore(concurrency)
+    exhausted = set()  # Categories past their last page
+    seen_links = set()
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(headers=HEADERS, timeout=REQUEST_TIMEOUT, limits=limits,
+                                 follow_redirects=True) as client:
+
+        async def fetch_page(base: str, page: int) -> List[Dict]:
+            async with semaphore:
+                if base in exhausted:
+                    return []
+                html = await fetch_html(client, page_url(base, page))
+            items = await asyncio.to_thread(parse_listings_fast, html)
+            stats.pages += 1
+            if not items:
+                exhausted.add(base)
+            return items
+
+        tasks = [
+            asyncio.create_task(fetch_page(base, page))
+            for page in range(1, max_pages + 1)
+            for base in category_urls
+        ]
+        yielded = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    items = await next_done
+                except Exception as e:
+                    stats.errors += 1
+                    print(f"[Warning] Page failed: {e}")
+                    continue
+                for item in items:
+                    link = item.get("link")
+                    if link in seen_links:
+                        continue
+                    if link:
+                        seen_links.add(link)
+                    stats.items += 1
+                    yielded += 1
+                    yield item
+                    if yielded >= limit:
+                        return
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def crawl_to_list(category_urls: Iterable[str], **kwargs) -> List[Dict]:
+    stats = CrawlStats()
+    products = [item async for item in crawl(category_urls, stats=stats, **kwargs)]
+    print(f"[Info] Crawl stats: {stats.summary()}")
+    if default_cache():
+        print(f"[Info] Fetch cache: {default_cache().stats()}")
+    return products
+
+
+# -------------------------------
+# Main execution
+# -------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent eBay category crawler")
+    parser.add_argument("urls", nargs="+", help="eBay category or search URLs")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--pages", type=int, default=DEFAULT_MAX_PAGES)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--out", default="product.json")
+    parser.add_argument("--category", help="Catalog category to ingest into")
+    args = parser.parse_args()
+
+    products = asyncio.run(crawl_to_list(
+        args.urls, limit=args.limit, max_pages=args.pages, concurrency=args.concurrency,
+    ))
+    print(f"[Info] Found {len(products)} items")
+    save_products(products, args.out)
+    if args.category:
+        ingest(args.category, products, source="ebay")
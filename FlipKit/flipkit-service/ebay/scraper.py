@@ -1,9 +1,16 @@
+import argparse
+import os
 import requests
 from bs4 import BeautifulSoup  # type: ignore
+import lxml.html  # type: ignore
+from lxml import etree  # type: ignore
 import json
-import time
 from typing import List, Dict, Optional
 
+from catalog_store import ingest
+from fetch_cache import default_cache
+from rate_limit import request_with_backoff
+
 # -------------------------------
 # Configuration
 # -------------------------------
@@ -24,20 +31,34 @@ HEADERS = {
     "Sec-Fetch-User": "?1"
 }
 
+# One session so repeated fetches reuse keep-alive connections
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+
 # -------------------------------
 # Helper functions
 # -------------------------------
-def get_html(url: str, retries: int = 3, delay: int = 2) -> str:
-    """Fetch HTML content with retry logic to handle connection issues."""
-    for attempt in range(retries):
-        try:
-            response = requests.get(url, headers=HEADERS, timeout=15)
-            response.raise_for_status()
-            return response.text
-        except requests.exceptions.RequestException as e:
-            print(f"[Warning] Attempt {attempt + 1} failed: {e}")
-            time.sleep(delay * (attempt + 1))
-    raise Exception(f"Failed to fetch URL after {retries} attempts: {url}")
+def _download(url: str, extra_headers: Dict[str, str], retries: int):
+    response = request_with_backoff(url, lambda: SESSION.get(url, headers=extra_headers, timeout=15), retries=retries)
+    if response.status_code != 304:
+        response.raise_for_status()
+    return response
+
+def get_html(url: str, retries: int = 3) -> str:
+    """Fetch HTML content, paced per host, retried with backoff and served from the fetch cache when fresh."""
+    cache = default_cache()
+    try:
+        if cache is None:
+            return _download(url, {}, retries).text
+
+        def send(conditional: Dict[str, str]):
+            response = _download(url, conditional, retries)
+            return response.status_code, dict(response.headers), response.content
+
+        return cache.fetch(url, send, HEADERS).text
+    except requests.exceptions.RequestException as e:
+        print(f"[Warning] Fetch failed: {e}")
+        raise Exception(f"Failed to fetch URL after {retries} attempts: {url}") from e
 
 def parse_item(item) -> Optional[Dict]:
     """Extract product details from a single eBay listing element."""
@@ -66,15 +87,14 @@ def parse_item(item) -> Optional[Dict]:
         "image": image
     }
 
-def scrape_ebay_category(url: str, limit: int = 20) -> List[Dict]:
-    """Scrape eBay category/search page and return up to `limit` items."""
-    html = get_html(url)
+def parse_listings(html: str, limit: Optional[int] = None) -> List[Dict]:
+    """Parse every listing on an eBay category/search page (up to `limit`)."""
     soup = BeautifulSoup(html, "lxml")
     results = []
 
     items = soup.select(".s-item")
     for item in items:
-        if len(results) >= limit:
+        if limit is not None and len(results) >= limit:
             break
         product = parse_item(item)
         if product:
@@ -82,6 +102,65 @@ def scrape_ebay_category(url: str, limit: int = 20) -> List[Dict]:
 
     return results
 
+# -------------------------------
+# Fast parse path
+# -------------------------------
+# Listing nodes, matched on the class token exactly as `.s-item` does
+_ITEMS_XPATH = etree.XPath("//*[contains(concat(' ', normalize-space(@class), ' '), ' s-item ')]")
+_FIELD_CLASSES = ("s-item__title", "s-item__price", "s-item__hotness", "s-item__link", "s-item__image-img")
+
+def _text(el) -> str:
+    # Same as BeautifulSoup's get_text(strip=True): descendant text nodes (no comments), stripped and joined
+    return "".join(t.strip() for t in el.xpath(".//text()"))
+
+def parse_item_fast(item) -> Optional[Dict]:
+    """lxml equivalent of parse_item: one walk over the listing instead of five CSS queries."""
+    found = {}
+    for el in item.iterdescendants():
+        classes = el.get("class")
+        if not classes:
+            continue
+        for token in classes.split():
+            if token in _FIELD_CLASSES and token not in found:
+                found[token] = el
+        if len(found) == len(_FIELD_CLASSES):
+            break
+
+    title_el = found.get("s-item__title")
+    if title_el is None:
+        return None
+    title = _text(title_el)
+    if title == "Shop on eBay":
+        return None
+
+    price_el = found.get("s-item__price")
+    sold_el = found.get("s-item__hotness")
+    link_el = found.get("s-item__link")
+    image_el = found.get("s-item__image-img")
+    return {
+        "title": title,
+        "price": _text(price_el) if price_el is not None else None,
+        "sold": _text(sold_el) if sold_el is not None else None,
+        "link": link_el.get("href") if link_el is not None else None,
+        "image": (image_el.get("src") or image_el.get("data-src")) if image_el is not None else None,
+    }
+
+def parse_listings_fast(html: str, limit: Optional[int] = None) -> List[Dict]:
+    """Same output as parse_listings, using lxml directly and touching only listing nodes."""
+    root = lxml.html.fromstring(html)
+    results = []
+    for item in _ITEMS_XPATH(root):
+        if limit is not None and len(results) >= limit:
+            break
+        product = parse_item_fast(item)
+        if product:
+            results.append(product)
+    return results
+
+def scrape_ebay_category(url: str, limit: int = 20) -> List[Dict]:
+    """Scrape eBay category/search page and return up to `limit` items."""
+    return parse_listings_fast(get_html(url), limit=limit)
+
 def save_products(products: List[Dict], path: str = "product.json") -> None:
     """Save scraped products to JSON file."""
     with open(path, "w", encoding="utf-8") as f:
@@ -95,6 +174,11 @@ if __name__ == "__main__":
     CATEGORY_URL = "https://www.ebay.com/b/Beauty/bn_7000259123?_sop=5"
     ITEMS_LIMIT = 20
 
+    parser = argparse.ArgumentParser(description="Scrape one eBay category page")
+    parser.add_argument("--category", default=os.getenv("EBAY_CATEGORY") or None,
+                        help="Also ingest into this catalog store category, e.g. skincare (default: $EBAY_CATEGORY)")
+    args = parser.parse_args()
+
     products = scrape_ebay_category(CATEGORY_URL, limit=ITEMS_LIMIT)
     print(f"[Info] Found {len(products)} items\n")
 
@@ -102,3 +186,7 @@ if __name__ == "__main__":
         print(item)
 
     save_products(products)
+    if args.category:
+        ingest(args.category, products, source="ebay")
+    if default_cache():
+        print(f"[Info] Fetch cache: {default_cache().stats()}")
@@ -0,0 +1,314 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from email.utils import formatdate
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DIR = os.getenv("FETCH_CACHE_DIR", os.path.join(BASE_DIR, ".fetch_cache"))
+DEFAULT_TTL = float(os.getenv("FETCH_CACHE_TTL", str(6 * 3600)))
+DEFAULT_MAX_BYTES = int(float(os.getenv("FETCH_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+# Request headers that change the response we'd get back, and so the cache key
+VARY_HEADERS = ("accept", "accept-language")
+
+# Response headers worth replaying from cache
+KEPT_HEADERS = ("content-type", "etag", "last-modified", "content-language")
+
+# Headers describing the body as it was sent on the wire. Bodies here are
+# already decoded, so replaying these would misdescribe them.
+WIRE_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access);
+CREATE INDEX IF NOT EXISTS idx_entries_body ON entries (body_hash);
+"""
+
+# (status, headers, body) as returned by a caller's send function
+Fetched = Tuple[int, Dict[str, str], bytes]
+
+
+class CachedResponse:
+    def __init__(self, key: str, url: str, status: int, headers: Dict[str, str], body: bytes, expires_at: float):
+        self.key = key
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry"""
+        headers = {}
+        if self.headers.get("etag"):
+            headers["If-None-Match"] = self.headers["etag"]
+        if self.headers.get("last-modified"):
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+
+def cache_key(url: str, request_headers: Optional[Dict[str, str]] = None, method: str = "GET") -> str:
+    lowered = {k.lower(): v for k, v in (request_headers or {}).items()}
+    varied = [f"{name}:{lowered.get(name, '')}" for name in VARY_HEADERS]
+    return hashlib.sha256("\n".join([method.upper(), url, *varied]).encode("utf-8")).hexdigest()
+
+
+class FetchCache:
+    """
+    On-disk HTTP response cache shared by the scrapers.
+
+    Bodies are stored content-addressed under `objects/` (identical pages
+    are kept once) and indexed in SQLite by method, URL and the request
+    headers in VARY_HEADERS. Entries are fresh for `ttl` seconds, after
+    which they are revalidated with If-None-Match / If-Modified-Since; a
+    304 renews the entry without a download. Total body size is capped at
+    `max_bytes` by evicting the least recently used entries.
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIR, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.directory, "index.db"), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _object_path(self, body_hash: str) -> str:
+        return os.path.join(self.directory, "objects", body_hash[:2], body_hash)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    # -------------------------------
+    # Entry operations
+    # -------------------------------
+    def lookup(self, url: str, request_headers: Optional[Dict[str, str]] = None) -> Optional[CachedResponse]:
+        key = cache_key(url, request_headers)
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT status, headers, body_hash, expires_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, headers, body_hash, expires_at = row
+        try:
+            with open(self._object_path(body_hash), "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            with conn:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+        with conn:
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return CachedResponse(key, url, status, json.loads(headers), body, expires_at)
+
+    def store(self, url: str, status: int, response_headers: Dict[str, str], body: bytes,
+              request_headers: Optional[Dict[str, str]] = None, ttl: Optional[float] = None) -> CachedResponse:
+        key = cache_key(url, request_headers)
+        lowered = {k.lower(): v for k, v in (response_headers or {}).items()}
+        headers = {k: lowered[k] for k in KEPT_HEADERS if k in lowered}
+        body_hash = hashlib.sha256(body).hexdigest()
+        path = self._object_path(body_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        conn = self._connect()
+        with conn:
+            old = conn.execute("SELECT body_hash FROM entries WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO entries
+                    (key, url, status, headers, body_hash, size, stored_at, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, url, status, json.dumps(headers), body_hash, len(body), now, expires_at, now),
+            )
+        if old and old[0] != body_hash:
+            self._drop_object_if_unused(old[0])
+        self.evict()
+        return CachedResponse(key, url, status, headers, body, expires_at)
+
+    def renew(self, entry: CachedResponse, response_headers: Optional[Dict[str, str]] = None,
+              ttl: Optional[float] = None) -> CachedResponse:
+        """Extend an entry after a 304, picking up any new validators"""
+        lowered = {k.lower(): v for k, v in (response_headers or {}).items()}
+        for name in ("etag", "last-modified"):
+            if lowered.get(name):
+                entry.headers[name] = lowered[name]
+        entry.expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "UPDATE entries SET headers = ?, expires_at = ?, last_access = ? WHERE key = ?",
+                (json.dumps(entry.headers), entry.expires_at, time.time(), entry.key),
+            )
+        return entry
+
+    def _drop_object_if_unused(self, body_hash: str) -> None:
+        conn = self._connect()
+        in_use = conn.execute("SELECT 1 FROM entries WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone()
+        if not in_use:
+            try:
+                os.remove(self._object_path(body_hash))
+            except FileNotFoundError:
+                pass
+
+    def evict(self) -> int:
+        """Drop least recently used entries until stored bodies fit in max_bytes"""
+        conn = self._connect()
+        total = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT body_hash, size FROM entries)"
+        ).fetchone()[0]
+        evicted = 0
+        while total > self.max_bytes:
+            row = conn.execute("SELECT key, body_hash, size FROM entries ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            key, body_hash, size = row
+            with conn:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            shared = conn.execute("SELECT 1 FROM entries WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone()
+            if not shared:
+                total -= size
+                self._drop_object_if_unused(body_hash)
+            evicted += 1
+        return evicted
+
+    # -------------------------------
+    # Fetch helpers
+    # -------------------------------
+    def _begin(self, url: str, request_headers, ttl) -> Tuple[Optional[CachedResponse], Dict[str, str]]:
+        entry = self.lookup(url, request_headers)
+        if entry is not None and entry.fresh:
+            self._count("hits")
+            return entry, {}
+        return entry, (entry.validators() if entry is not None else {})
+
+    def _finish(self, url: str, entry: Optional[CachedResponse], fetched: Fetched, request_headers,
+                ttl) -> CachedResponse:
+        status, headers, body = fetched
+        if status == 304 and entry is not None:
+            self._count("revalidated")
+            return self.renew(entry, headers, ttl)
+        self._count("misses")
+        if status != 200:
+            # Errors and block pages are passed through, never cached
+            passed = {k.lower(): v for k, v in headers.items() if k.lower() not in WIRE_HEADERS}
+            return CachedResponse("", url, status, passed, body, 0)
+        return self.store(url, status, headers, body, request_headers, ttl)
+
+    def fetch(self, url: str, send: Callable[[Dict[str, str]], Fetched],
+              request_headers: Optional[Dict[str, str]] = None, ttl: Optional[float] = None) -> CachedResponse:
+        """
+        Return `url` from cache, revalidating or downloading it through `send` when needed.
+
+        `send(conditional_headers)` performs the request with the given extra
+        headers and returns (status, headers, body).
+        """
+        entry, conditional = self._begin(url, request_headers, ttl)
+        if entry is not None and entry.fresh:
+            return entry
+        return self._finish(url, entry, send(conditional), request_headers, ttl)
+
+    async def fetch_async(self, url: str, send: Callable[[Dict[str, str]], Awaitable[Fetched]],
+                          request_headers: Optional[Dict[str, str]] = None,
+                          ttl: Optional[float] = None) -> CachedResponse:
+        """Async counterpart of `fetch`; `send` is a coroutine function. Disk I/O runs off the event loop."""
+        entry, conditional = await asyncio.to_thread(self._begin, url, request_headers, ttl)
+        if entry is not None and entry.fresh:
+            return entry
+        fetched = await send(conditional)
+        return await asyncio.to_thread(self._finish, url, entry, fetched, request_headers, ttl)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.revalidated + self.misses
+            return {
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "hitRatio": round((self.hits + self.revalidated) / lookups, 4) if lookups else 0.0,
+            }
+
+
+async def install_route_cache(target, cache: FetchCache, resource_types: Iterable[str] = ("document", "xhr", "fetch"),
+                              ttl: Optional[float] = None) -> None:
+    """
+    Serve a Playwright page's or context's GET requests through `cache`.
+
+    Fresh entries are fulfilled locally without touching the network; stale
+    ones are revalidated with `route.fetch` and conditional headers. Other
+    requests fall through to any other route handlers.
+    """
+    resource_types = set(resource_types)
+
+    async def handle(route, request):
+        if request.method != "GET" or request.resource_type not in resource_types:
+            await route.fallback()
+            return
+
+        async def send(conditional: Dict[str, str]) -> Fetched:
+            response = await route.fetch(headers={**request.headers, **conditional})
+            return response.status, response.headers, await response.body()
+
+        cached = await cache.fetch_async(request.url, send, request.headers, ttl)
+        headers = {k: v for k, v in cached.headers.items() if k not in WIRE_HEADERS}
+        headers.setdefault("date", formatdate(usegmt=True))
+        await route.fulfill(status=cached.status, headers=headers, body=cached.body)
+
+    await target.route("**/*", handle)
+
+
+_default_cache: Optional[FetchCache] = None
+
+
+def default_cache() -> Optional[FetchCache]:
+    """Process-wide cache, or None when disabled with FETCH_CACHE=0"""
+    global _default_cache
+    if os.getenv("FETCH_CACHE", "1") == "0":
+        return None
+    if _default_cache is None:
+        _default_cache = FetchCache()
+    return _default_cache
@@ -0,0 +1,429 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from catalog import iter_json_array, normalize_product, product_id
+from catalog_store import DEFAULT_DB, CatalogStore
+from dedupe import NEAR_DUP_THRESHOLD, MergedRecord, ProductDeduper
+
+# Records buffered between two stages; a full queue makes the producer wait
+QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "1000"))
+
+# Rows written to the store per transaction
+BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+
+# Titles scrapers pick up from non-product rows
+PLACEHOLDER_TITLES = {"shop on ebay", "new listing"}
+
+_DONE = object()
+
+
+def normalize_record(record: dict) -> dict:
+    """Scraped record (any source's field names) -> served shape"""
+    return normalize_product(record, product_id(record))
+
+
+def validate_product(product: dict) -> Optional[str]:
+    """Why a normalized product can't be served, or None when it can"""
+    title = (product.get("title") or "").strip()
+    if not title:
+        return "missing title"
+    if title.lower() in PLACEHOLDER_TITLES:
+        return "placeholder title"
+    if not product.get("url", "").startswith(("http://", "https://")):
+        return "missing link"
+    image = product.get("imageUrl") or ""
+    if image and not image.startswith(("http://", "https://")):
+        return "bad image url"
+    return None
+
+
+class DedupeStage:
+    """
+    Folds each new product into its cluster and says what to write.
+
+    Seeded with what the category already holds, so duplicates are caught
+    across ingest runs and not only within one. `feed` returns the merged
+    record to upsert for the product's cluster, plus the item ids of rows
+    that cluster swallowed and that must be deleted. A product joining one
+    cluster is folded into that cluster's record; only a product bridging
+    several clusters rebuilds the record from its members.
+    """
+
+    def __init__(self, existing: Iterable[dict] = (), threshold: float = NEAR_DUP_THRESHOLD):
+        self.deduper = ProductDeduper(threshold)
+        self.written = set()  # Cluster roots that have a row in the store
+        self.records: Dict[int, MergedRecord] = {}  # Cluster root -> record, once fed
+        for product in existing:
+            self.written.add(self.deduper.add(product))
+        self.deduper.pop_absorbed()
+
+    def feed(self, product: dict) -> Tuple[MergedRecord, List[str]]:
+        deduper = self.deduper
+        i = deduper.add(product)
+        root = deduper.root(i)
+        deletes = []
+        bridged = False
+        for old in deduper.pop_absorbed():
+            self.records.pop(old, None)
+            bridged = bridged or old != i
+            if old in self.written:
+                self.written.discard(old)
+                deletes.append(deduper.products[old]["itemId"])
+        self.written.add(root)
+        record = self.records.get(root)
+        if record is None or bridged:
+            record = self.records[root] = MergedRecord(deduper.members(root))
+        else:
+            record.add(product)
+        return record, deletes
+
+
+class StoreSink:
+    """
+    Batches upserts and deletes for one category into store transactions.
+
+    Products may be plain rows or MergedRecords; a record updated several
+    times in one batch is turned into a row once, when the batch is written.
+    With `replace`, rows are placed in the order their cluster first
+    appeared in this run, and `finish` deletes whatever the run didn't write.
+    """
+
+    def __init__(self, store: CatalogStore, category: str, source: Optional[str], replace: bool = False,
+                 first_seen: Optional[Dict[str, str]] = None):
+        self.store = store
+        self.category = category
+        self.source = source
+        self.replace = replace
+        self.first_seen = first_seen
+        self.upserts: Dict[str, Union[dict, MergedRecord]] = {}
+        self.deletes = set()
+        self.kept = set()  # Item ids written this run (for replace)
+        self.positions: Dict[str, int] = {}  # Item id -> position this run (for replace)
+        self.rows = 0
+
+    def __len__(self) -> int:
+        return len(self.upserts) + len(self.deletes)
+
+    def add(self, product: Union[dict, MergedRecord], deletes: Iterable[str] = ()) -> None:
+        for item_id in deletes:
+            self.upserts.pop(item_id, None)
+            self.kept.discard(item_id)
+            self.deletes.add(item_id)
+        item_id = product.item_id if isinstance(product, MergedRecord) else product["itemId"]
+        # A cluster updated twice in one batch is written once, in its latest form
+        self.upserts[item_id] = product
+        self.deletes.discard(item_id)
+        self.kept.add(item_id)
+
+    def flush(self) -> None:
+        if not self.upserts and not self.deletes:
+            return
+        products = [p.row() if isinstance(p, MergedRecord) else p for p in self.upserts.values()]
+        positions = None
+        if self.replace:
+            # Positions run across batches; upsert_served's own replace would prune earlier ones
+            positions = [self.positions.setdefault(p["itemId"], len(self.positions)) for p in products]
+        self.rows += self.store.upsert_served(
+            self.category, products, source=self.source, first_seen=self.first_seen,
+            delete=sorted(self.deletes), positions=positions,
+        )
+        self.upserts = {}
+        self.deletes = set()
+
+    def finish(self) -> None:
+        self.flush()
+        if self.replace:
+            self.store.retain(self.category, self.kept)
+
+
+class StageStats:
+    """Throughput of one stage: busy time excludes waiting on either queue"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.received = 0
+        self.emitted = 0
+        self.dropped: Dict[str, int] = {}
+        self.busy = 0.0
+        self.blocked = 0.0  # Time spent waiting for the next stage to make room
+
+    def drop(self, reason: str) -> None:
+        self.dropped[reason] = self.dropped.get(reason, 0) + 1
+
+    def as_dict(self, wall: float) -> dict:
+        return {
+            "received": self.received,
+            "emitted": self.emitted,
+            "dropped": dict(self.dropped),
+            "busySeconds": round(self.busy, 3),
+            "blockedSeconds": round(self.blocked, 3),
+            "itemsPerSec": round(self.received / self.busy) if self.busy else None,
+            "utilization": round(self.busy / wall, 3) if wall else 0.0,
+        }
+
+
+class IngestPipeline:
+    """
+    Streaming ingest: source → normalize → validate → dedupe → sink.
+
+    Scrapers `await put(record)` for each scraped record; every stage runs
+    as its own task connected by bounded queues, so a slow stage (usually
+    the store) makes the producer wait instead of letting records pile up
+    in memory. The sink writes rows in their final served shape, with
+    duplicates already merged, so the API serves them as stored. Per-stage
+    counts, busy time and time blocked on the next stage are in `stats()`:
+    the stage with the highest utilization is the bottleneck.
+
+        async with IngestPipeline("stockx", source="stockx") as pipeline:
+            for record in records:
+                await pipeline.put(record)
+        print(pipeline.stats())
+    """
+
+    def __init__(self, category: str, source: Optional[str] = None, db_path: str = DEFAULT_DB,
+                 queue_size: int = QUEUE_SIZE, batch_size: int = BATCH_SIZE, replace: bool = False,
+                 dedupe: bool = True, first_seen: Optional[Dict[str, str]] = None, create: bool = False):
+        self.category = category
+        self.source = source
+        self.db_path = db_path
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.replace = replace
+        self.dedupe = dedupe
+        self.first_seen = first_seen
+        self.create = create
+        self.error: Optional[BaseException] = None
+        self._stages = [StageStats(name) for name in ("normalize", "validate", "dedupe", "sink")]
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        # The store is only touched from this one thread (its connections are per thread)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-sink")
+        self._store: Optional[CatalogStore] = None
+        self._sink: Optional[StoreSink] = None
+        self._dedupe: Optional[DedupeStage] = None
+        self._started = 0.0
+        self._finished = 0.0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _in_sink_thread(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _open_store(self) -> List[dict]:
+        if not self.create and not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"No catalog store at {self.db_path}; create it with `python catalog_store.py import`")
+        self._store = CatalogStore(self.db_path)
+        self._sink = StoreSink(self._store, self.category, self.source, self.replace, self.first_seen)
+        if not self.dedupe or self.replace:
+            return []
+        return list(self._store.iter_category(self.category))
+
+    async def start(self) -> None:
+        existing = await self._in_sink_thread(self._open_store)
+        dedupe = self._dedupe = DedupeStage(existing)
+        self._started = time.perf_counter()
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self._stages]
+        normalize, validate, dedupe_stats, sink = self._stages
+
+        def check(product):
+            reason = validate_product(product)
+            if reason:
+                validate.drop(reason)
+                return None
+            return product
+
+        def fold(product):
+            return dedupe.feed(product) if self.dedupe else (product, [])
+
+        q = self._queues
+        self._tasks = [
+            asyncio.create_task(self._stage(normalize, q[0], q[1], normalize_record)),
+            asyncio.create_task(self._stage(validate, q[1], q[2], check)),
+            asyncio.create_task(self._stage(dedupe_stats, q[2], q[3], fold)),
+            asyncio.create_task(self._sink_stage(sink, q[3])),
+        ]
+
+    async def _stage(self, stats: StageStats, inbox: asyncio.Queue, outbox: asyncio.Queue, fn) -> None:
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                await outbox.put(_DONE)
+                return
+            stats.received += 1
+            if self.error is not None:
+                continue  # Keep draining so producers never block on a dead pipeline
+            started = time.perf_counter()
+            try:
+                result = fn(item)
+            except Exception as e:
+                self.error = e
+                continue
+            finally:
+                stats.busy += time.perf_counter() - started
+            if result is None:
+                continue
+            stats.emitted += 1
+            started = time.perf_counter()
+            await outbox.put(result)
+            stats.blocked += time.perf_counter() - started
+
+    async def _sink_stage(self, stats: StageStats, inbox: asyncio.Queue) -> None:
+        done = False
+        while not done:
+            item = await inbox.get()
+            batch = []
+            # Take whatever else is already queued, up to a batch
+            while True:
+                if item is _DONE:
+                    done = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size or inbox.empty():
+                    break
+                item = inbox.get_nowait()
+            if not batch or self.error is not None:
+                stats.received += len(batch)
+                continue
+            started = time.perf_counter()
+            try:
+                await self._in_sink_thread(self._write, batch)
+                stats.emitted += len(batch)
+            except Exception as e:
+                self.error = e
+            stats.received += len(batch)
+            stats.busy += time.perf_counter() - started
+
+    def _write(self, batch: List[Tuple[Union[dict, MergedRecord], List[str]]]) -> None:
+        for product, deletes in batch:
+            self._sink.add(product, deletes)
+        self._sink.flush()
+
+    async def put(self, record: dict) -> None:
+        """Queue one scraped record; waits while the pipeline is full"""
+        if self.error is not None:
+            raise RuntimeError(f"Ingest pipeline failed: {self.error}") from self.error
+        await self._queues[0].put(record)
+
+    async def put_many(self, records) -> int:
+        """Queue every record from an iterable or async iterable"""
+        count = 0
+        if hasattr(records, "__aiter__"):
+            async for record in records:
+                await self.put(record)
+                count += 1
+        else:
+            for record in records:
+                await self.put(record)
+                count += 1
+        return count
+
+    async def close(self) -> dict:
+        """Drain every stage, commit the last batch and return the stats"""
+        if self._tasks:
+            await self._queues[0].put(_DONE)
+            await asyncio.gather(*self._tasks)
+            self._tasks = []
+            if self.error is None:
+                await self._in_sink_thread(self._sink.finish)
+            await self._in_sink_thread(self._store.close)
+            self._finished = time.perf_counter()
+        self._executor.shutdown(wait=False)
+        if self.error is not None:
+            raise RuntimeError(f"Ingest pipeline failed: {self.error}") from self.error
+        return self.stats()
+
+    def stats(self) -> dict:
+        wall = (self._finished or time.perf_counter()) - self._started if self._started else 0.0
+        return {
+            "category": self.category,
+            "wallSeconds": round(wall, 3),
+            "rowsWritten": self._sink.rows if self._sink is not None else 0,
+            "dedupe": self._dedupe.deduper.stats() if self._dedupe is not None else {},
+            "stages": {s.name: s.as_dict(wall) for s in self._stages},
+        }
+
+
+def ingest_records(category: str, records: Iterable[dict], source: Optional[str], db_path: str = DEFAULT_DB,
+                   replace: bool = False) -> int:
+    """
+    Run the pipeline's stages in-line for one batch; returns how many records were accepted.
+
+    For synchronous callers saving a whole run at once. Scrapers with an
+    event loop feed one IngestPipeline per run (see `scraper_pipeline`)
+    instead of calling this per product.
+    """
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"No catalog store at {db_path}; create it with `python catalog_store.py import`")
+    store = CatalogStore(db_path)
+    try:
+        dedupe = DedupeStage() if replace else DedupeStage(store.iter_category(category))
+        sink = StoreSink(store, category, source, replace)
+        accepted = 0
+        for record in records:
+            product = normalize_record(record)
+            if validate_product(product):
+                continue
+            sink.add(*dedupe.feed(product))
+            accepted += 1
+            if len(sink) >= BATCH_SIZE:
+                sink.flush()
+        sink.finish()
+        return accepted
+    finally:
+        store.close()
+
+
+def scraper_pipeline(category: Optional[str], source: str, db_path: str = DEFAULT_DB) -> Optional[IngestPipeline]:
+    """The pipeline a scraper run feeds, or None when there's no category or store to ingest into"""
+    if not category:
+        return None
+    if not os.path.exists(db_path):
+        print(f"⚠️ No catalog store at {db_path}; {source} products won't be ingested into '{category}'")
+        return None
+    return IngestPipeline(category, source=source, db_path=db_path)
+
+
+async def finish_pipeline(pipeline: Optional[IngestPipeline]) -> None:
+    """Drain and close a scraper's pipeline, reporting what reached the store"""
+    if pipeline is None:
+        return
+    try:
+        stats = await pipeline.close()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return
+    accepted = stats["stages"]["dedupe"]["emitted"]
+    print(f"🗄️ Ingested {accepted} {pipeline.source} products into '{pipeline.category}' ({pipeline.db_path})")
+
+
+async def import_file(category: str, path: str, source: str = "import", db_path: str = DEFAULT_DB,
+                      replace: bool = True, first_seen: Optional[Dict[str, str]] = None) -> dict:
+    """Stream one JSON array file through the pipeline, creating the store if needed"""
+    async with IngestPipeline(category, source=source, db_path=db_path, replace=replace,
+                              first_seen=first_seen, create=True) as pipeline:
+        for record in iter_json_array(path):
+            await pipeline.put(record)
+    return pipeline.stats()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Stream a scraped JSON array file into the catalog store")
+    arg_parser.add_argument("category")
+    arg_parser.add_argument("file", help="JSON array of scraped records")
+    arg_parser.add_argument("--source", default="import")
+    arg_parser.add_argument("--db", default=DEFAULT_DB)
+    arg_parser.add_argument("--append", action="store_true", help="Merge into the category instead of replacing it")
+    args = arg_parser.parse_args()
+
+    stats = asyncio.run(import_file(args.category, args.file, args.source, args.db, replace=not args.append))
+    print(json.dumps(stats, indent=2))
@@ -1,9 +1,24 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+import hashlib
 import json
 import os
-from datetime import datetime
+from typing import Optional
 import uvicorn
+from catalog import (
+    CATEGORY_FILES, PRODUCTS_FILE, CatalogCache, CatalogEntry, FirstSeenRegistry, JsonFileSource, content_etag,
+)
+from catalog_store import ALL_CATEGORY, CatalogStore, StoreCategorySource
+from dedupe import MergedSource
+from pricing import build_price_index
+from query import MAX_PAGE_SIZE, paginate, parse_fields, parse_sort, select_products, validate_query
+from response_cache import build_response_cache, choose_encoding
+from search_index import build_shard, search
+from thumbnails import (
+    CACHE_CONTROL, DEFAULT_WIDTH, MEDIA_TYPES, ThumbnailError, ThumbnailService, check_url, choose_format,
+    snap_width,
+)
 
 app = FastAPI()
 
@@ -15,73 +30,308 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Map categories to their respective JSON files
-CATEGORY_FILES = {
-    "skincare": "./products/skincare_products.json",
-    "fashion": "./products/fashion_acc_products.json",
-    "fragrances": "./products/fragrances_products.json",
-    "pets": "./products/pets_products.json",
-    "necklace": "./products/necklace_products.json",
-}
-
-PRODUCTS_FILE = "./products/products.json"
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-def load_products_from_file(file_path: str):
-    """Helper function to load and normalize products from a JSON file"""
-    full_path = os.path.join(BASE_DIR, file_path)
-    if not os.path.exists(full_path):
-        raise HTTPException(status_code=404, detail=f"Products file not found: {full_path}")
+FIRST_SEEN_FILE = os.getenv("FIRST_SEEN_FILE", os.path.join(BASE_DIR, "first_seen.json"))
+
+# Where the catalog is served from: "json" reads ./products/*.json, "sqlite"
+# serves the catalog store at CATALOG_DB, built with `python catalog_store.py import`
+CATALOG_BACKEND = os.getenv("CATALOG_BACKEND", "json")
+CATALOG_DB = os.getenv("CATALOG_DB", os.path.join(BASE_DIR, "catalog.db"))
+
+# Merge duplicate listings within each JSON catalog when it's loaded (opt-in; rows are
+# served as scraped by default, which lets streams read the file incrementally). The
+# catalog store needs no merging here: the ingest pipeline already did it, and the
+# `merged` category below is always merged.
+CATALOG_DEDUPE = os.getenv("CATALOG_DEDUPE", "0") == "1"
+
+# Every catalog merged into one, each product carrying its offers from all marketplaces
+MERGED_CATEGORY = "merged"
+
+catalog_cache = CatalogCache()
+thumbnails = ThumbnailService()
+first_seen = FirstSeenRegistry(FIRST_SEEN_FILE)
+
+def open_catalog_store() -> Optional[CatalogStore]:
+    if CATALOG_BACKEND == "json":
+        return None
+    if CATALOG_BACKEND != "sqlite":
+        raise RuntimeError(f"Unknown CATALOG_BACKEND '{CATALOG_BACKEND}'. Use 'json' or 'sqlite'")
+    if not os.path.exists(CATALOG_DB):
+        raise RuntimeError(f"CATALOG_BACKEND=sqlite but {CATALOG_DB} doesn't exist. "
+                           "Create it with `python catalog_store.py import`")
+    return CatalogStore(CATALOG_DB)
+
+catalog_store = open_catalog_store()
+
+def available_categories() -> list:
+    if catalog_store is not None:
+        return [c for c in catalog_store.categories() if c != ALL_CATEGORY]
+    return list(CATEGORY_FILES)
+
+def raw_source(category: str):
+    """Where a category is read from: the catalog store when configured, else its JSON file"""
+    if catalog_store is not None:
+        return StoreCategorySource(catalog_store, category)
+    file_path = PRODUCTS_FILE if category == ALL_CATEGORY else CATEGORY_FILES[category]
+    return JsonFileSource(os.path.join(BASE_DIR, file_path), first_seen)
+
+def merged_categories() -> list:
+    if catalog_store is not None:
+        return catalog_store.categories()
+    files = {**CATEGORY_FILES, ALL_CATEGORY: PRODUCTS_FILE}
+    return [c for c, path in files.items() if os.path.exists(os.path.join(BASE_DIR, path))]
+
+def catalog_source(category: str):
+    """A category's source; merged across listings for `merged`, or with CATALOG_DEDUPE=1"""
+    if category == MERGED_CATEGORY:
+        return MergedSource(*(raw_source(c) for c in merged_categories()))
+    source = raw_source(category)
+    return MergedSource(source) if CATALOG_DEDUPE and catalog_store is None else source
+
+def check_category(category: str) -> str:
+    # Check if category exists in our catalog
+    if category == MERGED_CATEGORY:
+        return category
+    categories = available_categories()
+    if category not in categories:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Category '{category}' not found. Available categories: {', '.join(categories)}"
+        )
+    return category
+
+def load_catalog(category: str) -> CatalogEntry:
+    """Return the cached, normalized catalog for a category, reloading it if the source changed"""
     try:
-        with open(full_path, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        
-        # Normalize the data to match frontend expectations
-        normalized = []
-        for i, p in enumerate(data):
-            normalized.append({
-                "itemId": str(i + 1),
-                "title": p.get("title", ""),
-                "imageUrl": p.get("img", ""),
-                "priceText": p.get("price", ""),
-                "shipping": "",  # Your scraped data doesn't have this
-                "url": p.get("link", ""),
-                "viewCount": 0,  # Your scraped data doesn't have this
-                "listingDate": datetime.now().isoformat(),  # Use current time
-            })
-        return normalized
+        return catalog_cache.get(category, catalog_source(category))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"Products not found: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def stream_products(category: str) -> StreamingResponse:
+    """
+    Stream normalized products as NDJSON.
+
+    Plain catalogs are read from the source incrementally, never loaded
+    whole. Merged catalogs (the `merged` category, or every category with
+    CATALOG_DEDUPE=1) only exist whole, so they're streamed from the cached merge.
+    """
+    source = catalog_source(category)
+    if isinstance(source, MergedSource):
+        products = load_catalog(category).products
+    else:
+        try:
+            source.version()
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=f"Products not found: {e}")
+        products = source.iter_products()
+
+    def generate():
+        for product in products:
+            yield (json.dumps(product, ensure_ascii=False) + "\n").encode("utf-8")
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
+def query_key(request: Request) -> str:
+    return "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+
+def response_etag(entry: CatalogEntry, request: Request) -> str:
+    """ETag for this catalog version, varied by the query (page, sort, fields, price range)"""
+    etag = entry.derive("etag", content_etag)
+    variant = query_key(request)
+    if variant:
+        etag = hashlib.sha1(f"{etag}?{variant}".encode("utf-8")).hexdigest()
+    return etag
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip().removeprefix("W/").strip('"')
+        # Compressed variants carry an -<encoding> suffix on the same version
+        if candidate == "*" or candidate.split("-", 1)[0] == etag:
+            return True
+    return False
+
+def conditional_response(request: Request, entry: CatalogEntry, build) -> Response:
+    """
+    Serve a product listing from the per-version response cache.
+
+    Bodies are serialized and compressed once per catalog version and query,
+    then returned as stored bytes in the best encoding the client accepts.
+    A client that already holds this version gets a body-less 304.
+    """
+    etag = response_etag(entry, request)
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": f'"{etag}-{encoding}"' if encoding else f'"{etag}"',
+        "Cache-Control": "public, no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    body = entry.derive("responses", build_response_cache).get(query_key(request), build)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body.get(encoding), media_type="application/json", headers=headers)
+
+def check_query(sort, fields, cursor, min_price, max_price) -> None:
+    """Reject bad listing parameters up front, so they get a 400 rather than a cached 304"""
+    try:
+        validate_query(sort, fields, cursor, min_price, max_price)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def list_products(entry: CatalogEntry, limit, cursor, offset, sort, fields, min_price=None, max_price=None) -> dict:
+    """Apply price filtering, sorting, pagination and field projection to a cached catalog"""
+    try:
+        sort = parse_sort(sort)
+        fields = parse_fields(fields)
+        products = select_products(entry, sort, min_price, max_price)
+        return paginate(products, limit, cursor=cursor, offset=offset, sort=sort, fields=fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/products")
-def get_all_products():
+def get_all_products(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    offset: Optional[int] = Query(None, ge=0),
+    sort: Optional[str] = None,
+    fields: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+):
     """Get all products from the main products file"""
-    products = load_products_from_file(PRODUCTS_FILE)
-    print(f"📦 Returning {len(products)} products (all)")
-    return {"products": products}
+    if wants_ndjson(request):
+        return stream_products(ALL_CATEGORY)
+    check_query(sort, fields, cursor, min_price, max_price)
+    entry = load_catalog(ALL_CATEGORY)
+
+    def build():
+        result = list_products(entry, limit, cursor, offset, sort, fields, min_price, max_price)
+        print(f"📦 Returning {len(result['products'])} of {result['total']} products (all)")
+        return result
+
+    return conditional_response(request, entry, build)
 
 @app.get("/products/{category}")
-def get_products_by_category(category: str):
+def get_products_by_category(
+    request: Request,
+    category: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    offset: Optional[int] = Query(None, ge=0),
+    sort: Optional[str] = None,
+    fields: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+):
     """Get products for a specific category"""
     print("📢 Hit category route with:", category)
-    # Check if category exists in our mapping
-    if category not in CATEGORY_FILES:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"Category '{category}' not found. Available categories: {', '.join(CATEGORY_FILES.keys())}"
-        )
-    
-    # Get the file path for this category
-    file_path = CATEGORY_FILES[category]
-    products = load_products_from_file(file_path)
-    
-    print(f"📦 Returning {len(products)} products for category: {category}")
-    return {"products": products}
+    check_category(category)
+    if wants_ndjson(request):
+        return stream_products(category)
+    check_query(sort, fields, cursor, min_price, max_price)
+    entry = load_catalog(category)
+
+    def build():
+        result = list_products(entry, limit, cursor, offset, sort, fields, min_price, max_price)
+        print(f"📦 Returning {len(result['products'])} of {result['total']} products for category: {category}")
+        return result
+
+    return conditional_response(request, entry, build)
+
+@app.get("/products/{category}/stream")
+def stream_products_by_category(category: str):
+    """Stream a category as newline-delimited JSON for bulk consumers"""
+    print("📢 Hit category stream route with:", category)
+    return stream_products(check_category(category))
+
+def search_shards(category: Optional[str] = None) -> dict:
+    """Per-category search shards; each is built once per catalog version"""
+    categories = [check_category(category)] if category else available_categories()
+    shards = {}
+    for name in categories:
+        entry = load_catalog(name)
+        shards[name] = entry.derive("search", build_shard)
+    return shards
+
+@app.on_event("startup")
+def warm_catalogs():
+    """Load every category and build its search shard before the first request"""
+    try:
+        shards = search_shards()
+        print(f"🔎 Search index ready: {sum(len(s.products) for s in shards.values())} products")
+    except HTTPException as e:
+        print(f"⚠️ Could not warm catalogs: {e.detail}")
+
+@app.get("/search")
+def search_products(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    category: Optional[str] = None,
+):
+    """Ranked full-text search over product titles across all categories"""
+    result = search(search_shards(category), q, limit)
+    print(f"🔎 Search '{q}' matched {result['total']} products")
+    return result
+
+@app.get("/image")
+async def get_image(
+    request: Request,
+    url: str = Query(..., min_length=1),
+    w: int = Query(DEFAULT_WIDTH, ge=1),
+    format: Optional[str] = None,
+):
+    """Resized, re-encoded copy of a product image, fetched upstream once and served from disk"""
+    fmt = format or choose_format(request.headers.get("accept"))
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{fmt}'. Use one of: {', '.join(MEDIA_TYPES)}")
+    try:
+        url = check_url(url, thumbnails.hosts)  # Before the 304, so a refused URL is never revalidated
+    except ThumbnailError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+    etag = ThumbnailService.key(url, snap_width(w), fmt)
+    headers = {"ETag": f'"{etag}"', "Cache-Control": CACHE_CONTROL}
+    if not format:
+        headers["Vary"] = "Accept"
+    if request.headers.get("if-none-match", "").strip('"') == etag:
+        return Response(status_code=304, headers=headers)
+    try:
+        body = await thumbnails.thumbnail(url, w, fmt)
+    except ThumbnailError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+    return Response(content=body, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+@app.on_event("shutdown")
+async def close_thumbnails():
+    await thumbnails.aclose()
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """Catalog cache hit/miss counters, loaded entries and price parsing failures"""
+    stats = catalog_cache.stats()
+    stats["unparsedPrices"] = {
+        key: len(entry.derive("price", build_price_index).unparsed)
+        for key, entry in catalog_cache.entries().items()
+    }
+    stats["thumbnails"] = thumbnails.stats()
+    return stats
 
 if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
     print(f"🚀 Server running on {host}:{port}")
-    print("Categories:", CATEGORY_FILES.keys())
-    print(f"📁 Available categories: {', '.join(CATEGORY_FILES.keys())}")
+    print("Catalog:", CATALOG_DB if catalog_store is not None else "JSON files")
+    print(f"📁 Available categories: {', '.join(available_categories())}")
     uvicorn.run(app, host=host, port=port)
\ No newline at end of file
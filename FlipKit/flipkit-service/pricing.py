@@ -0,0 +1,89 @@
+import re
+from bisect import bisect_left, bisect_right
+from typing import List, NamedTuple, Optional
+
+
+class ParsedPrice(NamedTuple):
+    min: float
+    max: float
+    currency: Optional[str]
+
+
+_NUMBER_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+_CODE_RE = re.compile(r"\b([A-Z]{3})\b")
+
+# Prefix + symbol combinations as they appear in scraped price strings
+_SYMBOLS = (
+    ("US $", "USD"),
+    ("AU $", "AUD"),
+    ("C $", "CAD"),
+    ("$", "USD"),
+    ("£", "GBP"),
+    ("€", "EUR"),
+    ("₦", "NGN"),
+)
+
+
+def _currency(text: str) -> Optional[str]:
+    code = _CODE_RE.search(text)
+    if code:
+        return code.group(1)
+    for symbol, currency in _SYMBOLS:
+        if symbol in text:
+            return currency
+    return None
+
+
+def parse_price(text: Optional[str]) -> Optional[ParsedPrice]:
+    """
+    Parse a scraped price string into a numeric range and currency.
+
+    Handles single prices ("$12.99"), ranges ("US $3.20 - $5.10",
+    "US $9.60 - 18.48 / Piece") and thousands separators ("NGN 4,500").
+    DHgate lists the sale price and the struck-through original on separate
+    lines, so only the first non-empty line is used. Returns None if no
+    number is found.
+    """
+    if not text:
+        return None
+    line = next((part.strip() for part in str(text).splitlines() if part.strip()), "")
+    numbers = [float(n.replace(",", "")) for n in _NUMBER_RE.findall(line)[:2]]
+    if not numbers:
+        return None
+    low, high = numbers[0], numbers[-1]
+    if high < low:
+        high = low
+    return ParsedPrice(low, high, _currency(line))
+
+
+class PriceIndex:
+    """
+    Products of one catalog version ordered by their parsed minimum price.
+
+    Range filters and price sorts are answered with binary search over the
+    sorted keys; rows whose price could not be parsed are kept aside and
+    counted.
+    """
+
+    def __init__(self, products: List[dict]):
+        priced = [p for p in products if p.get("priceMin") is not None]
+        priced.sort(key=lambda p: p["priceMin"])
+        self.products = priced
+        self.keys = [p["priceMin"] for p in priced]
+        self.unparsed = [p for p in products if p.get("priceMin") is None]
+
+    def ascending(self) -> List[dict]:
+        return self.products + self.unparsed
+
+    def descending(self) -> List[dict]:
+        return self.products[::-1] + self.unparsed
+
+    def range(self, min_price: Optional[float] = None, max_price: Optional[float] = None) -> List[dict]:
+        """Products whose minimum price lies in [min_price, max_price], cheapest first"""
+        lo = bisect_left(self.keys, min_price) if min_price is not None else 0
+        hi = bisect_right(self.keys, max_price) if max_price is not None else len(self.keys)
+        return self.products[lo:hi]
+
+
+def build_price_index(products: List[dict]) -> PriceIndex:
+    return PriceIndex(products)
@@ -0,0 +1,152 @@
+import base64
+import json
+from typing import List, Optional
+
+from pricing import build_price_index
+
+MAX_PAGE_SIZE = 200
+
+PRODUCT_FIELDS = (
+    "itemId",
+    "title",
+    "imageUrl",
+    "priceText",
+    "priceMin",
+    "priceMax",
+    "currency",
+    "shipping",
+    "url",
+    "viewCount",
+    "listingDate",
+    "offers",
+)
+
+# Sort name -> key function over a normalized product
+SORT_KEYS = {
+    "price": lambda p: p["priceMin"] if p.get("priceMin") is not None else float("inf"),
+    "title": lambda p: (p.get("title") or "").lower(),
+    "listingDate": lambda p: p.get("listingDate") or "",
+}
+
+
+def parse_sort(sort: Optional[str]) -> Optional[str]:
+    """Validate a `sort` parameter such as `price`, `-price` or `title`"""
+    if not sort:
+        return None
+    name = sort[1:] if sort.startswith("-") else sort
+    if name not in SORT_KEYS:
+        raise ValueError(f"Unknown sort '{sort}'. Use one of: {', '.join(SORT_KEYS)} (prefix '-' for descending)")
+    return sort
+
+
+def sorted_products(entry, sort: Optional[str]) -> List[dict]:
+    """Products in `sort` order; each ordering is built once per catalog version"""
+    if not sort:
+        return entry.products
+    if sort in ("price", "-price"):
+        # Unpriced rows go last in both directions
+        index = entry.derive("price", build_price_index)
+        return entry.derive(f"sort:{sort}", lambda _: index.ascending() if sort == "price" else index.descending())
+    name = sort.lstrip("-")
+    reverse = sort.startswith("-")
+    return entry.derive(
+        f"sort:{sort}",
+        lambda products: sorted(products, key=SORT_KEYS[name], reverse=reverse),
+    )
+
+
+def check_price_range(min_price: Optional[float], max_price: Optional[float]) -> None:
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise ValueError("min_price must not be greater than max_price")
+
+
+def select_products(entry, sort: Optional[str], min_price: Optional[float] = None,
+                    max_price: Optional[float] = None) -> List[dict]:
+    """
+    Products in `sort` order, restricted to a price range when one is given.
+
+    A price range is a binary-search slice of the price index (by minimum
+    price); only the matching rows are re-ordered for a non-price sort.
+    """
+    if min_price is None and max_price is None:
+        return sorted_products(entry, sort)
+    check_price_range(min_price, max_price)
+    matches = entry.derive("price", build_price_index).range(min_price, max_price)
+    if not sort or sort == "price":
+        return matches
+    if sort == "-price":
+        return matches[::-1]
+    return sorted(matches, key=SORT_KEYS[sort.lstrip("-")], reverse=sort.startswith("-"))
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Validate a comma-separated `fields` projection"""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in PRODUCT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(PRODUCT_FIELDS)}")
+    return names
+
+
+def project(products: List[dict], fields: Optional[List[str]]) -> List[dict]:
+    if not fields:
+        return products
+    return [{f: p.get(f) for f in fields} for p in products]
+
+
+def encode_cursor(offset: int, sort: Optional[str]) -> str:
+    raw = json.dumps({"o": offset, "s": sort or ""}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: Optional[str]) -> int:
+    """Return the offset stored in `cursor`; it must have been issued for the same sort"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        offset = int(data["o"])
+        cursor_sort = data.get("s") or None
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    if cursor_sort != (sort or None):
+        raise ValueError("Cursor was issued for a different sort order")
+    return offset
+
+
+def validate_query(sort: Optional[str], fields: Optional[str], cursor: Optional[str] = None,
+                   min_price: Optional[float] = None, max_price: Optional[float] = None) -> None:
+    """Raise ValueError for any listing parameter that `select_products` or `paginate` would reject"""
+    sort = parse_sort(sort)
+    parse_fields(fields)
+    if cursor:
+        decode_cursor(cursor, sort)
+    check_price_range(min_price, max_price)
+
+
+def paginate(products: List[dict], limit: Optional[int], cursor: Optional[str] = None,
+             offset: Optional[int] = None, sort: Optional[str] = None,
+             fields: Optional[List[str]] = None) -> dict:
+    """
+    Slice one page out of an already-sorted list.
+
+    Without `limit` the whole list is returned, which keeps the original
+    `{"products": [...]}` contract for existing clients.
+    """
+    total = len(products)
+    start = decode_cursor(cursor, sort) if cursor else (offset or 0)
+    if limit is None:
+        page = products[start:]
+        next_cursor = None
+    else:
+        end = start + limit
+        page = products[start:end]
+        next_cursor = encode_cursor(end, sort) if end < total else None
+    return {
+        "products": project(page, fields),
+        "total": total,
+        "nextCursor": next_cursor,
+    }
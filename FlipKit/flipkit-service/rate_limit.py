@@ -0,0 +1,235 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+# Statuses that mean "slow down" rather than "this request is wrong"
+THROTTLE_STATUSES = {429, 503}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with jitter: a random delay in [d/2, d] for d = base * 2^attempt"""
+    delay = min(cap, base * (2 ** attempt))
+    return random.uniform(delay / 2, delay)
+
+
+def _status(response) -> int:
+    # requests/httpx expose status_code, Playwright exposes status
+    status = getattr(response, "status_code", None)
+    return status if status is not None else getattr(response, "status", 0)
+
+
+def _header(response, name: str) -> Optional[str]:
+    headers = getattr(response, "headers", None) or {}
+    return headers.get(name) or headers.get(name.lower())
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate` tokens/second, holding at most `burst`.
+
+    `reserve` takes a token immediately (possibly going into debt) and
+    returns how long the caller must wait, so the same bucket serves
+    blocking and asyncio callers fairly in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.rate = rate
+
+
+class _HostState:
+    def __init__(self, rate: float, burst: float, window: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.blocked_until = 0.0
+        self.outcomes = deque(maxlen=window)  # True = error/throttle
+        self.decreased_at = float("-inf")
+
+
+class HostRateLimiter:
+    """
+    Per-host request pacing with adaptive backoff.
+
+    Each host gets a token bucket starting at `rate` requests/second. A
+    throttling response (429/503) halves the host's rate and pauses it for
+    Retry-After (or a jittered backoff); so does a failure that brings the
+    error ratio over the last `window` requests above `error_threshold`.
+    A halving starts a fresh window and none follows within `cooldown`
+    seconds, so one burst of errors slows a host down once. Successes raise
+    the rate again additively up to `max_rate`. Usable from threads via
+    `wait` and from asyncio via `wait_async`.
+    """
+
+    def __init__(self, rate: float = 2.0, burst: float = 2.0, min_rate: float = 0.1, max_rate: float = 10.0,
+                 increase: float = 0.1, error_threshold: float = 0.3, window: int = 20, cooldown: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.error_threshold = error_threshold
+        self.window = window
+        self.cooldown = cooldown
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, url: str) -> _HostState:
+        host = urlsplit(url).netloc.lower() or url
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = _HostState(self.rate, self.burst, self.window)
+            return state
+
+    def _delay(self, url: str) -> float:
+        state = self._state(url)
+        cooldown = max(0.0, state.blocked_until - time.monotonic())
+        return cooldown + state.bucket.reserve()
+
+    def wait(self, url: str) -> None:
+        """Block the calling thread until a request to `url`'s host is allowed"""
+        delay = self._delay(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, url: str) -> None:
+        """Suspend the calling task until a request to `url`'s host is allowed"""
+        delay = self._delay(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record(self, url: str, status: Optional[int] = None, retry_after: Optional[float] = None,
+               attempt: int = 0) -> None:
+        """Feed back a response status (None for a transport error) to adapt the host's rate"""
+        state = self._state(url)
+        throttled = status in THROTTLE_STATUSES
+        failed = status is None or status >= 500 or throttled
+        now = time.monotonic()
+        with self._lock:
+            state.outcomes.append(failed)
+            rate = state.bucket.rate
+            if failed:
+                errors, seen = sum(state.outcomes), len(state.outcomes)
+                overloaded = throttled or (seen >= 5 and errors / seen > self.error_threshold)
+                if overloaded and now - state.decreased_at >= self.cooldown:
+                    rate = max(self.min_rate, rate / 2)
+                    state.decreased_at = now
+                    state.outcomes.clear()
+            else:
+                rate = min(self.max_rate, rate + self.increase)
+            if throttled:
+                pause = retry_after if retry_after is not None else backoff_delay(attempt)
+                state.blocked_until = max(state.blocked_until, now + pause)
+        state.bucket.set_rate(rate)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                host: {
+                    "rate": round(state.bucket.rate, 3),
+                    "recentErrors": sum(state.outcomes),
+                    "pausedFor": round(max(0.0, state.blocked_until - time.monotonic()), 2),
+                }
+                for host, state in self._hosts.items()
+            }
+
+
+# Shared by every scraper in the process so limits hold across call sites
+DEFAULT_LIMITER = HostRateLimiter()
+
+
+def _check_retries(retries: int) -> None:
+    if retries < 1:
+        raise ValueError(f"retries must be at least 1 (one attempt), got {retries}")
+
+
+def request_with_backoff(url: str, send: Callable[[], object], limiter: HostRateLimiter = DEFAULT_LIMITER,
+                         retries: int = 3):
+    """
+    Call `send()` for `url` under the host's rate limit, retrying throttles and 5xx.
+
+    `send` returns a response exposing `status_code` or `status` and `headers`.
+    Transport errors are retried too; the last one is re-raised.
+    `retries` counts attempts, so it must be at least 1.
+    """
+    _check_retries(retries)
+    for attempt in range(retries):
+        limiter.wait(url)
+        try:
+            response = send()
+        except Exception:
+            limiter.record(url, None, attempt=attempt)
+            if attempt == retries - 1:
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+        status = _status(response)
+        limiter.record(url, status, parse_retry_after(_header(response, "Retry-After")), attempt)
+        if status not in RETRY_STATUSES or attempt == retries - 1:
+            return response
+        if status not in THROTTLE_STATUSES:
+            time.sleep(backoff_delay(attempt))  # Throttles already paused the host
+    return response
+
+
+async def request_with_backoff_async(url: str, send: Callable[[], Awaitable[object]],
+                                     limiter: HostRateLimiter = DEFAULT_LIMITER, retries: int = 3):
+    """Async counterpart of `request_with_backoff`; `send` is a coroutine function"""
+    _check_retries(retries)
+    for attempt in range(retries):
+        await limiter.wait_async(url)
+        try:
+            response = await send()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            limiter.record(url, None, attempt=attempt)
+            if attempt == retries - 1:
+                raise
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+        status = _status(response)
+        limiter.record(url, status, parse_retry_after(_header(response, "Retry-After")), attempt)
+        if status not in RETRY_STATUSES or attempt == retries - 1:
+            return response
+        if status not in THROTTLE_STATUSES:
+            await asyncio.sleep(backoff_delay(attempt))
+    return response
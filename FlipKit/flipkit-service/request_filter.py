@@ -0,0 +1,149 @@
+import fnmatch
+import os
+import re
+from typing import Dict, Iterable, Optional
+
+# Resource types a scraper reading HTML/JSON never needs
+DEFAULT_BLOCKED_TYPES = ("image", "media", "font")
+
+# Analytics, ads and session-replay hosts; bot-protection scripts are left alone on purpose
+DEFAULT_DENY = (
+    "*://*.google-analytics.com/*",
+    "*://*.googletagmanager.com/*",
+    "*://*.doubleclick.net/*",
+    "*://*.googlesyndication.com/*",
+    "*://*.facebook.net/*",
+    "*://*.facebook.com/tr*",
+    "*://*.hotjar.com/*",
+    "*://*.segment.io/*",
+    "*://*.segment.com/*",
+    "*://*.nr-data.net/*",
+    "*://*.newrelic.com/*",
+    "*://*.sentry.io/*",
+    "*://*.tiktok.com/*",
+    "*://*.pinterest.com/ct/*",
+    "*://*.bing.com/*",
+    "*://*.quantserve.com/*",
+    "*://*.scorecardresearch.com/*",
+    "*://*.optimizely.com/*",
+)
+
+# Rough median transfer sizes per resource type, used only to estimate what an aborted request would have cost
+TYPICAL_BYTES = {"image": 20_000, "media": 250_000, "font": 30_000, "script": 25_000, "stylesheet": 15_000}
+DEFAULT_TYPICAL_BYTES = 5_000
+
+
+def _compile(patterns: Iterable[str]) -> Optional[re.Pattern]:
+    patterns = list(patterns)
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patterns), re.IGNORECASE)
+
+
+class FilterStats:
+    def __init__(self):
+        self.allowed = 0
+        self.blocked = 0
+        self.blocked_by_type: Dict[str, int] = {}
+        self.bytes_downloaded = 0
+        self.estimated_bytes_saved = 0  # From TYPICAL_BYTES; aborted requests have no real size
+
+    def add(self, other: "FilterStats") -> None:
+        self.allowed += other.allowed
+        self.blocked += other.blocked
+        self.bytes_downloaded += other.bytes_downloaded
+        self.estimated_bytes_saved += other.estimated_bytes_saved
+        for kind, count in other.blocked_by_type.items():
+            self.blocked_by_type[kind] = self.blocked_by_type.get(kind, 0) + count
+
+    def as_dict(self) -> Dict:
+        return {
+            "allowedRequests": self.allowed,
+            "blockedRequests": self.blocked,
+            "blockedByType": dict(self.blocked_by_type),
+            "bytesDownloaded": self.bytes_downloaded,
+            "estimatedBytesSaved": self.estimated_bytes_saved,
+        }
+
+    def summary(self) -> str:
+        return (f"{self.blocked} blocked / {self.allowed} allowed requests, "
+                f"{self.bytes_downloaded / 1024:.0f} KB downloaded, ~{self.estimated_bytes_saved / 1024:.0f} KB saved (estimated)")
+
+
+class RequestFilter:
+    """
+    Abort Playwright requests a scraper doesn't need.
+
+    A request is blocked when its resource type is in `block_types` or its
+    URL matches a `deny` glob, unless it matches an `allow` glob. Pages
+    registered with `track` get their own stats until `page_stats` folds them
+    into the total; requests from any other page count toward the total
+    directly. Bytes saved are estimated from TYPICAL_BYTES. Install it after any
+    other route handlers (e.g. the fetch cache) so it runs first; requests
+    it lets through fall back to them.
+    """
+
+    def __init__(self, block_types: Iterable[str] = DEFAULT_BLOCKED_TYPES, deny: Iterable[str] = DEFAULT_DENY,
+                 allow: Iterable[str] = ()):
+        self.block_types = set(block_types)
+        self._deny = _compile(deny)
+        self._allow = _compile(allow)
+        self.total = FilterStats()
+        self._pages: Dict[object, FilterStats] = {}
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if self._allow is not None and self._allow.match(url):
+            return False
+        if resource_type in self.block_types:
+            return True
+        return self._deny is not None and self._deny.match(url) is not None
+
+    def track(self, page) -> None:
+        """Keep separate stats for `page` until `page_stats` is called for it"""
+        self._pages.setdefault(page, FilterStats())
+
+    def _stats_for(self, request) -> FilterStats:
+        try:
+            page = request.frame.page
+        except Exception:
+            return self.total  # Service worker requests have no page
+        # Untracked pages, or ones already reported, never get an entry of their own
+        return self._pages.get(page, self.total)
+
+    async def install(self, target) -> None:
+        """Route every request of a Playwright page or context through this filter"""
+
+        async def handle(route, request):
+            stats = self._stats_for(request)
+            if self.should_block(request.url, request.resource_type):
+                stats.blocked += 1
+                stats.blocked_by_type[request.resource_type] = stats.blocked_by_type.get(request.resource_type, 0) + 1
+                stats.estimated_bytes_saved += TYPICAL_BYTES.get(request.resource_type, DEFAULT_TYPICAL_BYTES)
+                await route.abort("blockedbyclient")
+                return
+            stats.allowed += 1
+            await route.fallback()
+
+        def on_response(response):
+            length = response.headers.get("content-length")
+            if length and length.isdigit():
+                self._stats_for(response.request).bytes_downloaded += int(length)
+
+        await target.route("**/*", handle)
+        target.on("response", on_response)
+
+    def page_stats(self, page) -> FilterStats:
+        """Stats for one tracked page, dropped from tracking and folded into the total"""
+        stats = self._pages.pop(page, None) or FilterStats()
+        self.total.add(stats)
+        return stats
+
+    def stats(self) -> Dict:
+        return self.total.as_dict()
+
+
+def default_filter(**overrides) -> Optional[RequestFilter]:
+    """A RequestFilter with the default lists, or None when disabled with BLOCK_RESOURCES=0"""
+    if os.getenv("BLOCK_RESOURCES", "1") == "0":
+        return None
+    return RequestFilter(**overrides)
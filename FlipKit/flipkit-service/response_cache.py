@@ -0,0 +1,91 @@
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # Optional; responses fall back to gzip
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+MAX_VARIANTS = 128
+
+
+def serialize(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best content-coding we hold for an Accept-Encoding header (None = identity)"""
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in supported_encodings():
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+class EncodedBody:
+    """One serialized response body with its pre-compressed variants"""
+
+    def __init__(self, body: bytes):
+        self.variants: Dict[Optional[str], bytes] = {None: body}
+        self.variants["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+    def get(self, encoding: Optional[str]) -> bytes:
+        return self.variants.get(encoding, self.variants[None])
+
+
+class ResponseCache:
+    """
+    Serialized and compressed response bodies for one catalog version.
+
+    Lives on the catalog entry, so everything is dropped together when the
+    catalog reloads. Bodies are keyed by the normalized query string and the
+    least recently used variants are evicted past `max_variants`.
+    """
+
+    def __init__(self, max_variants: int = MAX_VARIANTS):
+        self.max_variants = max_variants
+        self._bodies: "OrderedDict[str, EncodedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, build: Callable[[], object]) -> EncodedBody:
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is not None:
+                self._bodies.move_to_end(key)
+                return body
+        # Build outside the lock; a concurrent duplicate build is harmless
+        body = EncodedBody(serialize(build()))
+        with self._lock:
+            self._bodies[key] = body
+            self._bodies.move_to_end(key)
+            while len(self._bodies) > self.max_variants:
+                self._bodies.popitem(last=False)
+        return body
+
+
+def build_response_cache(products) -> ResponseCache:
+    return ResponseCache()
@@ -0,0 +1,133 @@
+import heapq
+import math
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Tuple
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# A prefix match ranks below an exact match of the same term
+PREFIX_WEIGHT = 0.7
+MAX_PREFIX_EXPANSIONS = 64
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+class SearchShard:
+    """
+    Inverted index over the titles of one category's products.
+
+    Shards are immutable; a changed category file produces a new catalog
+    entry and with it a new shard, while the other categories keep theirs.
+    """
+
+    def __init__(self, products: List[dict]):
+        self.products = products
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths: List[int] = []
+        for doc, product in enumerate(products):
+            tokens = tokenize(product.get("title", ""))
+            self.doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, {})[doc] = tf
+        self.vocabulary = sorted(self.postings)
+
+        # Precompute the per-term and per-document parts of BM25
+        n = len(products)
+        avg_length = (sum(self.doc_lengths) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+        self.norms = [
+            K1 * (1 - B + B * (length / avg_length if avg_length else 1))
+            for length in self.doc_lengths
+        ]
+
+    def _expand(self, prefix: str) -> List[str]:
+        """Vocabulary terms starting with `prefix`, found by binary search"""
+        terms = []
+        i = bisect_left(self.vocabulary, prefix)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(prefix):
+            terms.append(self.vocabulary[i])
+            if len(terms) >= MAX_PREFIX_EXPANSIONS:
+                break
+            i += 1
+        return terms
+
+    def _term_score(self, term: str, doc: int, weight: float) -> float:
+        tf = self.postings[term][doc]
+        return weight * self.idf[term] * tf * (K1 + 1) / (tf + self.norms[doc])
+
+    def score(self, tokens: List[str]) -> Dict[int, float]:
+        """
+        Score documents containing every query token.
+
+        All tokens must match exactly except the last, which also matches as a
+        prefix so results update while the user is still typing.
+        """
+        if not tokens:
+            return {}
+        # (token -> [(term, weight)]), skipping straight out if any token has no match
+        expansions: List[List[Tuple[str, float]]] = []
+        for i, token in enumerate(tokens):
+            terms = [(token, 1.0)] if token in self.postings else []
+            if i == len(tokens) - 1:
+                terms += [(t, PREFIX_WEIGHT) for t in self._expand(token) if t != token]
+            if not terms:
+                return {}
+            expansions.append(terms)
+
+        # Seed candidates from the most selective token, then probe the rest
+        expansions.sort(key=lambda terms: sum(len(self.postings[t]) for t, _ in terms))
+        scores: Dict[int, float] = {}
+        norms = self.norms
+        for term, weight in expansions[0]:
+            w = weight * self.idf[term] * (K1 + 1)
+            for doc, tf in self.postings[term].items():
+                s = w * tf / (tf + norms[doc])
+                if s > scores.get(doc, 0.0):
+                    scores[doc] = s
+
+        for terms in expansions[1:]:
+            narrowed = {}
+            for doc, total in scores.items():
+                best = 0.0
+                for term, weight in terms:
+                    if doc in self.postings[term]:
+                        best = max(best, self._term_score(term, doc, weight))
+                if best:
+                    narrowed[doc] = total + best
+            scores = narrowed
+            if not scores:
+                break
+        return scores
+
+
+def build_shard(products: List[dict]) -> SearchShard:
+    return SearchShard(products)
+
+
+def search(shards: Dict[str, SearchShard], query: str, limit: int = 20) -> dict:
+    """Run `query` over every shard and return the top `limit` products by score"""
+    tokens = tokenize(query)
+    matches = []
+    for category, shard in shards.items():
+        for doc, s in shard.score(tokens).items():
+            matches.append((s, category, doc))
+
+    top = heapq.nlargest(limit, matches, key=lambda m: m[0])
+    results = []
+    for s, category, doc in top:
+        product = dict(shards[category].products[doc])
+        product["category"] = category
+        product["score"] = round(s, 4)
+        results.append(product)
+    return {"query": query, "total": len(matches), "results": results}
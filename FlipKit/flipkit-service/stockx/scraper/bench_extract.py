@@ -0,0 +1,79 @@
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup  # type: ignore
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def soup_extract(page_content: str):
+    """The previous BeautifulSoup-based extract_json, kept as the baseline"""
+    soup = BeautifulSoup(page_content, "html.parser")
+    tag = soup.find("script", id="__NEXT_DATA__")
+    if tag and tag.string and tag.string.strip():
+        try:
+            return json.loads(tag.string)
+        except json.JSONDecodeError:
+            pass
+
+    for script in soup.find_all("script"):
+        if script.string and "window.__NEXT_DATA__" in script.string:
+            match = re.search(r'window\.__NEXT_DATA__\s*=\s*(\{.*?\});', script.string, re.DOTALL)
+            if match:
+                try:
+                    return json.loads(match.group(1))
+                except json.JSONDecodeError:
+                    pass
+
+    for script in soup.find_all("script"):
+        if script.string and "GetProduct" in script.string:
+            raw = script.string
+            start = raw.find('{')
+            if start != -1:
+                for end in range(len(raw), start, -1):
+                    snippet = raw[start:end]
+                    if snippet.count('{') == snippet.count('}'):
+                        try:
+                            return json.loads(snippet)
+                        except json.JSONDecodeError:
+                            continue
+    return None
+
+
+def _time(extract, html: str, repeat: int) -> float:
+    extract(html)  # Warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        extract(html)
+    return (time.perf_counter() - started) / repeat
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Compare BeautifulSoup and offset-scanning __NEXT_DATA__ extraction")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="Timed runs per fixture and extractor")
+    arg_parser.add_argument("--fixtures", default=os.path.join(FIXTURES_DIR, "*.html"))
+    args = arg_parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from next_data import extract_next_data
+
+    paths = sorted(glob.glob(args.fixtures))
+    if not paths:
+        raise SystemExit(f"No fixtures matched {args.fixtures}")
+
+    print(f"{'fixture':<30}{'KB':>7}{'soup ms':>11}{'scan ms':>11}{'speedup':>9}")
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        if soup_extract(html) != extract_next_data(html):
+            raise SystemExit(f"❌ Extractors disagree on {os.path.basename(path)}")
+        slow = _time(soup_extract, html, args.repeat)
+        fast = _time(extract_next_data, html, args.repeat)
+        print(f"{os.path.basename(path):<30}{len(html) // 1024:>7}{slow * 1000:>11.1f}{fast * 1000:>11.1f}"
+              f"{slow / fast:>8.1f}x")
+    print("\n✅ Both extractors return identical data on every fixture")
@@ -1,27 +1,70 @@
 import asyncio
 import json
+import os
+import sys
 import uuid
+from collections import deque
+from typing import AsyncIterator, Iterable
+from urllib.parse import urlencode
 from bs4 import BeautifulSoup #type: ignore
 from playwright.async_api import async_playwright, Error as PlaywrightError  # type: ignore
 
+# Shared service modules live three directories up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from rate_limit import DEFAULT_LIMITER, parse_retry_after, request_with_backoff_async  # noqa: E402
+from request_filter import DEFAULT_BLOCKED_TYPES, DEFAULT_DENY, default_filter  # noqa: E402
+from scraper import ALLOW_REQUESTS  # noqa: E402
+from hybrid import BLOCK_SIGNALS, looks_blocked  # noqa: E402
+from next_data import next_data_script  # noqa: E402
+
+# Runs a batch of same-origin fetches inside the page, at most `parallel` at a time
+PARALLEL_FETCH_JS = """async ({urls, parallel}) => {
+    const out = new Array(urls.length);
+    let next = 0;
+    async function worker() {
+        while (next < urls.length) {
+            const i = next++;
+            try {
+                const r = await fetch(urls[i], {credentials: 'include'});
+                out[i] = {status: r.status, retryAfter: r.headers.get('retry-after'), text: await r.text()};
+            } catch (e) {
+                out[i] = {status: 0, retryAfter: null, text: String(e)};
+            }
+        }
+    }
+    await Promise.all(Array.from({length: Math.min(parallel, urls.length)}, worker));
+    return out;
+}"""
+
 class StockXBrowseAPI:
     BASE_URL = "https://stockx.com/api/browse"
+    SEARCH_URL = "https://stockx.com/search"
+    CONTEXT_OPTIONS = {
+        "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
+        "viewport": {"width": 1366, "height": 768},
+        "locale": "en-US",
+    }
+
+    # Only the browse JSON and the search page's __NEXT_DATA__ are read
+    BLOCKED_TYPES = DEFAULT_BLOCKED_TYPES + ("stylesheet",)
+    DENY_REQUESTS = DEFAULT_DENY
+    ALLOW_REQUESTS = ALLOW_REQUESTS
 
-    def __init__(self, headless: bool = True, solve_timeout: int = 120):
+    def __init__(self, headless: bool = True, solve_timeout: int = 120, block_resources: bool = True,
+                 session=None):
         self.headless = headless
         self.solve_timeout = solve_timeout  # seconds for manual block solving
+        self.session = session  # Optional HybridSession (shareable with StockXScraper) for direct HTTP calls
+        self.request_filter = (
+            default_filter(block_types=self.BLOCKED_TYPES, deny=self.DENY_REQUESTS, allow=self.ALLOW_REQUESTS)
+            if block_resources else None
+        )
 
     async def _wait_if_blocked(self, page):
         title = await page.title()
         text = await page.content()
-        blocked_signals = [
-            "access denied",
-            "captcha",
-            "unusual traffic",
-            "verify you are a human",
-        ]
         lowered = title.lower() + " " + text.lower()
-        if any(s in lowered for s in blocked_signals):
+        if any(s in lowered for s in BLOCK_SIGNALS):
             if self.headless:
                 return True  # indicate blocked in headless
             print("⚠️ Block/CAPTCHA detected. Solve manually if visible.")
@@ -31,7 +74,7 @@ class StockXBrowseAPI:
                 title = await page.title()
                 text = await page.content()
                 lowered = title.lower() + " " + text.lower()
-                if not any(s in lowered for s in blocked_signals):
+                if not any(s in lowered for s in BLOCK_SIGNALS):
                     print("✅ Block cleared.")
                     return False
                 print(f"⏳ Waiting... {remaining}s left")
@@ -39,43 +82,102 @@ class StockXBrowseAPI:
             raise RuntimeError("Timeout waiting for manual solve.")
         return False
 
+    def _browse_url(self, brand: str, limit: int, page: int = 1) -> str:
+        params = {
+            "productCategory": "all",
+            "brand": brand,
+            "page": str(page),
+            "limit": str(limit),
+            "sort": "release_date",
+            "order": "DESC",
+        }
+        return f"{self.BASE_URL}?{urlencode(params)}"
+
+    def _search_url(self, brand: str, page: int = 1) -> str:
+        params = {"s": brand}
+        if page > 1:
+            params["page"] = str(page)
+        return f"{self.SEARCH_URL}?{urlencode(params)}"
+
+    def _search_products(self, next_data: dict, html: str, limit: int) -> list[dict]:
+        products = []
+        # Newer StockX puts results under props.pageProps.results or searchResults
+        props = next_data.get("props", {}).get("pageProps", {})
+        candidates = props.get("searchResults") or props.get("results") or []
+        for item in candidates:
+            if isinstance(item, dict):
+                url_key = item.get("urlKey") or item.get("slug")
+                if url_key:
+                    products.append({"urlKey": url_key})
+                    if len(products) >= limit:
+                        break
+        if not products:
+            # Fallback: scan anchors
+            products = [{"urlKey": u.split("/")[-1]} for u in self._extract_listing_urls(html)]
+            products = products[:limit]
+        return products
+
+    async def _fetch_direct(self, brand: str, limit: int):
+        """Browse results over plain HTTP with the hybrid session; None means use the browser"""
+        if self.session is None:
+            return None
+        primary_url = self._browse_url(brand, limit)
+        fetched = await self.session.fetch(primary_url, headers={"Accept": "application/json"})
+        if fetched is None:
+            return None
+        status, body = fetched
+        if status == 200:
+            try:
+                data = json.loads(body)
+            except json.JSONDecodeError:
+                return None
+            products = data.get("Products") or data.get("products") or []
+            print(f"⚡ Retrieved {len(products)} products directly.")
+            return products
+        if status == 404:
+            fetched = await self.session.fetch(self._search_url(brand))
+            if fetched is None or fetched[0] != 200:
+                return None
+            next_data = next_data_script(fetched[1])
+            if not next_data:
+                return None
+            products = self._search_products(next_data, fetched[1], limit)
+            print(f"⚡ Fallback collected {len(products)} products directly.")
+            return products
+        return None
 
-# ...existing code above fetch_products...
     async def fetch_products(self, brand="Nike", limit=15) -> list[dict]:
+        products = await self._fetch_direct(brand, limit)
+        if products is not None:
+            return products
         async with async_playwright() as p:
             browser = await p.chromium.launch(headless=self.headless)
-            context = await browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-                viewport={"width": 1366, "height": 768},
-                locale="en-US"
-            )
+            context = await browser.new_context(**self.CONTEXT_OPTIONS)
+            if self.request_filter is not None:
+                await self.request_filter.install(context)
             page = await context.new_page()
-            print("🌐 Opening homepage...")
-            await page.goto("https://stockx.com", wait_until="domcontentloaded")
+            self._track_filter(page)
+            await self._open_homepage(page)
 
             # PRIMARY (likely to 404 now)
-            primary_params = {
-                "productCategory": "all",
-                "brand": brand,
-                "page": "1",
-                "limit": str(limit),
-                "sort": "release_date",
-                "order": "DESC",
-            }
-            primary_query = "&".join(f"{k}={v}" for k, v in primary_params.items())
-            primary_url = f"{self.BASE_URL}?{primary_query}"
+            primary_url = self._browse_url(brand, limit)
             print(f"🔎 Primary API fetch: {primary_url}")
+            await DEFAULT_LIMITER.wait_async(primary_url)
             result = await page.evaluate("""async (u)=>{
-                const r=await fetch(u,{credentials:'include'});return {status:r.status,text:await r.text()};
+                const r=await fetch(u,{credentials:'include'});
+                return {status:r.status,retryAfter:r.headers.get('retry-after'),text:await r.text()};
             }""", primary_url)
 
             status = result["status"]
+            DEFAULT_LIMITER.record(primary_url, status, parse_retry_after(result.get("retryAfter")))
             body = result["text"]
 
             if status == 404:
                 print("⚠️ Primary 404. Using search page fallback.")
-                search_url = f"https://stockx.com/search?s={brand}"
-                await page.goto(search_url, wait_until="domcontentloaded")
+                search_url = self._search_url(brand)
+                await request_with_backoff_async(
+                    search_url, lambda: page.goto(search_url, wait_until="domcontentloaded"),
+                )
                 # Wait a bit for scripts
                 await page.wait_for_timeout(3000)
                 # Extract __NEXT_DATA__
@@ -90,24 +192,10 @@ class StockXBrowseAPI:
                 if not next_data:
                     await context.close(); await browser.close()
                     raise RuntimeError("No __NEXT_DATA__ on search page.")
-                # Path may vary; attempt common locations
-                products = []
-                # Newer StockX puts results under props.pageProps.results or searchResults
-                props = next_data.get("props", {}).get("pageProps", {})
-                candidates = props.get("searchResults") or props.get("results") or []
-                for item in candidates:
-                    if isinstance(item, dict):
-                        url_key = item.get("urlKey") or item.get("slug")
-                        if url_key:
-                            products.append({"urlKey": url_key})
-                            if len(products) >= limit:
-                                break
-                if not products:
-                    # Fallback: scan anchors
-                    html = await page.content()
-                    products = [{"urlKey": u.split("/")[-1]} for u in self._extract_listing_urls(html)]
-                    products = products[:limit]
+                html = await page.content()
+                products = self._search_products(next_data, html, limit)
                 print(f"✅ Fallback collected {len(products)} products.")
+                self._report_filter(page)
                 await context.close(); await browser.close()
                 return products
 
@@ -129,9 +217,119 @@ class StockXBrowseAPI:
                 raise RuntimeError("Failed to parse JSON body.")
             products = data.get("Products") or data.get("products") or []
             print(f"✅ Retrieved {len(products)} products.")
+            self._report_filter(page)
             await context.close(); await browser.close()
             return products
-# ...existing code...
+
+    async def _open_homepage(self, page):
+        print("🌐 Opening homepage...")
+        await request_with_backoff_async(
+            "https://stockx.com", lambda: page.goto("https://stockx.com", wait_until="domcontentloaded"),
+        )
+        if self.session is not None and not looks_blocked(200, await page.content()):
+            # Past the bot check: later calls can go over plain HTTP
+            self.session.adopt(await page.context.cookies())
+
+    def _url_keys(self, kind: str, text: str, limit: int) -> list[str]:
+        """urlKeys from one browse API response or search page"""
+        if kind == "api":
+            try:
+                data = json.loads(text)
+            except json.JSONDecodeError:
+                return []
+            products = data.get("Products") or data.get("products") or []
+        else:
+            next_data = next_data_script(text)
+            products = self._search_products(next_data or {}, text, limit)
+        return [p["urlKey"] for p in products if isinstance(p, dict) and p.get("urlKey")]
+
+    async def collect_urls(self, brands: Iterable[str], pages: int = 5, limit: int = 40, parallel: int = 4,
+                           retries: int = 3) -> AsyncIterator[str]:
+        """
+        Yield product URLs for `brands`, up to `pages` result pages each, from one browser session.
+
+        Pages are fetched in batches with in-page `fetch` calls (at most
+        `parallel` at once), so the warmed session's cookies apply and no
+        navigation happens per page. A brand whose browse API 404s switches
+        to search pages. URLs are deduped by urlKey across everything and
+        yielded as each batch lands, ready for the product-scrape queue.
+        """
+        seen = set()
+        jobs = deque((brand, 1, "api", 0) for brand in brands)  # (brand, page, kind, attempts)
+        blocks = 0
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=self.headless)
+            try:
+                context = await browser.new_context(**self.CONTEXT_OPTIONS)
+                if self.request_filter is not None:
+                    await self.request_filter.install(context)
+                page = await context.new_page()
+                self._track_filter(page)
+                await self._open_homepage(page)
+                if await self._wait_if_blocked(page):
+                    raise RuntimeError("Blocked by anti-bot on the homepage (headless).")
+
+                while jobs:
+                    batch = [jobs.popleft() for _ in range(min(len(jobs), parallel * 2))]
+                    urls = [
+                        self._browse_url(brand, limit, n) if kind == "api" else self._search_url(brand, n)
+                        for brand, n, kind, _ in batch
+                    ]
+                    for url in urls:
+                        await DEFAULT_LIMITER.wait_async(url)
+                    results = await page.evaluate(PARALLEL_FETCH_JS, {"urls": urls, "parallel": parallel})
+
+                    blocked = False
+                    for (brand, n, kind, attempts), url, result in zip(batch, urls, results):
+                        status = result["status"]
+                        DEFAULT_LIMITER.record(url, status or None, parse_retry_after(result.get("retryAfter")))
+                        if kind == "api" and status == 404:
+                            jobs.append((brand, n, "search", 0))
+                            continue
+                        challenged = status in (401, 403) or (
+                            status == 200 and kind == "search" and looks_blocked(status, result["text"])
+                        )
+                        if status != 200 or challenged:
+                            blocked = blocked or challenged
+                            if attempts + 1 < retries:
+                                jobs.append((brand, n, kind, attempts + 1))
+                            else:
+                                print(f"❌ Giving up on {url} (status {status})")
+                            continue
+
+                        keys = self._url_keys(kind, result["text"], limit)
+                        fresh = [k for k in keys if k not in seen]
+                        print(f"📄 {brand} {kind} page {n}: {len(keys)} products, {len(fresh)} new")
+                        for key in fresh:
+                            seen.add(key)
+                            yield f"https://stockx.com/{key}"
+                        if fresh and n < pages:
+                            jobs.append((brand, n + 1, kind, 0))
+
+                    if blocked:
+                        blocks += 1
+                        if self.headless or blocks > retries:
+                            raise RuntimeError("Blocked by anti-bot during bulk browse.")
+                        print("⚠️ Session challenged; re-warming on the homepage")
+                        await self._open_homepage(page)
+                        await self._wait_if_blocked(page)
+                self._report_filter(page)
+            finally:
+                await browser.close()
+        print(f"✅ Bulk browse collected {len(seen)} unique products")
+
+    @staticmethod
+    def extract_urls(products: list[dict]) -> list[str]:
+        return [f"https://stockx.com/{p['urlKey']}" for p in products if p.get("urlKey")]
+
+    def _track_filter(self, page):
+        if self.request_filter is not None:
+            self.request_filter.track(page)
+
+    def _report_filter(self, page):
+        if self.request_filter is not None:
+            print(f"🚫 Filtered: {self.request_filter.page_stats(page).summary()}")
+
     def _extract_listing_urls(self, html: str) -> list[str]:
         soup = BeautifulSoup(html, "html.parser")
         anchors = soup.select('a[href^="/"]')
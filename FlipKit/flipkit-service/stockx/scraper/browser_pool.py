@@ -0,0 +1,178 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, List, Optional
+
+from playwright.async_api import async_playwright, Error as PlaywrightError  # type: ignore
+
+
+class _PooledContext:
+    def __init__(self, context):
+        self.context = context
+        self.pages_served = 0
+        self.broken = False
+
+
+class BrowserPool:
+    """
+    One long-lived Chromium with a set of warm, reusable browser contexts.
+
+    Contexts keep their cookies between pages, so a challenge solved once
+    stays solved for the rest of the run. A context is recycled after
+    `max_pages_per_context` pages or when a page on it crashes; recycling
+    carries the cookies/localStorage over via `storage_state`. If the
+    browser itself disconnects it is relaunched on the next checkout.
+
+        async with BrowserPool(headless=True) as pool:
+            async with pool.page() as page:
+                await page.goto(url)
+    """
+
+    def __init__(self, headless: bool = True, size: int = 1, max_pages_per_context: int = 50,
+                 launch_args: Optional[List[str]] = None, context_options: Optional[dict] = None,
+                 setup_context: Optional[Callable[[object], Awaitable[None]]] = None):
+        self.headless = headless
+        self.size = size
+        self.max_pages_per_context = max_pages_per_context
+        self.launch_args = launch_args or []
+        self.context_options = context_options or {}
+        self.setup_context = setup_context
+        self._playwright = None
+        self._browser = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._contexts: List[_PooledContext] = []
+        self._restart_lock = asyncio.Lock()
+        self.launches = 0
+        self.recycled = 0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def start(self) -> None:
+        self._playwright = await async_playwright().start()
+        self._idle = asyncio.Queue()
+        await self._launch()
+
+    async def close(self) -> None:
+        for pooled in self._contexts:
+            try:
+                await pooled.context.close()
+            except PlaywrightError:
+                pass
+        self._contexts = []
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except PlaywrightError:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _launch(self) -> None:
+        print("🚀 Launching Chromium for the browser pool")
+        self._browser = await self._playwright.chromium.launch(headless=self.headless, args=self.launch_args)
+        self.launches += 1
+        self._contexts = []
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        for _ in range(self.size):
+            self._idle.put_nowait(await self._new_context())
+
+    async def _new_context(self, storage_state=None) -> _PooledContext:
+        options = dict(self.context_options)
+        if storage_state is not None:
+            options["storage_state"] = storage_state
+        context = await self._browser.new_context(**options)
+        if self.setup_context is not None:
+            await self.setup_context(context)
+        pooled = _PooledContext(context)
+        self._contexts.append(pooled)
+        return pooled
+
+    async def _recycle(self, pooled: _PooledContext) -> _PooledContext:
+        """Replace a worn-out or crashed context, keeping its cookies when it can still export them"""
+        state = None
+        if not pooled.broken:
+            try:
+                state = await pooled.context.storage_state()
+            except PlaywrightError:
+                state = None
+        try:
+            await pooled.context.close()
+        except PlaywrightError:
+            pass
+        try:
+            fresh = await self._new_context(storage_state=state)
+        except PlaywrightError:
+            pooled.broken = True  # Stays in the pool; the next checkout retries
+            raise
+        self._contexts.remove(pooled)
+        self.recycled += 1
+        return fresh
+
+    async def _ensure_browser(self) -> None:
+        if self._browser is not None and self._browser.is_connected():
+            return
+        async with self._restart_lock:
+            if self._browser is None or not self._browser.is_connected():
+                print("⚠️ Browser disconnected; relaunching")
+                await self._launch()
+
+    async def _checkout(self) -> _PooledContext:
+        await self._ensure_browser()
+        while True:
+            pooled = await self._idle.get()
+            if pooled in self._contexts:
+                break  # Contexts from before a relaunch are dropped
+        if pooled.broken:
+            try:
+                pooled = await self._recycle(pooled)
+            except PlaywrightError:
+                self._checkin(pooled)
+                raise
+        return pooled
+
+    def _checkin(self, pooled: _PooledContext) -> None:
+        if pooled in self._contexts:
+            self._idle.put_nowait(pooled)
+
+    @asynccontextmanager
+    async def page(self):
+        """Check out a fresh page on a warm context; the page is closed on exit"""
+        pooled = await self._checkout()
+        page = None
+        try:
+            try:
+                page = await pooled.context.new_page()
+            except PlaywrightError:
+                pooled.broken = True
+                raise
+            # Navigation errors leave the context usable; only a crash retires it
+            page.on("crash", lambda _: setattr(pooled, "broken", True))
+            yield page
+        finally:
+            if page is not None and not page.is_closed():
+                try:
+                    await page.close()
+                except PlaywrightError:
+                    pooled.broken = True
+            pooled.pages_served += 1
+            if pooled.broken or pooled.pages_served >= self.max_pages_per_context:
+                try:
+                    pooled = await self._recycle(pooled)
+                except PlaywrightError as e:
+                    print(f"⚠️ Could not recycle browser context: {e}")
+            self._checkin(pooled)
+
+    def stats(self) -> dict:
+        return {
+            "launches": self.launches,
+            "contexts": len(self._contexts),
+            "recycled": self.recycled,
+            "pagesServed": sum(p.pages_served for p in self._contexts),
+        }
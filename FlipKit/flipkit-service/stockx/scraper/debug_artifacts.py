@@ -0,0 +1,89 @@
+import asyncio
+import itertools
+import json
+import os
+import random
+import re
+import shutil
+import time
+from typing import Optional
+
+from playwright.async_api import Error as PlaywrightError  # type: ignore
+
+MODES = ("off", "failures", "sampled")
+DEFAULT_DIR = os.getenv("DEBUG_ARTIFACTS_DIR", "debug_artifacts")
+
+
+def _slug(url: str, limit: int = 60) -> str:
+    path = re.sub(r"^https?://", "", url).strip("/")
+    return re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-")[:limit] or "page"
+
+
+class ArtifactRecorder:
+    """
+    Opt-in capture of page HTML and screenshots for debugging scrapes.
+
+    Modes: "off" (default) records nothing; "failures" records blocked,
+    errored and unparseable pages; "sampled" also records `sample_rate` of
+    successful pages. Each capture gets its own directory named after the
+    time and URL, and only the newest `keep` are kept. Files are written on
+    a worker thread so the event loop never waits on disk.
+
+        DEBUG_ARTIFACTS=failures python run_scraper.py
+    """
+
+    def __init__(self, mode: Optional[str] = None, directory: str = DEFAULT_DIR, keep: int = 20,
+                 sample_rate: Optional[float] = None):
+        mode = (mode or os.getenv("DEBUG_ARTIFACTS", "off")).lower()
+        if mode not in MODES:
+            raise ValueError(f"Unknown debug artifact mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self.directory = directory
+        self.keep = keep
+        self.sample_rate = float(os.getenv("DEBUG_ARTIFACTS_SAMPLE", "0.05")) if sample_rate is None else sample_rate
+        self._seq = itertools.count()
+
+    def wants(self, failed: bool) -> bool:
+        if self.mode == "off":
+            return False
+        if failed:
+            return True
+        return self.mode == "sampled" and random.random() < self.sample_rate
+
+    async def capture(self, url: str, reason: str, page=None, html: Optional[str] = None,
+                      failed: bool = True) -> Optional[str]:
+        """Record `page` (or just `html`) for `url`; returns the capture directory, if one was written"""
+        if not self.wants(failed):
+            return None
+        screenshot = None
+        if page is not None and not page.is_closed():
+            try:
+                screenshot = await page.screenshot(full_page=False)
+                if html is None:
+                    html = await page.content()
+            except PlaywrightError:
+                pass
+        target = await asyncio.to_thread(self._write, url, reason, html, screenshot)
+        print(f"📸 Debug artifacts saved to {target}")
+        return target
+
+    def _write(self, url: str, reason: str, html: Optional[str], screenshot: Optional[bytes]) -> str:
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        target = os.path.join(self.directory, f"{stamp}-{next(self._seq) % 10000:04d}-{reason}-{_slug(url)}")
+        os.makedirs(target, exist_ok=True)
+        if html is not None:
+            with open(os.path.join(target, "page.html"), "w", encoding="utf-8") as f:
+                f.write(html)
+        if screenshot is not None:
+            with open(os.path.join(target, "screenshot.png"), "wb") as f:
+                f.write(screenshot)
+        with open(os.path.join(target, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"url": url, "reason": reason, "capturedAt": stamp}, f, indent=2)
+        self._prune()
+        return target
+
+    def _prune(self) -> None:
+        """Ring buffer: drop the oldest captures beyond `keep`"""
+        entries = sorted((e for e in os.scandir(self.directory) if e.is_dir()), key=lambda e: e.name)
+        for entry in entries[:max(0, len(entries) - self.keep)]:
+            shutil.rmtree(entry.path, ignore_errors=True)
@@ -0,0 +1,124 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+import httpx  # type: ignore
+
+# Shared service modules are on sys.path via scraper.py
+from rate_limit import request_with_backoff_async
+
+# Text that means we got a challenge/block page rather than content
+BLOCK_SIGNALS = (
+    "access denied",
+    "captcha",
+    "unusual traffic",
+    "verify you are a human",
+)
+BLOCK_STATUSES = {401, 403}
+
+# Browser-only headers that would make a plain HTTP client look odd
+_SKIPPED_HEADERS = {"accept-encoding", "connection", "upgrade-insecure-requests"}
+
+
+def looks_blocked(status: int, text: str) -> bool:
+    if status in BLOCK_STATUSES:
+        return True
+    lowered = text.lower()
+    return any(signal in lowered for signal in BLOCK_SIGNALS)
+
+
+class HybridSession:
+    """
+    Plain-HTTP fetching with cookies from a browser that passed the bot check.
+
+    The browser solves the challenge once; `adopt` copies its cookies into a
+    pooled httpx client sending the same user agent and headers, and later
+    pages and API calls are fetched directly. When a response looks blocked
+    the session is dropped and the caller falls back to the browser, which
+    re-solves and hands over fresh cookies.
+    """
+
+    def __init__(self, user_agent: str, headers: Optional[Dict[str, str]] = None, max_connections: int = 10,
+                 timeout: float = 20.0):
+        self.headers = {k: v for k, v in (headers or {}).items() if k.lower() not in _SKIPPED_HEADERS}
+        self.headers["User-Agent"] = user_agent
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.timeout = timeout
+        self.client: Optional[httpx.AsyncClient] = None
+        self._retired = []  # Dropped clients may still have requests in flight; closed in aclose
+        self.direct = 0
+        self.fallbacks = 0
+        self.adoptions = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.client is not None
+
+    def adopt(self, cookies: Iterable[dict]) -> None:
+        """Take over a browser context's cookies (Playwright `context.cookies()` format)"""
+        jar = httpx.Cookies()
+        for cookie in cookies:
+            jar.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                headers=self.headers, cookies=jar, limits=self.limits, timeout=self.timeout, follow_redirects=True,
+            )
+        else:
+            self.client.cookies = jar
+        self.adoptions += 1
+
+    def invalidate(self) -> None:
+        if self.client is not None:
+            self._retired.append(self.client)
+            self.client = None
+
+    async def aclose(self) -> None:
+        self.invalidate()
+        for client in self._retired:
+            await client.aclose()
+        self._retired = []
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None,
+                    cache=None) -> Optional[Tuple[int, str]]:
+        """
+        (status, text) fetched without the browser, or None when the browser is needed.
+
+        None means no session yet, a transport error, or a block page; in the
+        last case the session is dropped so the next browser load replaces it.
+        With a FetchCache, fresh copies are served from disk and block pages
+        are never stored.
+        """
+        client = self.client
+        if client is None:
+            return None
+
+        async def send(conditional: Dict[str, str]):
+            response = await request_with_backoff_async(
+                url, lambda: client.get(url, headers={**(headers or {}), **conditional}), retries=2,
+            )
+            status = response.status_code
+            if status == 200 and looks_blocked(status, response.text):
+                status = 403  # Keep challenge pages out of the cache
+            return status, dict(response.headers), response.content
+
+        try:
+            if cache is None:
+                status, _, body = await send({})
+                text = body.decode("utf-8", errors="replace")
+            else:
+                cached = await cache.fetch_async(url, send, {**self.headers, **(headers or {})})
+                status, text = cached.status, cached.text
+        except httpx.HTTPError as e:
+            print(f"⚠️ Direct fetch failed for {url}: {e}")
+            self.fallbacks += 1
+            return None
+
+        if looks_blocked(status, text):
+            print(f"🛑 Direct fetch blocked ({status}); handing back to the browser")
+            self.fallbacks += 1
+            if client is self.client:
+                self.invalidate()
+            return None
+        self.direct += 1
+        return status, text
+
+    def stats(self) -> Dict:
+        return {"direct": self.direct, "fallbacks": self.fallbacks, "adoptions": self.adoptions}
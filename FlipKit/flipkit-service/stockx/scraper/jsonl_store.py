@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+
+class JsonlProductStore:
+    """
+    Append-only product log: one JSON object per line, keyed by `id`.
+
+    Appends are flushed and fsync'd, so a crash loses at most the line being
+    written; a torn last line is truncated away on open. An id→offset index
+    is built by streaming the file once, so lookups and membership checks
+    never load the whole log. Re-saving an id appends a newer version;
+    `compact` rewrites the log with only the latest versions, atomically.
+    """
+
+    def __init__(self, path: str, key: str = "id"):
+        self.path = path
+        self.key = key
+        self.index: Dict[str, int] = {}
+        self.lines = 0  # Lines in the log, including superseded versions
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _load_index(self) -> None:
+        self.index = {}
+        self.lines = 0
+        if not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        good_end = 0
+        with open(self.path, "rb") as f:
+            for offset, record in self._scan(f):
+                if record is None:
+                    if f.tell() < size:
+                        print(f"⚠️ Skipping unreadable line at byte {offset} of {self.path}")
+                        good_end = f.tell()
+                    continue
+                good_end = f.tell()
+                self.lines += 1
+                rid = record.get(self.key)
+                if rid is not None:
+                    self.index[str(rid)] = offset
+        if good_end < size:
+            # Only the last append can be torn by a crash
+            print(f"⚠️ Dropping a torn record at the end of {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(good_end)
+                os.fsync(f.fileno())
+
+    @staticmethod
+    def _scan(f) -> Iterator[Tuple[int, Optional[dict]]]:
+        """(offset, record) per line; record is None for a torn or unparseable line"""
+        while True:
+            offset = f.tell()
+            line = f.readline()
+            if not line:
+                return
+            try:
+                record = json.loads(line) if line.endswith(b"\n") else None
+            except json.JSONDecodeError:
+                record = None
+            yield offset, record if isinstance(record, dict) else None
+
+    def __contains__(self, rid) -> bool:
+        return str(rid) in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def get(self, rid) -> Optional[dict]:
+        offset = self.index.get(str(rid))
+        if offset is None:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def append(self, record: dict) -> None:
+        rid = record.get(self.key)
+        if rid is None:
+            raise ValueError(f"Record has no {self.key!r}")
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.index[str(rid)] = offset
+            self.lines += 1
+
+    def __iter__(self) -> Iterator[dict]:
+        """Latest version of each record, in log order, streamed from disk"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            for offset, record in self._scan(f):
+                if record is not None and self.index.get(str(record.get(self.key))) == offset:
+                    yield record
+
+    def garbage_ratio(self) -> float:
+        return 1 - len(self.index) / self.lines if self.lines else 0.0
+
+    def compact(self) -> None:
+        """Rewrite the log with only live records; readers see the old or new file, never a mix"""
+        with self._lock:
+            tmp = f"{self.path}.compact.tmp"
+            with open(tmp, "wb") as out:
+                for record in self:
+                    out.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp, self.path)
+            _fsync_dir(os.path.dirname(os.path.abspath(self.path)))
+            self._load_index()
+
+    def compact_if_needed(self, threshold: float = 0.3) -> bool:
+        if self.garbage_ratio() <= threshold:
+            return False
+        self.compact()
+        return True
+
+    def import_json(self, path: str, list_key: str = "products") -> int:
+        """One-off migration from a `{"products": [...]}` JSON file; ids already present are skipped"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        added = 0
+        for record in data.get(list_key, []) if isinstance(data, dict) else []:
+            if record.get(self.key) is not None and record[self.key] not in self:
+                self.append(record)
+                added += 1
+        return added
+
+
+def _fsync_dir(directory: str) -> None:
+    # Makes the rename durable; not supported on Windows
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,124 @@
+import json
+import re
+from typing import Iterator, Optional, Tuple
+
+# Opening <script ...> tags; the attribute list can't contain '>' outside quotes in practice
+_SCRIPT_OPEN = re.compile(r"<script\b[^>]*>", re.IGNORECASE)
+_SCRIPT_CLOSE = re.compile(r"</script\s*>", re.IGNORECASE)
+_NEXT_DATA_ID = re.compile(r"""\bid\s*=\s*["']?__NEXT_DATA__\b""", re.IGNORECASE)
+_WINDOW_ASSIGN = re.compile(r"window\.__NEXT_DATA__\s*=\s*")
+
+
+def balanced_object_end(text: str, start: int) -> int:
+    """
+    Index just past the JSON object/array opening at `text[start]`, or -1 if it never closes.
+
+    One pass; braces inside strings and escaped quotes are skipped.
+    """
+    depth = 0
+    in_string = False
+    i = start
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if in_string:
+            if ch == "\\":
+                i += 2
+                continue
+            if ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{" or ch == "[":
+            depth += 1
+        elif ch == "}" or ch == "]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return -1
+
+
+def iter_scripts(html: str) -> Iterator[Tuple[int, int, str]]:
+    """(body_start, body_end, open_tag) for each <script> element, in document order"""
+    pos = 0
+    while True:
+        opening = _SCRIPT_OPEN.search(html, pos)
+        if opening is None:
+            return
+        closing = _SCRIPT_CLOSE.search(html, opening.end())
+        if closing is None:
+            return
+        yield opening.end(), closing.start(), opening.group(0)
+        pos = closing.end()
+
+
+def _loads_object(text: str, start: int, stop: int) -> Optional[dict]:
+    """Parse the balanced object starting at the first '{' in text[start:stop]"""
+    brace = text.find("{", start, stop)
+    if brace == -1:
+        return None
+    end = balanced_object_end(text, brace)
+    if end == -1 or end > stop:
+        return None
+    try:
+        return json.loads(text[brace:end])
+    except json.JSONDecodeError:
+        return None
+
+
+def next_data_script(html: str) -> Optional[dict]:
+    """The JSON in <script id="__NEXT_DATA__">, located by offset without parsing the page"""
+    for body_start, body_end, tag in iter_scripts(html):
+        if _NEXT_DATA_ID.search(tag):
+            try:
+                return json.loads(html[body_start:body_end])
+            except json.JSONDecodeError as e:
+                print(f"⚠️ __NEXT_DATA__ JSON error: {e}")
+                return None
+    return None
+
+
+def next_data_assignment(html: str) -> Optional[dict]:
+    """The object assigned by an inline `window.__NEXT_DATA__ = {...}`"""
+    for match in _WINDOW_ASSIGN.finditer(html):
+        data = _loads_object(html, match.end(), len(html))
+        if data is not None:
+            return data
+    return None
+
+
+def embedded_object(html: str, marker: str) -> Optional[dict]:
+    """
+    The first top-level JSON object in a script mentioning `marker`.
+
+    Each script body is walked once: a balanced object is tried from its
+    first '{', and scanning resumes after it when that object doesn't parse.
+    """
+    for body_start, body_end, _ in iter_scripts(html):
+        if html.find(marker, body_start, body_end) == -1:
+            continue
+        pos = body_start
+        while pos < body_end:
+            brace = html.find("{", pos, body_end)
+            if brace == -1:
+                break
+            end = balanced_object_end(html, brace)
+            if end == -1 or end > body_end:
+                break
+            if html.find(marker, brace, end) != -1:
+                try:
+                    return json.loads(html[brace:end])
+                except json.JSONDecodeError:
+                    pass
+            pos = end
+    return None
+
+
+def extract_next_data(html: str) -> Optional[dict]:
+    """Product page data: the __NEXT_DATA__ script, the window assignment, then a GetProduct blob"""
+    return (
+        next_data_script(html)
+        or next_data_assignment(html)
+        or embedded_object(html, "GetProduct")
+    )
@@ -3,48 +3,176 @@ import json
 import os
 import sys
 from scraper import StockXScraper
+from jsonl_store import JsonlProductStore
+from browse_api import StockXBrowseAPI
 
-PRODUCT_FILE = "all_products.json"
+# Shared service modules live three directories up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from fetch_cache import default_cache  # noqa: E402
+from ingest_pipeline import finish_pipeline, scraper_pipeline  # noqa: E402
+from url_frontier import UrlFrontier, canonical_url  # noqa: E402
 
-def _load_products():
-    if not os.path.exists(PRODUCT_FILE) or os.path.getsize(PRODUCT_FILE) == 0:
-        return {"products": []}
-    try:
-        with open(PRODUCT_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if not isinstance(data, dict) or "products" not in data:
-                raise ValueError("Invalid structure")
-            return data
-    except (json.JSONDecodeError, ValueError):
-        print("⚠️ Corrupt all_products.json; reinitializing.")
-        return {"products": []}
-
-def _save_products(data):
-    with open(PRODUCT_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-
-async def scrape_all(urls):
-    scraper = StockXScraper(headless=False)
-    existing = _load_products()
-    existing_ids = {p.get("id") for p in existing["products"] if p.get("id")}
-    for url in urls:
+CATALOG_CATEGORY = "stockx"
+
+PRODUCT_FILE = "all_products.jsonl"
+LEGACY_PRODUCT_FILE = "all_products.json"
+
+# Product pages scraped at once, and how long one URL may take (manual CAPTCHA solving included)
+CONCURRENCY = int(os.getenv("STOCKX_CONCURRENCY", "3"))
+URL_TIMEOUT = float(os.getenv("STOCKX_URL_TIMEOUT", "240"))
+
+# Per-URL progress across runs; failed URLs are retried up to MAX_ATTEMPTS times in total
+FRONTIER_DB = os.getenv("STOCKX_FRONTIER_DB", "frontier.db")
+MAX_ATTEMPTS = int(os.getenv("STOCKX_MAX_ATTEMPTS", "3"))
+
+# Fetch over plain HTTP with the browser's cookies once it has passed the bot check (opt-in)
+HYBRID = os.getenv("STOCKX_HYBRID", "0") == "1"
+
+# Browser windows are shown so CAPTCHAs can be solved by hand; run unattended with
+# STOCKX_HEADLESS=1 or --headless (blocked pages then fail instead of waiting)
+HEADLESS = os.getenv("STOCKX_HEADLESS", "0") == "1"
+
+# Result pages per brand for `run_scraper.py browse <brand> ...`
+BROWSE_PAGES = int(os.getenv("STOCKX_BROWSE_PAGES", "5"))
+
+def _open_store():
+    store = JsonlProductStore(PRODUCT_FILE)
+    if not os.path.exists(PRODUCT_FILE) and os.path.exists(LEGACY_PRODUCT_FILE):
+        try:
+            added = store.import_json(LEGACY_PRODUCT_FILE)
+            print(f"📦 Migrated {added} products from {LEGACY_PRODUCT_FILE} to {PRODUCT_FILE}")
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"⚠️ Could not migrate {LEGACY_PRODUCT_FILE}: {e}")
+    return store
+
+async def _scrape_one(scraper, url, semaphore, timeout, frontier):
+    """Scrape one URL under the concurrency cap; failures come back as values, never raised"""
+    async with semaphore:
+        await asyncio.to_thread(frontier.start, url)
         print(f"\n🔍 Scraping: {url}\n")
         try:
-            product = await scraper.scrape(url)
-            pid = product.get("id")
-            if pid in existing_ids:
+            return url, await asyncio.wait_for(scraper.scrape(url), timeout), None
+        except asyncio.TimeoutError:
+            return url, None, TimeoutError(f"timed out after {timeout:.0f}s")
+        except Exception as e:
+            return url, None, e
+
+async def _iter_urls(urls):
+    if hasattr(urls, "__aiter__"):
+        async for url in urls:
+            yield url
+    else:
+        for url in urls:
+            yield url
+
+async def _feed(urls, frontier):
+    """Runnable URLs: work left in the frontier first, then new URLs as `urls` produces them"""
+    queued = await asyncio.to_thread(frontier.runnable)
+    print(f"🧭 Frontier: {len(queued)} URL(s) to resume, {await asyncio.to_thread(frontier.stats)}")
+    for url in queued:
+        yield url
+    async for url in _iter_urls(urls):
+        if await asyncio.to_thread(frontier.add, [url]):
+            yield canonical_url(url)
+
+async def scrape_all(urls, concurrency=CONCURRENCY, timeout=URL_TIMEOUT, browse_api=None, headless=HEADLESS):
+    """
+    Scrape `urls` with up to `concurrency` pages open at once, one warm context each.
+
+    `urls` may be a list or an async iterable (e.g. StockXBrowseAPI.collect_urls),
+    in which case scraping starts while URLs are still arriving; pass the
+    StockXBrowseAPI as `browse_api` to let it share the hybrid session.
+    Browsers are visible unless `headless` is set.
+    Results are saved as they finish, in completion order; a failing or
+    hung URL only loses that URL. Progress is recorded in the frontier, so
+    URLs finished by earlier runs are skipped without a fetch and an
+    interrupted run picks up where it stopped; its SQLite writes run in worker
+    threads, like the store's fsyncs. Saved products are fed to one
+    ingest pipeline for the whole run, which writes them to the catalog
+    store (when there is one) in batches off the event loop.
+    """
+    store = _open_store()
+    frontier = await asyncio.to_thread(UrlFrontier, FRONTIER_DB, MAX_ATTEMPTS)
+    pipeline = scraper_pipeline(CATALOG_CATEGORY, "stockx")
+    if pipeline is not None:
+        await pipeline.start()
+    saved = failed = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    results = asyncio.Queue()
+    tasks = set()
+
+    async def run(url):
+        await results.put(await _scrape_one(scraper, url, semaphore, timeout, frontier))
+
+    async def produce():
+        count = 0
+        try:
+            async for url in _feed(urls, frontier):
+                task = asyncio.create_task(run(url))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                count += 1
+        except Exception as e:
+            print(f"❌ URL source failed: {e}")
+        await results.put(count)  # How many results to expect
+
+    # One browser for the whole run; each URL gets a fresh page on a warm context
+    async with StockXScraper(headless=headless, fetch_cache=default_cache(), pool_size=concurrency,
+                             hybrid=HYBRID) as scraper:
+        if browse_api is not None and scraper.session is not None:
+            browse_api.session = scraper.session
+        producer = asyncio.create_task(produce())
+        expected, handled = None, 0
+        while expected is None or handled < expected:
+            item = await results.get()
+            if isinstance(item, int):
+                expected = item
+                continue
+            handled += 1
+            url, product, error = item
+            if error is not None:
+                failed += 1
+                await asyncio.to_thread(frontier.failed, url, str(error) or type(error).__name__)
+                print(f"❌ Error scraping {url}: {error}")
+                continue
+            if product.get("id") in store:
+                await asyncio.to_thread(frontier.done, url, product.get("id"))
                 print(f"⏭ Already saved: {product.get('title')}")
                 continue
-            existing["products"].append(product)
-            existing_ids.add(pid)
-            _save_products(existing)
+            try:
+                await asyncio.to_thread(store.append, product)  # Flushes and fsyncs
+            except Exception as e:
+                failed += 1
+                await asyncio.to_thread(frontier.failed, url, f"save failed: {e}")
+                print(f"❌ Error saving {url}: {e}")
+                continue
+            await asyncio.to_thread(frontier.done, url, product.get("id"))
+            saved += 1
             print(f"✅ Saved: {product.get('title')}")
-        except Exception as e:
-            print(f"❌ Error scraping {url}: {e}")
-    print("\n🎉 DONE — All products saved to all_products.json")
+            # The product is safe in the JSONL store, so a catalog ingest failure doesn't fail the URL;
+            # once the pipeline has failed it stops being fed and finish_pipeline reports why
+            if pipeline is not None and pipeline.error is None:
+                try:
+                    await pipeline.put({**product, "link": url})
+                except Exception as e:
+                    print(f"⚠️ Catalog ingest stopped at {url}: {e}")
+        await producer
+    await finish_pipeline(pipeline)
+    print(f"🧭 Frontier: {await asyncio.to_thread(frontier.stats)}")
+    await asyncio.to_thread(frontier.close)
+    if await asyncio.to_thread(store.compact_if_needed):
+        print(f"🗜️ Compacted {PRODUCT_FILE}")
+    print(f"\n🎉 DONE — {saved} saved, {failed} failed; {len(store)} products in {PRODUCT_FILE}")
+    if scraper.fetch_cache is not None:
+        print(f"🗃️ Fetch cache: {scraper.fetch_cache.stats()}")
+
+async def scrape_brands(brands, pages=BROWSE_PAGES, headless=HEADLESS):
+    """Collect product URLs for `brands` in one browse session and scrape them as they stream in"""
+    api = StockXBrowseAPI(headless=headless)
+    await scrape_all(api.collect_urls(brands, pages=pages), browse_api=api, headless=headless)
 
-async def scrape_single(url: str):
-    scraper = StockXScraper(headless=False)
+async def scrape_single(url: str, headless=HEADLESS):
+    scraper = StockXScraper(headless=headless)
     try:
         product = await scraper.scrape(url)
         print(json.dumps(product, indent=2))
@@ -55,8 +183,17 @@ async def scrape_single(url: str):
         print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
-    if len(sys.argv) >= 3 and sys.argv[1] == "single":
-        asyncio.run(scrape_single(sys.argv[2]))
+    args = [a for a in sys.argv[1:] if a != "--headless"]
+    headless = HEADLESS or len(args) < len(sys.argv) - 1
+    if len(args) >= 2 and args[0] == "single":
+        asyncio.run(scrape_single(args[1], headless=headless))
+    elif len(args) >= 2 and args[0] == "browse":
+        asyncio.run(scrape_brands(args[1:], headless=headless))
+    elif len(args) >= 1 and args[0] in ("status", "retry"):
+        frontier = UrlFrontier(FRONTIER_DB, max_attempts=MAX_ATTEMPTS)
+        if args[0] == "retry":
+            print(f"🔁 {frontier.retry_failed()} failed URL(s) queued again")
+        print(json.dumps({"stats": frontier.stats(), "recentFailures": frontier.failures()}, indent=2))
     else:
         urls_path = "product_urls.txt"
         if not os.path.exists(urls_path):
@@ -67,4 +204,4 @@ if __name__ == "__main__":
         if not URLS:
             print("No URLs found in product_urls.txt")
             sys.exit(0)
-        asyncio.run(scrape_all(URLS))
\ No newline at end of file
+        asyncio.run(scrape_all(URLS, headless=headless))
\ No newline at end of file
@@ -1,15 +1,81 @@
 import asyncio
-from playwright.async_api import async_playwright, Error as PlaywrightError #type: ignore
-from bs4 import BeautifulSoup #type: ignore
+from playwright.async_api import Error as PlaywrightError #type: ignore
 import json
 import importlib
+import os
 import re
+import sys
+
+# Shared service modules live three directories up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from fetch_cache import install_route_cache  # noqa: E402
+from rate_limit import request_with_backoff_async  # noqa: E402
+from request_filter import DEFAULT_BLOCKED_TYPES, DEFAULT_DENY, default_filter  # noqa: E402
+from browser_pool import BrowserPool  # noqa: E402
+from next_data import extract_next_data  # noqa: E402
+from debug_artifacts import ArtifactRecorder  # noqa: E402
+from hybrid import HybridSession, looks_blocked  # noqa: E402
+
+_CAPTCHA = re.compile("captcha", re.IGNORECASE)
+
+LAUNCH_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+]
+
+CONTEXT_OPTIONS = {
+    "user_agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+    "viewport": {'width': 1920, 'height': 1080},
+    "locale": 'en-US',
+    "timezone_id": 'America/New_York',
+    "extra_http_headers": {
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+        'Sec-Fetch-Dest': 'document',
+        'Sec-Fetch-Mode': 'navigate',
+        'Sec-Fetch-Site': 'none',
+        'Sec-Fetch-User': '?1',
+    },
+}
+
+# Product data is the inline __NEXT_DATA__ script, so page styling and media can go
+BLOCKED_TYPES = DEFAULT_BLOCKED_TYPES + ("stylesheet",)
+DENY_REQUESTS = DEFAULT_DENY
+# Bot-challenge providers must load in full or the CAPTCHA can't be shown or solved
+ALLOW_REQUESTS = (
+    "*://*.perimeterx.net/*",
+    "*://*.px-cdn.net/*",
+    "*://*.px-cloud.net/*",
+    "*://*.pxchk.net/*",
+    "*://challenges.cloudflare.com/*",
+)
 
 class StockXScraper:
-    def __init__(self, headless=True, captcha_api_key=None, manual_captcha_timeout=180):
+    def __init__(self, headless=True, captcha_api_key=None, manual_captcha_timeout=180, fetch_cache=None,
+                 pool_size=1, max_pages_per_context=50, block_resources=True, artifacts=None, hybrid=False):
         self.headless = headless
         self.captcha_api_key = captcha_api_key
         self.manual_captcha_timeout = manual_captcha_timeout  # seconds
+        self.fetch_cache = fetch_cache  # Optional FetchCache for product documents
+        self.pool_size = pool_size
+        self.max_pages_per_context = max_pages_per_context
+        self.pool = None  # BrowserPool while inside `async with`
+        # Debug HTML/screenshots; off unless DEBUG_ARTIFACTS=failures|sampled
+        self.artifacts = artifacts or ArtifactRecorder()
+        # Hybrid mode: after the browser passes the bot check, fetch pages over plain HTTP with its cookies
+        self.session = (
+            HybridSession(CONTEXT_OPTIONS["user_agent"], CONTEXT_OPTIONS["extra_http_headers"]) if hybrid else None
+        )
+        # Also disabled process-wide with BLOCK_RESOURCES=0
+        self.request_filter = (
+            default_filter(block_types=BLOCKED_TYPES, deny=DENY_REQUESTS, allow=ALLOW_REQUESTS)
+            if block_resources else None
+        )
 
     async def _wait_for_next_data_or_timeout(self, page):
         """Poll for __NEXT_DATA__ while showing a countdown; exit if page closed."""
@@ -31,130 +97,115 @@ class StockXScraper:
                 await page.wait_for_timeout(step * 1000)
         raise TimeoutError(f"Timed out after {total}s waiting for product data.")
 
+    def _make_pool(self) -> BrowserPool:
+        return BrowserPool(
+            headless=self.headless,
+            size=self.pool_size,
+            max_pages_per_context=self.max_pages_per_context,
+            launch_args=LAUNCH_ARGS,
+            context_options=CONTEXT_OPTIONS,
+            setup_context=self._setup_context,
+        )
+
+    async def _setup_context(self, context):
+        # Keep Playwright waits reasonable; the manual wait is handled by our loop.
+        context.set_default_timeout(30000)
+        context.set_default_navigation_timeout(60000)
+        if self.fetch_cache is not None:
+            await install_route_cache(context, self.fetch_cache, resource_types=("document",))
+        if self.request_filter is not None:
+            # Registered last so it runs first; allowed requests fall back to the cache
+            await self.request_filter.install(context)
+
+    async def __aenter__(self):
+        """Start one browser for the whole run: `async with StockXScraper() as scraper:`"""
+        self.pool = self._make_pool()
+        await self.pool.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        if self.pool is not None:
+            print(f"🧹 Browser pool: {self.pool.stats()}")
+            if self.request_filter is not None:
+                print(f"🚫 Request filter: {self.request_filter.stats()}")
+            await self.pool.close()
+            self.pool = None
+        if self.session is not None:
+            print(f"⚡ Hybrid session: {self.session.stats()}")
+            await self.session.aclose()
+
     async def fetch_page(self, url: str):
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=self.headless,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage',
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                ]
-            )
-            
-            context = await browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
-                viewport={'width': 1920, 'height': 1080},
-                locale='en-US',
-                timezone_id='America/New_York',
-                extra_http_headers={
-                    'Accept-Language': 'en-US,en;q=0.9',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1',
-                    'Sec-Fetch-Dest': 'document',
-                    'Sec-Fetch-Mode': 'navigate',
-                    'Sec-Fetch-Site': 'none',
-                    'Sec-Fetch-User': '?1',
-                }
+        if self.session is not None:
+            fetched = await self.session.fetch(url, cache=self.fetch_cache)
+            if fetched is not None:
+                print(f"⚡ Fetched directly ({fetched[0]}): {url}")
+                return fetched[1]
+        if self.pool is not None:
+            async with self.pool.page() as page:
+                return await self._load_page(page, url)
+        # Used outside `async with`: a one-off browser, as before
+        async with self._make_pool() as pool:
+            async with pool.page() as page:
+                return await self._load_page(page, url)
+
+    async def _load_page(self, page, url: str):
+        print("🌐 Navigating to", url)
+        if self.request_filter is not None:
+            self.request_filter.track(page)
+        try:
+            # Paced per host; 429/503 responses back off and retry
+            await request_with_backoff_async(
+                url, lambda: page.goto(url, wait_until="domcontentloaded", timeout=60000), retries=2,
             )
+            print("✅ Page loaded (domcontentloaded)")
+            await page.wait_for_timeout(3000)
+
+            title = await page.title()
+            print(f"📄 Page title: {title}")
 
-            # Keep Playwright waits reasonable; the manual wait is handled by our loop.
-            context.set_default_timeout(30000)
-            context.set_default_navigation_timeout(60000)
+            blocked = "access denied" in title.lower() or "captcha" in title.lower()
+            if blocked:
+                if not self.headless:
+                    print(f"⚠️ CAPTCHA/Block detected. Please solve it in the browser.")
+                    print(f"⏳ You have up to {self.manual_captcha_timeout}s...")
+                    await self._wait_for_next_data_or_timeout(page)
+                else:
+                    await self.artifacts.capture(url, "blocked", page)
+                    raise ValueError("StockX blocked the request (headless).")
 
-            page = await context.new_page()
-            print("🌐 Navigating to", url)
+            # If not blocked (or solved), ensure data exists (short extra wait)
             try:
-                await page.goto(url, wait_until="domcontentloaded", timeout=60000)
-                print("✅ Page loaded (domcontentloaded)")
-                await page.wait_for_timeout(3000)
-
-                title = await page.title()
-                print(f"📄 Page title: {title}")
-
-                blocked = "access denied" in title.lower() or "captcha" in title.lower()
-                if blocked:
-                    if not self.headless:
-                        print(f"⚠️ CAPTCHA/Block detected. Please solve it in the browser.")
-                        print(f"⏳ You have up to {self.manual_captcha_timeout}s...")
-                        await self._wait_for_next_data_or_timeout(page)
-                    else:
-                        await page.screenshot(path="blocked.png")
-                        print("📸 Screenshot saved as blocked.png")
-                        raise ValueError("StockX blocked the request (headless).")
-
-                # If not blocked (or solved), ensure data exists (short extra wait)
-                try:
-                    await page.wait_for_selector('script#__NEXT_DATA__', timeout=15000)
-                    print("✅ Found __NEXT_DATA__ script")
-                except PlaywrightError:
-                    print("⚠️ __NEXT_DATA__ not found yet, continuing...")
-
-            except Exception as e:
-                print(f"⚠️ Navigation error: {e}")
-                try:
-                    await page.screenshot(path="error_screenshot.png")
-                    print("📸 Screenshot saved as error_screenshot.png")
-                except PlaywrightError:
-                    pass
-
-            # If you closed the window, exit cleanly
-            if page.is_closed():
-                await context.close()
-                await browser.close()
-                raise RuntimeError("Browser/page was closed by user.")
+                await page.wait_for_selector('script#__NEXT_DATA__', timeout=15000)
+                print("✅ Found __NEXT_DATA__ script")
+            except PlaywrightError:
+                print("⚠️ __NEXT_DATA__ not found yet, continuing...")
 
-            content = await page.content()
+        except Exception as e:
+            print(f"⚠️ Navigation error: {e}")
+            if not isinstance(e, ValueError):  # Blocked pages were captured above
+                await self.artifacts.capture(url, "error", page)
+
+        if self.request_filter is not None:
+            print(f"🚫 Filtered: {self.request_filter.page_stats(page).summary()}")
+
+        # If you closed the window, exit cleanly
+        if page.is_closed():
+            raise RuntimeError("Browser/page was closed by user.")
 
-            with open("debug_page.html", "w", encoding="utf-8") as f:
-                f.write(content)
-            print("💾 Saved page HTML to debug_page.html")
-            
-            await context.close()
-            await browser.close()
-            return content
+        content = await page.content()
+        if self.session is not None and not looks_blocked(200, content):
+            # This context is past the bot check; let plain HTTP reuse its cookies
+            self.session.adopt(await page.context.cookies())
+        await self.artifacts.capture(url, "sample", page, content, failed=False)
+        return content
 
     async def extract_json(self, page_content: str):
-        soup = BeautifulSoup(page_content, "html.parser")
-        if "Access Denied" in page_content or "captcha" in page_content.lower():
+        if "Access Denied" in page_content or _CAPTCHA.search(page_content):
             raise ValueError("StockX is blocking the request.")
-        tag = soup.find("script", id="__NEXT_DATA__")
-        if tag and tag.string and tag.string.strip():
-            try:
-                return json.loads(tag.string)
-            except json.JSONDecodeError as e:
-                print(f"⚠️ __NEXT_DATA__ JSON error: {e}")
-
-        # Fallback: scan scripts for window.__NEXT_DATA__
-        for script in soup.find_all("script"):
-            if script.string and "window.__NEXT_DATA__" in script.string:
-                match = re.search(r'window\.__NEXT_DATA__\s*=\s*(\{.*?\});', script.string, re.DOTALL)
-                if match:
-                    candidate = match.group(1)
-                    try:
-                        return json.loads(candidate)
-                    except json.JSONDecodeError:
-                        pass
-
-        # Fallback: look for GetProduct JSON fragments (narrow, non-greedy)
-        for script in soup.find_all("script"):
-            if script.string and "GetProduct" in script.string:
-                # Try to isolate outer JSON starting at first '{' up to last balanced '}'
-                raw = script.string
-                start = raw.find('{')
-                if start != -1:
-                    for end in range(len(raw), start, -1):
-                        snippet = raw[start:end]
-                        if snippet.count('{') == snippet.count('}'):
-                            try:
-                                return json.loads(snippet)
-                            except json.JSONDecodeError:
-                                continue
-
-        raise ValueError("Could not extract product JSON.")
+        data = extract_next_data(page_content)
+        if data is None:
+            raise ValueError("Could not extract product JSON.")
+        return data
 
     def find_product_query(self, queries: list) -> dict:
         """Find the GetProduct query in the React Query cache"""
@@ -194,8 +245,12 @@ class StockXScraper:
     async def scrape(self, url: str):
         """Main scraping method"""
         page_content = await self.fetch_page(url)
-        data = await self.extract_json(page_content)
-        product_info = await self.parse_product(data)
+        try:
+            data = await self.extract_json(page_content)
+            product_info = await self.parse_product(data)
+        except ValueError:
+            await self.artifacts.capture(url, "unparsed", html=page_content)
+            raise
         return product_info
 
 
@@ -216,7 +271,4 @@ async def main():
         
     except Exception as e:
         print(f"\n❌ Error: {e}")
-        print("\n💡 Debug files created:")
-        print("   - debug_page.html (page HTML)")
-        print("   - error_screenshot.png (what the page looked like)")
-        print("   - blocked.png (if CAPTCHA detected)")
+        print("\n💡 Rerun with DEBUG_ARTIFACTS=failures to save the page HTML and a screenshot")
@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# main.py and the caches read these at import; keep test runs out of the working tree
+_scratch = tempfile.mkdtemp(prefix="flipkit-tests-")
+os.environ.setdefault("FIRST_SEEN_FILE", os.path.join(_scratch, "first_seen.json"))
+os.environ.setdefault("THUMBNAIL_CACHE_DIR", os.path.join(_scratch, "thumbnails"))
+os.environ.setdefault("FETCH_CACHE_DIR", os.path.join(_scratch, "fetch_cache"))
+os.environ.setdefault("CATALOG_BACKEND", "json")
+
+
+class StubServer:
+    """
+    Local HTTP server answering scripted responses.
+
+    `routes[path]` is a list of (status, headers, body) played in order;
+    the last one repeats. Every request is logged in `hits` as
+    (path, monotonic time, request headers).
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.hits = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                stub.hits.append((path, time.monotonic(), dict(self.headers)))
+                script = stub.routes.get(path) or [(404, {}, b"")]
+                status, headers, body = script.pop(0) if len(script) > 1 else script[0]
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.host = f"127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def url(self, path: str) -> str:
+        return f"http://{self.host}{path}"
+
+    def count(self, path: str) -> int:
+        return sum(1 for p, _, _ in self.hits if p == path)
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    yield server
+    server.close()
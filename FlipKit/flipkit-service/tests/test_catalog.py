@@ -0,0 +1,55 @@
+import json
+import os
+
+import pytest
+
+from catalog import CatalogCache, JsonFileSource, iter_json_array
+
+
+def write(tmp_path, text: str) -> str:
+    path = tmp_path / "catalog.json"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("text", [
+    "[12.5]",
+    "[1.5e10]",
+    '[ {"title": "Mug, large", "price": [1, 2.25e-3]}, "x,y]", -0.5, true, null, 1E+2, 7 ]',
+    "[]",
+    " [ ] ",
+])
+def test_iter_json_array_matches_json_loads_at_every_chunk_size(tmp_path, text):
+    path = write(tmp_path, text)
+    for chunk_size in range(1, len(text) + 1):
+        assert list(iter_json_array(path, chunk_size=chunk_size)) == json.loads(text), chunk_size
+
+
+@pytest.mark.parametrize("text", ["[1,,2]", "[1 2]", "[1,]", "[,1]", "[1", "[1,", "[12.]", "[1.5e]", '{"a": 1}', ""])
+def test_iter_json_array_rejects_malformed_arrays(tmp_path, text):
+    path = write(tmp_path, text)
+    for chunk_size in range(1, len(text) + 2):
+        with pytest.raises(ValueError):
+            list(iter_json_array(path, chunk_size=chunk_size))
+
+
+def test_cache_reloads_only_when_the_file_changes(tmp_path):
+    path = write(tmp_path, json.dumps([{"title": "Mug", "price": "$5.00", "link": "https://www.ebay.com/itm/1"}]))
+    cache = CatalogCache()
+    source = JsonFileSource(path)
+
+    first = cache.get("mugs", source)
+    assert cache.get("mugs", source) is first
+    assert (cache.hits, cache.loads) == (1, 1)
+
+    (tmp_path / "catalog.json").write_text(json.dumps([
+        {"title": "Mug", "price": "$5.00", "link": "https://www.ebay.com/itm/1"},
+        {"title": "Bowl", "price": "$7.00", "link": "https://www.ebay.com/itm/2"},
+    ]), encoding="utf-8")
+    os.utime(path, ns=(first.version[0] + 10**9, first.version[0] + 10**9))  # Coarse mtime clocks
+
+    second = cache.get("mugs", source)
+    assert second is not first
+    assert [p["title"] for p in second.products] == ["Mug", "Bowl"]
+    assert cache.loads == 2
+    assert cache.get("mugs", source) is second
@@ -0,0 +1,58 @@
+from catalog import normalize_records
+from dedupe import merge_products
+
+# Two different DHgate listings from products/fashion_acc_products.json whose keyword-stuffed
+# titles differ by one word; the images and prices show they're not the same item
+SUNGLASSES = [
+    {"title": "chrome Sunglasses Cross Sunglasses Luxury Designer Glasses Sunglasses For Women glasses Frames "
+              "Men Fashion Plate Eyeglass 2273",
+     "img": "https://img4.dhresource.com/webp/m/300x300/f3/albu/ys/m/07/9758b2b2-4f4f-4495-95ad-f4995a1ef65d.jpg",
+     "price": "US $6.16 - 19.68 / Piece",
+     "link": "https://www.dhgate.com/product/chrome-sunglasses-cross-sunglasses-luxury/1056526576.html"
+             "?dspm=pcen.sp.list.3.fKJrg9ppopT7vnpHQ1Ik&resource_id=1056526576"},
+    {"title": "Chrome Sunglasses Cross Sunglasses For Women Glasses Frames Men New Fashion Plate Eyeglass Luxury "
+              "Designer Glasses Sunglasses 2273",
+     "img": "https://img4.dhresource.com/webp/m/300x300/f3/albu/ys/z/31/181d28f0-ea13-454e-bddf-83627632eea3.jpg",
+     "price": "US $13.09 - 19.68 / Piece",
+     "link": "https://www.dhgate.com/product/clubmasters-sunglasses-3016-classic-polarized/1065967336.html"
+             "?dspm=pcen.sp.list.14.fKJrg9ppopT7vnpHQ1Ik&resource_id=1065967336"},
+]
+
+
+def merged(records) -> list:
+    return merge_products(normalize_records(records))
+
+
+def test_similar_titles_with_different_image_and_price_stay_apart():
+    assert len(merged(SUNGLASSES)) == 2
+
+
+def test_similar_titles_merge_on_shared_image_or_close_price():
+    same_image = [dict(SUNGLASSES[0]), dict(SUNGLASSES[1], img=SUNGLASSES[0]["img"])]
+    assert len(merged(same_image)) == 1
+
+    close_price = [dict(SUNGLASSES[0], price="US $12.50"), dict(SUNGLASSES[1], price="$13.09")]
+    rows = merged(close_price)
+    assert len(rows) == 1
+    assert [o["priceText"] for o in rows[0]["offers"]] == ["US $12.50", "$13.09"]
+
+
+def test_dedupe_stage_folds_products_like_a_full_merge():
+    from ingest_pipeline import DedupeStage
+
+    # The third listing bridges the first two (image of one, price of the other); the rest fold in
+    records = [SUNGLASSES[0], SUNGLASSES[1],
+               dict(SUNGLASSES[1], img=SUNGLASSES[0]["img"], price="US $13.00", link=SUNGLASSES[1]["link"] + "&x=3"),
+               dict(SUNGLASSES[0], link=SUNGLASSES[0]["link"] + "&hash=2", price="US $11.00"),
+               dict(SUNGLASSES[1], price=None)]
+    products = list(normalize_records(records))
+    stage = DedupeStage()
+    rows = {}
+    for p in products:
+        record, deletes = stage.feed(p)
+        for item_id in deletes:
+            rows.pop(item_id, None)
+        rows[record.item_id] = record.row()
+    assert len(rows) == 1
+    assert sorted(rows.values(), key=lambda r: r["itemId"]) == \
+        sorted(merge_products(products), key=lambda r: r["itemId"])
@@ -0,0 +1,68 @@
+import asyncio
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE = os.path.join(SERVICE_DIR, "dhgate", "fixtures", "listing_page.html")
+
+# What the fixture renders once fully scrolled (see the comment in listing_page.html)
+EXPECTED_PRODUCTS = 108
+
+
+def load_scraper():
+    spec = importlib.util.spec_from_file_location("dhgate_scraper", os.path.join(SERVICE_DIR, "dhgate", "scraper.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def scraper():
+    pytest.importorskip("playwright")
+    return load_scraper()
+
+
+@pytest.fixture(scope="module")
+def chromium(scraper):
+    async def probe():
+        async with scraper.async_playwright() as p:
+            browser = await p.chromium.launch()
+            await browser.close()
+
+    try:
+        asyncio.run(probe())
+    except Exception as e:
+        reason = str(e).splitlines()[0]
+        pytest.skip(f"Chromium can't be launched here (`playwright install --with-deps chromium`): {reason}")
+
+
+def test_incremental_js_parses(scraper, tmp_path):
+    node = shutil.which("node")
+    if node is None:
+        pytest.skip("node not installed")
+    script = tmp_path / "incremental.js"
+    script.write_text(f"const install = {scraper.INCREMENTAL_JS};\n", encoding="utf-8")
+    result = subprocess.run([node, "--check", str(script)], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_crawl_extracts_fixture_listings(scraper, chromium, tmp_path):
+    out = tmp_path / "products.json"
+    saved = asyncio.run(scraper.crawl(f"file://{FIXTURE}", scroll_pause=300, path=str(out), category=None))
+
+    with open(out, encoding="utf-8") as f:
+        products = json.load(f)
+    assert saved == len(products) == EXPECTED_PRODUCTS
+    assert len({scraper.link_key(p["link"]) for p in products}) == EXPECTED_PRODUCTS
+    for p in products:
+        assert p["title"].startswith("Fixture Summer Sandal No.")
+        assert p["price"].startswith("US $")
+        assert p["img"].startswith("https://img4.dhresource.com/")  # Lazy images resolved, no placeholders
+
+    # A second crawl into the same file finds nothing new
+    assert asyncio.run(scraper.crawl(f"file://{FIXTURE}", scroll_pause=300, path=str(out), category=None)) == 0
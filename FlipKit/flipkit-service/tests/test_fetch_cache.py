@@ -0,0 +1,28 @@
+import asyncio
+
+from fetch_cache import FetchCache
+
+
+def test_fetch_async_caches_and_strips_wire_headers(tmp_path):
+    cache = FetchCache(str(tmp_path))
+    calls = []
+
+    async def send(conditional):
+        calls.append(conditional)
+        status = 200 if len(calls) > 1 else 503
+        return status, {"Content-Type": "text/html", "Content-Encoding": "br", "Content-Length": "12"}, b"<html></html>"
+
+    async def run():
+        blocked = await cache.fetch_async("https://example.com/p", send)
+        fetched = await cache.fetch_async("https://example.com/p", send)
+        cached = await cache.fetch_async("https://example.com/p", send)
+        return blocked, fetched, cached
+
+    blocked, fetched, cached = asyncio.run(run())
+
+    assert blocked.status == 503
+    assert blocked.headers == {"content-type": "text/html"}
+    assert fetched.headers == cached.headers == {"content-type": "text/html"}
+    assert cached.body == b"<html></html>"
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
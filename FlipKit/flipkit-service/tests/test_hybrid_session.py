@@ -0,0 +1,93 @@
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import pytest
+
+pytest.importorskip("playwright")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "stockx", "scraper"))
+
+from debug_artifacts import ArtifactRecorder  # noqa: E402
+from scraper import StockXScraper  # noqa: E402
+
+BROWSER_HTML = "<html><title>Product</title>rendered by the browser</html>"
+
+
+class FakeContext:
+    def __init__(self, host: str):
+        self.host = host
+
+    async def cookies(self):
+        return [{"name": "_px3", "value": "solved", "domain": self.host, "path": "/"}]
+
+
+class FakePage:
+    """Just enough of a Playwright page for StockXScraper._load_page"""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.context = browser.context
+
+    async def goto(self, url, **kwargs):
+        self.browser.loads.append(url)
+        return type("Response", (), {"status": 200, "headers": {}})()
+
+    async def wait_for_timeout(self, ms):
+        pass
+
+    async def title(self):
+        return "Product"
+
+    async def wait_for_selector(self, selector, timeout=None):
+        pass
+
+    def is_closed(self):
+        return False
+
+    async def content(self):
+        return BROWSER_HTML
+
+
+class FakePool:
+    def __init__(self, host: str):
+        self.context = FakeContext(host)
+        self.loads = []
+
+    @asynccontextmanager
+    async def page(self):
+        yield FakePage(self)
+
+
+def test_direct_fetches_reuse_browser_cookies_until_blocked(stub_server):
+    stub_server.routes["/p/b"] = [(200, {"Content-Type": "text/html"}, b"<html>direct copy</html>")]
+    stub_server.routes["/p/c"] = [(200, {"Content-Type": "text/html"}, b"<html>Access Denied</html>")]
+    host = stub_server.host.split(":")[0]
+
+    async def run():
+        scraper = StockXScraper(hybrid=True, block_resources=False, artifacts=ArtifactRecorder("off"))
+        scraper.pool = browser = FakePool(host)
+        try:
+            # No session yet: the browser loads the page and hands its cookies over
+            assert await scraper.fetch_page(stub_server.url("/p/a")) == BROWSER_HTML
+            assert scraper.session.ready
+
+            # Past the bot check: fetched directly with the browser's cookies and user agent
+            assert await scraper.fetch_page(stub_server.url("/p/b")) == "<html>direct copy</html>"
+            assert browser.loads == [stub_server.url("/p/a")]
+
+            # A block page drops the session and falls back to the browser, which re-adopts
+            assert await scraper.fetch_page(stub_server.url("/p/c")) == BROWSER_HTML
+            assert browser.loads == [stub_server.url("/p/a"), stub_server.url("/p/c")]
+            return scraper.session.stats()
+        finally:
+            await scraper.session.aclose()
+
+    stats = asyncio.run(run())
+    assert stats == {"direct": 1, "fallbacks": 1, "adoptions": 2}
+
+    direct = [headers for path, _, headers in stub_server.hits if path == "/p/b"]
+    assert len(direct) == 1
+    assert "_px3=solved" in direct[0].get("Cookie", "")
+    assert direct[0]["User-Agent"].startswith("Mozilla/5.0")
+    assert stub_server.count("/p/a") == 0  # Only the fake browser saw it
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from catalog_store import CatalogStore, ingest
+from ingest_pipeline import IngestPipeline, scraper_pipeline
+
+
+def record(n: int, query: str = "") -> dict:
+    return {"title": f"Ceramic Coffee Mug Model {n} Large", "price": f"${n}.00",
+            "link": f"https://www.ebay.com/itm/{1000 + n}{query}", "img": f"https://i.ebayimg.com/{n}.jpg"}
+
+
+def titles(db_path: str, category: str = "mugs") -> list:
+    store = CatalogStore(db_path)
+    try:
+        return [p["title"] for p in store.iter_category(category)]
+    finally:
+        store.close()
+
+
+async def feed(pipeline: IngestPipeline, records) -> dict:
+    async with pipeline:
+        for r in records:
+            await pipeline.put(r)
+    return pipeline.stats()
+
+
+def test_replace_across_batches_orders_and_prunes(tmp_path):
+    db = str(tmp_path / "catalog.db")
+    CatalogStore(db).upsert_products("mugs", [record(2), record(9), record(1)])
+
+    # Batches of two, with a relisting of mug 1 in a later batch
+    records = [record(1), record(2), record(3), record(4), record(1, "?hash=x")]
+    stats = asyncio.run(feed(IngestPipeline("mugs", db_path=db, batch_size=2, queue_size=1, replace=True), records))
+
+    assert stats["dedupe"]["merged"] == 4
+    assert titles(db) == [f"Ceramic Coffee Mug Model {n} Large" for n in (1, 2, 3, 4)]
+
+
+def test_scrapers_never_create_the_store(tmp_path):
+    db = str(tmp_path / "catalog.db")
+    assert scraper_pipeline("mugs", "ebay", db_path=db) is None
+    assert scraper_pipeline(None, "ebay", db_path=db) is None
+    assert ingest("mugs", [record(1)], "ebay", db_path=db) == 0
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(feed(IngestPipeline("mugs", db_path=db), [record(1)]))
+    assert not (tmp_path / "catalog.db").exists()
+
+
+def test_scraper_pipeline_appends_to_existing_store(tmp_path):
+    db = str(tmp_path / "catalog.db")
+    CatalogStore(db).upsert_products("mugs", [record(1)])
+
+    stats = asyncio.run(feed(scraper_pipeline("mugs", "ebay", db_path=db), [record(2), record(1, "?x=1")]))
+
+    assert stats["dedupe"]["merged"] == 2
+    assert titles(db) == [f"Ceramic Coffee Mug Model {n} Large" for n in (1, 2)]
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from catalog import CatalogCache
+
+NDJSON = {"Accept": "application/x-ndjson"}
+
+# Two marketplaces listing the same sandal, one relisted with a tracking query, plus an unrelated product
+RECORDS = [
+    {"title": "Womens Summer Beach Flat Sandals Size 8", "price": "US $12.90",
+     "link": "https://www.dhgate.com/product/sandal/900001.html?dspm=a", "img": "https://img.dhresource.com/1.jpg"},
+    {"title": "Womens Summer Beach Flat Sandals Size 8", "price": "US $11.50",
+     "link": "https://www.dhgate.com/product/sandal/900001.html?dspm=b", "img": "https://img.dhresource.com/1.jpg"},
+    {"title": "Summer Beach Flat Sandals Womens Size 8", "price": "$14.00",
+     "link": "https://www.ebay.com/itm/sandals-for-women/2234567890", "img": "https://i.ebayimg.com/1.jpg"},
+    {"title": "Stainless Steel Pet Water Bowl", "price": "$6.00",
+     "link": "https://www.ebay.com/itm/3345678901", "img": "https://i.ebayimg.com/2.jpg"},
+]
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    path = tmp_path / "dupes.json"
+    path.write_text(json.dumps(RECORDS), encoding="utf-8")
+    monkeypatch.setitem(main.CATEGORY_FILES, "dupes", str(path))
+    monkeypatch.setattr(main, "catalog_cache", CatalogCache())
+    monkeypatch.setattr(main, "CATALOG_DEDUPE", True)
+    return TestClient(main.app)
+
+
+def streamed(response):
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_stream_matches_listing_with_offers(client):
+    listed = client.get("/products/dupes").json()["products"]
+    assert len(listed) == 2
+    offers = {o["url"] for o in listed[0]["offers"]}
+    assert len(offers) == 2 and {o["priceText"] for o in listed[0]["offers"]} == {"US $11.50", "$14.00"}
+
+    assert streamed(client.get("/products/dupes/stream")) == listed
+    assert streamed(client.get("/products/dupes", headers=NDJSON)) == listed
+
+
+def test_merged_category_stream_matches_listing(client):
+    listed = client.get("/products/merged").json()["products"]
+    assert streamed(client.get("/products/merged/stream")) == listed
+    assert all(p["offers"] for p in listed)
+
+
+def test_stream_reuses_cached_merge(client, monkeypatch):
+    client.get("/products/dupes")
+    loads = main.catalog_cache.loads
+    merges = []
+    monkeypatch.setattr(main.MergedSource, "load", lambda self: merges.append(self) or [])
+
+    for _ in range(3):
+        streamed(client.get("/products/dupes/stream"))
+    assert main.catalog_cache.loads == loads and merges == []
@@ -0,0 +1,29 @@
+import pytest
+
+from pricing import ParsedPrice, build_price_index, parse_price
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("$12.99", ParsedPrice(12.99, 12.99, "USD")),
+    ("US $3.20 - $5.10", ParsedPrice(3.2, 5.1, "USD")),
+    ("US $9.60 - 18.48 / Piece", ParsedPrice(9.6, 18.48, "USD")),
+    ("NGN 4,500", ParsedPrice(4500.0, 4500.0, "NGN")),
+    ("£20 - £10", ParsedPrice(20.0, 20.0, "GBP")),
+    ("\nUS $7.42\nUS $12.80", ParsedPrice(7.42, 7.42, "USD")),  # DHgate sale price over the original
+    ("Price unavailable", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_price(text, expected):
+    assert parse_price(text) == expected
+
+
+def test_price_index_range_is_inclusive_and_skips_unparsed():
+    products = [{"itemId": str(i), "priceMin": price} for i, price in enumerate([5.0, None, 1.0, 3.0, 3.0, 8.0])]
+    index = build_price_index(products)
+
+    assert [p["priceMin"] for p in index.range(3.0, 5.0)] == [3.0, 3.0, 5.0]
+    assert [p["priceMin"] for p in index.range(min_price=4.0)] == [5.0, 8.0]
+    assert [p["priceMin"] for p in index.range(max_price=0.5)] == []
+    assert [p["itemId"] for p in index.unparsed] == ["1"]
+    assert index.ascending()[-1]["itemId"] == index.descending()[-1]["itemId"] == "1"
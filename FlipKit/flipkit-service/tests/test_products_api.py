@@ -0,0 +1,76 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from catalog import CatalogCache
+
+RECORDS = [
+    {"title": f"Ceramic Coffee Mug Model {n}", "price": f"${n}.00",
+     "link": f"https://www.ebay.com/itm/{1000 + n}", "img": f"https://i.ebayimg.com/{n}.jpg"}
+    for n in range(1, 6)
+]
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    path = tmp_path / "mugs.json"
+    path.write_text(json.dumps(RECORDS), encoding="utf-8")
+    monkeypatch.setitem(main.CATEGORY_FILES, "mugs", str(path))
+    monkeypatch.setattr(main, "catalog_cache", CatalogCache())
+    return TestClient(main.app)
+
+
+def test_matching_etag_gets_304_per_query(client):
+    first = client.get("/products/mugs?limit=2", headers={"Accept-Encoding": "identity"})
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = client.get("/products/mugs?limit=2", headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+
+    # A gzip client revalidates with the suffixed tag of the same version
+    gzipped = client.get("/products/mugs?limit=2", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["etag"] != etag
+    revalidated = client.get("/products/mugs?limit=2",
+                             headers={"If-None-Match": gzipped.headers["etag"], "Accept-Encoding": "gzip"})
+    assert revalidated.status_code == 304
+
+    other = client.get("/products/mugs?limit=3", headers={"If-None-Match": etag})
+    assert other.status_code == 200 and len(other.json()["products"]) == 3
+
+
+def test_invalid_query_is_rejected_before_revalidation(client):
+    for query in ("sort=colour", "fields=nope", "cursor=garbage", "min_price=5&max_price=1"):
+        response = client.get(f"/products/mugs?{query}", headers={"If-None-Match": "*"})
+        assert response.status_code == 400, query
+
+
+def test_response_bodies_are_built_once_per_query_and_version(client, monkeypatch):
+    builds = []
+    list_products = main.list_products
+    monkeypatch.setattr(main, "list_products", lambda *args: builds.append(args) or list_products(*args))
+
+    plain = client.get("/products/mugs?sort=-price&limit=2", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/products/mugs?limit=2&sort=-price", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.json() == plain.json()  # Decoded by the client
+    assert [p["priceMin"] for p in plain.json()["products"]] == [5.0, 4.0]
+    assert len(builds) == 1
+
+    client.get("/products/mugs?sort=price&limit=2")
+    assert len(builds) == 2
+
+
+def test_stream_reads_the_file_without_loading_the_catalog(client, monkeypatch):
+    monkeypatch.setattr(main, "CATALOG_DEDUPE", False)
+    reads = []
+    iter_products = main.JsonFileSource.iter_products
+    monkeypatch.setattr(main.JsonFileSource, "iter_products", lambda self: reads.append(self) or iter_products(self))
+
+    response = client.get("/products/mugs/stream")
+    assert response.status_code == 200
+    assert [json.loads(line)["title"] for line in response.text.splitlines()] == [r["title"] for r in RECORDS]
+    assert len(reads) == 1 and main.catalog_cache.loads == 0
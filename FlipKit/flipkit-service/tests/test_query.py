@@ -0,0 +1,33 @@
+import pytest
+
+from query import decode_cursor, encode_cursor, paginate
+
+PRODUCTS = [{"itemId": str(n), "title": f"Product {n}", "priceMin": float(n)} for n in range(7)]
+
+
+def test_cursor_pages_cover_the_list_once():
+    seen, cursor = [], None
+    while True:
+        page = paginate(PRODUCTS, 3, cursor=cursor, sort="price")
+        assert page["total"] == 7
+        seen += [p["itemId"] for p in page["products"]]
+        cursor = page["nextCursor"]
+        if cursor is None:
+            break
+    assert seen == [p["itemId"] for p in PRODUCTS]
+
+
+def test_projection_and_unbounded_page():
+    page = paginate(PRODUCTS, None, offset=5, fields=["itemId"])
+    assert page == {"products": [{"itemId": "5"}, {"itemId": "6"}], "total": 7, "nextCursor": None}
+
+
+def test_cursor_is_bound_to_its_sort():
+    cursor = encode_cursor(3, "-price")
+    assert decode_cursor(cursor, "-price") == 3
+    with pytest.raises(ValueError, match="different sort"):
+        decode_cursor(cursor, "title")
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor("not-a-cursor", None)
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(encode_cursor(-1, None), None)
@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+import pytest
+
+import rate_limit
+from rate_limit import HostRateLimiter, request_with_backoff, request_with_backoff_async
+
+
+def host_rate(limiter: HostRateLimiter, server) -> float:
+    return limiter.stats()[server.host]["rate"]
+
+
+def test_retry_after_pauses_host_and_halves_rate(stub_server):
+    stub_server.routes["/item"] = [(429, {"Retry-After": "1"}, b"slow down"), (200, {}, b"ok")]
+    limiter = HostRateLimiter(rate=8.0, burst=8.0)
+    url = stub_server.url("/item")
+
+    response = request_with_backoff(url, lambda: httpx.get(url), limiter=limiter)
+
+    assert response.status_code == 200
+    (_, first, _), (_, second, _) = stub_server.hits
+    assert second - first >= 0.95  # Waited out Retry-After before retrying
+    assert host_rate(limiter, stub_server) == 4.0 + limiter.increase
+
+
+def test_error_burst_halves_once_then_recovers(stub_server, monkeypatch):
+    monkeypatch.setattr(rate_limit, "backoff_delay", lambda *args, **kwargs: 0.0)
+    stub_server.routes["/flaky"] = [(500, {}, b"")] * 6 + [(200, {}, b"ok")]
+    limiter = HostRateLimiter(rate=8.0, burst=100.0, increase=1.0, cooldown=60.0)
+    url = stub_server.url("/flaky")
+
+    statuses = [request_with_backoff(url, lambda: httpx.get(url), limiter=limiter, retries=1).status_code
+                for _ in range(6)]
+    assert statuses == [500] * 6
+    assert host_rate(limiter, stub_server) == 4.0  # One halving for the whole burst
+
+    # Successes only ever raise the rate, even while errors are still in the window
+    request_with_backoff(url, lambda: httpx.get(url), limiter=limiter, retries=1)
+    assert host_rate(limiter, stub_server) == 5.0
+    for _ in range(10):
+        request_with_backoff(url, lambda: httpx.get(url), limiter=limiter, retries=1)
+    assert host_rate(limiter, stub_server) == limiter.max_rate
+
+
+def test_concurrent_throttles_halve_once():
+    limiter = HostRateLimiter(rate=8.0, cooldown=60.0)
+    for _ in range(3):
+        limiter.record("https://example.com/a", 429, retry_after=0)
+    assert limiter.stats()["example.com"]["rate"] == 4.0
+
+
+def test_retries_below_one_is_rejected():
+    sent = []
+    for retries in (0, -1):
+        with pytest.raises(ValueError, match="retries"):
+            request_with_backoff("https://example.com/", lambda: sent.append(1), retries=retries)
+        with pytest.raises(ValueError, match="retries"):
+            asyncio.run(request_with_backoff_async("https://example.com/", lambda: sent.append(1), retries=retries))
+    assert sent == []
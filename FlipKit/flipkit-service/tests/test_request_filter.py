@@ -0,0 +1,70 @@
+import asyncio
+
+from request_filter import TYPICAL_BYTES, RequestFilter
+
+
+class FakePage:
+    pass
+
+
+class FakeRequest:
+    def __init__(self, page, url: str, resource_type: str):
+        self.frame = type("Frame", (), {"page": page})()
+        self.url = url
+        self.resource_type = resource_type
+
+
+class FakeRoute:
+    def __init__(self):
+        self.outcome = None
+
+    async def abort(self, reason):
+        self.outcome = "aborted"
+
+    async def fallback(self):
+        self.outcome = "continued"
+
+
+class FakeResponse:
+    def __init__(self, request, length: int):
+        self.request = request
+        self.headers = {"content-length": str(length)}
+
+
+class FakeContext:
+    async def route(self, pattern, handler):
+        self.handler = handler
+
+    def on(self, event, callback):
+        self.on_response = callback
+
+    def request(self, page, url, resource_type, length=0):
+        request = FakeRequest(page, url, resource_type)
+        route = FakeRoute()
+        asyncio.run(self.handler(route, request))
+        if route.outcome == "continued":
+            self.on_response(FakeResponse(request, length))
+        return route.outcome
+
+
+def test_blocks_and_tracks_pages_until_reported():
+    context = FakeContext()
+    request_filter = RequestFilter()
+    asyncio.run(request_filter.install(context))
+    page, other = FakePage(), FakePage()
+    request_filter.track(page)
+
+    assert context.request(page, "https://stockx.com/p", "document", 1000) == "continued"
+    assert context.request(page, "https://images.stockx.com/p.jpg", "image") == "aborted"
+    assert context.request(page, "https://www.google-analytics.com/collect", "script") == "aborted"
+    assert context.request(other, "https://stockx.com/q", "document", 500) == "continued"  # Untracked page
+
+    stats = request_filter.page_stats(page)
+    assert (stats.allowed, stats.blocked, stats.bytes_downloaded) == (1, 2, 1000)
+    assert stats.estimated_bytes_saved == TYPICAL_BYTES["image"] + TYPICAL_BYTES["script"]
+
+    # Late events for a reported page count toward the total without re-tracking it
+    context.request(page, "https://stockx.com/late", "xhr", 200)
+    assert request_filter._pages == {}
+    total = request_filter.stats()
+    assert (total["allowedRequests"], total["blockedRequests"], total["bytesDownloaded"]) == (3, 2, 1700)
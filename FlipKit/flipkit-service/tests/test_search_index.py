@@ -0,0 +1,36 @@
+from search_index import build_shard, search
+
+PRODUCTS = [
+    {"title": "Leather Wallet"},
+    {"title": "Leather Wallet Card Holder Slim Minimalist Front Pocket"},
+    {"title": "Canvas Wallet"},
+    {"title": "Leather Belt"},
+    {"title": "Wallpaper Roll"},
+]
+
+
+def titles(result) -> list:
+    return [r["title"] for r in result["results"]]
+
+
+def test_bm25_prefers_short_titles_and_requires_every_token():
+    result = search({"fashion": build_shard(PRODUCTS)}, "leather wallet")
+    assert titles(result) == ["Leather Wallet", "Leather Wallet Card Holder Slim Minimalist Front Pocket"]
+    assert result["results"][0]["score"] > result["results"][1]["score"]
+    assert result["results"][0]["category"] == "fashion"
+
+
+def test_last_token_matches_as_prefix_below_exact_matches():
+    shard = build_shard(PRODUCTS)
+    assert set(titles(search({"fashion": shard}, "wall"))) == {p["title"] for p in PRODUCTS if "Wall" in p["title"]}
+    scores = shard.score(["wallet"])
+    assert set(scores) == {0, 1, 2}
+    assert shard.score(["wallpaper"])[4] > shard.score(["wallp"])[4]
+    assert shard.score(["leather", "missing"]) == {}
+
+
+def test_results_merge_across_shards_by_score():
+    shards = {"fashion": build_shard(PRODUCTS), "pets": build_shard([{"title": "Dog Leather Wallet Collar Tag"}])}
+    result = search(shards, "wallet", limit=2)
+    assert result["total"] == 4
+    assert titles(result) == ["Leather Wallet", "Canvas Wallet"]
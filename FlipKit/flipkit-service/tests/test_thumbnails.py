@@ -0,0 +1,78 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+from rate_limit import DEFAULT_LIMITER
+from thumbnails import DEFAULT_WIDTH, DiskLRU, ThumbnailService, snap_width
+
+
+def jpeg(width: int = 800, height: int = 600) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 40)).save(out, format="JPEG")
+    return out.getvalue()
+
+
+@pytest.fixture
+def proxy(stub_server, tmp_path, monkeypatch):
+    stub_server.routes["/shoe.jpg"] = [(200, {"Content-Type": "image/jpeg"}, jpeg())]
+    stub_server.routes["/page.html"] = [(200, {"Content-Type": "text/html"}, b"<html>not an image</html>")]
+    service = ThumbnailService(DiskLRU(str(tmp_path / "thumbs")), hosts=(stub_server.host,))
+    monkeypatch.setattr(main, "thumbnails", service)
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_disallowed_host_is_refused(proxy, stub_server):
+    response = proxy.get("/image", params={"url": "http://169.254.169.254/latest/meta-data"})
+    assert response.status_code == 403
+    assert stub_server.hits == []
+
+
+def test_disallowed_host_is_refused_even_when_revalidating(proxy):
+    url = "http://169.254.169.254/latest/meta-data"
+    etag = ThumbnailService.key(url, snap_width(DEFAULT_WIDTH), "jpeg")
+    response = proxy.get("/image", params={"url": url, "format": "jpeg"}, headers={"If-None-Match": f'"{etag}"'})
+    assert response.status_code == 403
+
+
+def test_non_image_is_refused(proxy, stub_server):
+    response = proxy.get("/image", params={"url": stub_server.url("/page.html")})
+    assert response.status_code == 415
+
+
+def test_thumbnail_cached_and_revalidated(proxy, stub_server):
+    url = stub_server.url("/shoe.jpg")
+    response = proxy.get("/image", params={"url": url, "w": 300, "format": "jpeg"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert Image.open(io.BytesIO(response.content)).width == 320  # Snapped up to a rendered width
+
+    etag = response.headers["etag"]
+    again = proxy.get("/image", params={"url": url, "w": 300, "format": "jpeg"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+
+    # Other widths are rendered from the cached original
+    assert proxy.get("/image", params={"url": url, "w": 640, "format": "jpeg"}).status_code == 200
+    assert stub_server.count("/shoe.jpg") == 1
+    # Visitors' fetches don't use up the scrapers' per-host budget
+    assert stub_server.host not in DEFAULT_LIMITER.stats()
+
+
+def test_disk_lru_evicts_least_recently_used(tmp_path):
+    cache = DiskLRU(str(tmp_path), max_bytes=250)
+    cache.put("a", b"a" * 100)
+    cache.put("b", b"b" * 100)
+    assert cache.get("a") == b"a" * 100  # Now more recent than b
+    cache.put("c", b"c" * 100)
+
+    assert cache.get("b") is None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a", "c"]
+    assert cache.stats()["evictions"] == 1 and cache.stats()["bytes"] == 200
+
+    # Recency survives a restart: b's slot went to c, and a is still the next to go
+    reopened = DiskLRU(str(tmp_path), max_bytes=250)
+    reopened.put("d", b"d" * 100)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["c", "d"]
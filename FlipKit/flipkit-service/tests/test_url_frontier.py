@@ -0,0 +1,67 @@
+import asyncio
+
+from url_frontier import DONE, FAILED, IN_PROGRESS, PENDING, UrlFrontier
+
+
+def test_claim_done_and_dedupe(tmp_path):
+    frontier = UrlFrontier(str(tmp_path / "frontier.db"))
+    assert frontier.add(["https://stockx.com/a", "https://stockx.com/b/", "https://stockx.com/a#reviews"]) == 2
+    assert frontier.runnable() == ["https://stockx.com/a", "https://stockx.com/b"]
+
+    frontier.start("https://stockx.com/a")
+    assert frontier.runnable() == ["https://stockx.com/b"]  # Claimed URLs aren't handed out twice
+    frontier.done("https://stockx.com/a", "p-1")
+
+    assert frontier.add(["https://stockx.com/a"]) == 0
+    assert frontier.runnable() == ["https://stockx.com/b"]
+    assert frontier.stats()[DONE] == 1
+    frontier.close()
+
+
+def test_failures_retry_until_exhausted(tmp_path):
+    frontier = UrlFrontier(str(tmp_path / "frontier.db"), max_attempts=2)
+    frontier.add(["https://stockx.com/a"])
+
+    for attempt in range(2):
+        assert frontier.runnable() == ["https://stockx.com/a"]
+        frontier.start("https://stockx.com/a")
+        frontier.failed("https://stockx.com/a", f"timeout {attempt}")
+
+    assert frontier.runnable() == []
+    assert frontier.stats()["exhausted"] == 1
+    assert frontier.failures() == [{"url": "https://stockx.com/a", "attempts": 2, "lastError": "timeout 1"}]
+
+    assert frontier.retry_failed() == 1
+    assert frontier.runnable() == ["https://stockx.com/a"]
+    frontier.close()
+
+
+def test_reopening_resumes_interrupted_urls(tmp_path):
+    path = str(tmp_path / "frontier.db")
+    frontier = UrlFrontier(path)
+    frontier.add(["https://stockx.com/a", "https://stockx.com/b", "https://stockx.com/c"])
+    frontier.start("https://stockx.com/a")
+    frontier.done("https://stockx.com/a")
+    frontier.start("https://stockx.com/b")
+    frontier.close()  # Crash with b still in progress
+
+    frontier = UrlFrontier(path)
+    stats = frontier.stats()
+    assert (stats[DONE], stats[IN_PROGRESS], stats[PENDING], stats[FAILED]) == (1, 0, 2, 0)
+    assert frontier.runnable() == ["https://stockx.com/b", "https://stockx.com/c"]
+    frontier.close()
+
+
+def test_usable_from_worker_threads(tmp_path):
+    frontier = UrlFrontier(str(tmp_path / "frontier.db"))
+    urls = [f"https://stockx.com/p{n}" for n in range(20)]
+
+    async def crawl():
+        await asyncio.to_thread(frontier.add, urls)
+        queued = await asyncio.to_thread(frontier.runnable)
+        await asyncio.gather(*(asyncio.to_thread(frontier.start, url) for url in queued))
+        await asyncio.gather(*(asyncio.to_thread(frontier.done, url, url[-3:]) for url in queued))
+        return await asyncio.to_thread(frontier.stats)
+
+    assert asyncio.run(crawl())[DONE] == 20
+    frontier.close()
@@ -0,0 +1,288 @@
+import asyncio
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import httpx  # type: ignore
+from PIL import Image, ImageOps, features  # type: ignore
+
+from rate_limit import HostRateLimiter, request_with_backoff_async
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DIR = os.getenv("THUMBNAIL_CACHE_DIR", os.path.join(BASE_DIR, ".thumbnail_cache"))
+DEFAULT_MAX_BYTES = int(float(os.getenv("THUMBNAIL_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+# Widths thumbnails are rendered at; a requested width is rounded up to one of these
+WIDTHS = (160, 320, 640)
+DEFAULT_WIDTH = 320
+
+QUALITY = {"webp": 80, "jpeg": 82}
+MEDIA_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+# Image CDNs the scrapers link to. Only these hosts (or their subdomains) are
+# fetched, so the endpoint can't be pointed at internal addresses. Set
+# THUMBNAIL_HOSTS to a comma-separated list to replace it, e.g.
+# "127.0.0.1:8765" for a local stub server.
+DEFAULT_HOSTS = ("ebayimg.com", "ebaystatic.com", "dhresource.com", "stockx.com", "stockx.imgix.net")
+
+# Upstream images larger than this, or with more pixels, are refused
+MAX_SOURCE_BYTES = int(float(os.getenv("THUMBNAIL_MAX_SOURCE_MB", "20")) * 1024 * 1024)
+MAX_PIXELS = 40_000_000
+MAX_REDIRECTS = 3
+
+# Upstream fetches per second per image host. A visitor is waiting on each
+# one, so the proxy has its own limiter instead of sharing the scrapers'.
+UPSTREAM_RATE = float(os.getenv("THUMBNAIL_UPSTREAM_RATE", "20"))
+UPSTREAM_BURST = float(os.getenv("THUMBNAIL_UPSTREAM_BURST", "40"))
+
+# Served thumbnails never change for a given URL, width and format
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class ThumbnailError(Exception):
+    """A thumbnail that can't be served; `status` is the HTTP status to answer with"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def allowed_hosts() -> Tuple[str, ...]:
+    configured = os.getenv("THUMBNAIL_HOSTS")
+    if configured:
+        return tuple(h.strip().lower() for h in configured.split(",") if h.strip())
+    return DEFAULT_HOSTS
+
+
+def check_url(url: str, hosts: Tuple[str, ...]) -> str:
+    """Raise ThumbnailError unless `url` is a plain http(s) URL on an allowed host"""
+    parts = urlsplit(url.strip())
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ThumbnailError(400, "Image URL must be an absolute http(s) URL")
+    if parts.username or parts.password:
+        raise ThumbnailError(400, "Image URL must not carry credentials")
+    host = parts.hostname.lower()
+    netloc = f"{host}:{parts.port}" if parts.port else host
+    for allowed in hosts:
+        if netloc == allowed or host == allowed or host.endswith("." + allowed):
+            return url.strip()
+    raise ThumbnailError(403, f"Images from {host} are not proxied")
+
+
+def snap_width(width: int) -> int:
+    for w in WIDTHS:
+        if width <= w:
+            return w
+    return WIDTHS[-1]
+
+
+def choose_format(accept: Optional[str]) -> str:
+    if "image/webp" in (accept or "") and features.check("webp"):
+        return "webp"
+    return "jpeg"
+
+
+def render_thumbnail(data: bytes, width: int, fmt: str) -> bytes:
+    """Resize an encoded image to `width` (never upscaling) and re-encode it as `fmt`"""
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if img.width * img.height > MAX_PIXELS:
+                raise ThumbnailError(413, "Upstream image is too large")
+            # Let the JPEG decoder skip straight to a nearby scale
+            img.draft("RGB", (width, width * 4))
+            img = ImageOps.exif_transpose(img)
+            if img.width > width:
+                img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+            if fmt == "jpeg" and img.mode != "RGB":
+                rgba = img.convert("RGBA")
+                img = Image.new("RGB", rgba.size, (255, 255, 255))
+                img.paste(rgba, mask=rgba.getchannel("A"))
+            elif img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+            out = io.BytesIO()
+            img.save(out, format=fmt.upper(), quality=QUALITY[fmt], optimize=fmt == "jpeg", method=4)
+            return out.getvalue()
+    except ThumbnailError:
+        raise
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ThumbnailError(415, f"Upstream file is not a usable image: {e}")
+
+
+class DiskLRU:
+    """
+    Files in one directory, capped at `max_bytes` by evicting the least
+    recently used. Recency is the file's mtime, so it survives restarts.
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        found = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                st = entry.stat()
+                found.append((st.st_mtime, entry.name, st.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self.total += size
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            if name not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(name)
+            self.hits += 1
+        try:
+            with open(self._path(name), "rb") as f:
+                data = f.read()
+            os.utime(self._path(name))
+            return data
+        except FileNotFoundError:
+            with self._lock:
+                self.total -= self._entries.pop(name, 0)
+            return None
+
+    def put(self, name: str, data: bytes) -> None:
+        tmp = self._path(f"{name}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._path(name))
+        with self._lock:
+            self.total += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            while self.total > self.max_bytes and len(self._entries) > 1:
+                victim, size = self._entries.popitem(last=False)
+                self.total -= size
+                self.evictions += 1
+                try:
+                    os.remove(self._path(victim))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "files": len(self._entries),
+                "bytes": self.total,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class ThumbnailService:
+    """
+    Fetches a product image once and serves resized copies from disk.
+
+    The original and every rendered (width, format) are kept in a DiskLRU,
+    so repeat views and other widths of a seen image never go upstream.
+    Concurrent requests for the same image wait on one fetch/render.
+    """
+
+    def __init__(self, cache: Optional[DiskLRU] = None, hosts: Optional[Tuple[str, ...]] = None,
+                 timeout: float = 20.0, limiter: Optional[HostRateLimiter] = None):
+        self.cache = cache or DiskLRU()
+        self.hosts = hosts or allowed_hosts()
+        self.timeout = timeout
+        self.limiter = limiter or HostRateLimiter(rate=UPSTREAM_RATE, burst=UPSTREAM_BURST, max_rate=UPSTREAM_RATE)
+        self.fetched = 0
+        self.rendered = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def key(url: str, width: int, fmt: str) -> str:
+        return hashlib.sha1(f"{url}|{width}|{fmt}".encode("utf-8")).hexdigest()
+
+    async def _cached(self, name: str, build) -> bytes:
+        data = await asyncio.to_thread(self.cache.get, name)
+        if data is not None:
+            return data
+        task = self._inflight.get(name)
+        if task is None:
+            task = self._inflight[name] = asyncio.ensure_future(self._build(name, build))
+            task.add_done_callback(lambda _: self._inflight.pop(name, None))
+        # A client hanging up mustn't cancel the build other requests are waiting on
+        return await asyncio.shield(task)
+
+    async def _build(self, name: str, build) -> bytes:
+        data = await build()
+        await asyncio.to_thread(self.cache.put, name, data)
+        return data
+
+    async def thumbnail(self, url: str, width: int = DEFAULT_WIDTH, fmt: str = "jpeg") -> bytes:
+        url = check_url(url, self.hosts)
+        if fmt not in MEDIA_TYPES:
+            raise ThumbnailError(400, f"Unknown format '{fmt}'. Use one of: {', '.join(MEDIA_TYPES)}")
+        width = snap_width(width)
+
+        async def render():
+            original = await self._cached(hashlib.sha1(url.encode("utf-8")).hexdigest() + ".src",
+                                          lambda: self._fetch(url))
+            self.rendered += 1
+            return await asyncio.to_thread(render_thumbnail, original, width, fmt)
+
+        return await self._cached(f"{self.key(url, width, fmt)}.{fmt}", render)
+
+    async def _fetch(self, url: str) -> bytes:
+        """Download the original, re-checking the host on every redirect and capping its size"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, follow_redirects=False,
+                                             headers={"Accept": "image/*"})
+        client = self._client
+        for _ in range(MAX_REDIRECTS + 1):
+            check_url(url, self.hosts)
+            try:
+                request = client.build_request("GET", url)
+                # No retries: a visitor is waiting, and a retried stream would be left open
+                response = await request_with_backoff_async(url, lambda: client.send(request, stream=True),
+                                                            limiter=self.limiter, retries=1)
+            except httpx.HTTPError as e:
+                raise ThumbnailError(502, f"Could not fetch image: {e}")
+            try:
+                if response.is_redirect:
+                    url = urljoin(url, response.headers.get("location", ""))
+                    continue
+                if response.status_code != 200:
+                    raise ThumbnailError(502, f"Upstream answered {response.status_code}")
+                if not response.headers.get("content-type", "image/").startswith("image/"):
+                    raise ThumbnailError(415, "Upstream file is not an image")
+                if int(response.headers.get("content-length") or 0) > MAX_SOURCE_BYTES:
+                    raise ThumbnailError(413, "Upstream image is too large")
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) > MAX_SOURCE_BYTES:
+                        raise ThumbnailError(413, "Upstream image is too large")
+                self.fetched += 1
+                return bytes(body)
+            except httpx.HTTPError as e:
+                raise ThumbnailError(502, f"Could not fetch image: {e}")
+            finally:
+                await response.aclose()
+        raise ThumbnailError(502, "Too many redirects")
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict:
+        return {"fetched": self.fetched, "rendered": self.rendered, "cache": self.cache.stats(),
+                "upstream": self.limiter.stats()}
@@ -0,0 +1,140 @@
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    result_id TEXT,
+    last_scraped_at TEXT,
+    added_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_urls_status ON urls (status, id);
+"""
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec="seconds") + "Z"
+
+
+def canonical_url(url: str) -> str:
+    """Frontier key: whitespace, fragment and trailing slash don't make a URL new"""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+
+class UrlFrontier:
+    """
+    Persistent crawl frontier: every URL with its status, attempts, last
+    error and last successful scrape, in SQLite.
+
+    URLs already `done` are skipped before any fetch. Failures are retried
+    until `max_attempts`. URLs left `in_progress` by an interrupted run go
+    back to `pending` when the frontier is opened, so a restart resumes
+    exactly where the last run stopped. Meant for one crawling process at
+    a time; within it, methods may be called from any thread (e.g. through
+    `asyncio.to_thread`) and are serialized on one connection.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            resumed = self.conn.execute(
+                "UPDATE urls SET status = ?, updated_at = ? WHERE status = ?", (PENDING, _now(), IN_PROGRESS),
+            ).rowcount
+        if resumed:
+            print(f"↩️ Resuming {resumed} URL(s) left in progress by an interrupted run")
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    def add(self, urls: Iterable[str]) -> int:
+        """Queue new URLs; known ones keep their state. Returns how many were new."""
+        now = _now()
+        with self._lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO urls (url, added_at, updated_at) VALUES (?, ?, ?)",
+                ((canonical_url(u), now, now) for u in urls if u.strip()),
+            )
+            return self.conn.total_changes - before
+
+    def runnable(self, limit: Optional[int] = None) -> List[str]:
+        """Pending URLs and retryable failures, oldest first"""
+        sql = "SELECT url FROM urls WHERE status = ? OR (status = ? AND attempts < ?) ORDER BY id"
+        params = [PENDING, FAILED, self.max_attempts]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [row[0] for row in self.conn.execute(sql, params)]
+
+    def start(self, url: str) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE urls SET status = ?, attempts = attempts + 1, updated_at = ? WHERE url = ?",
+                (IN_PROGRESS, _now(), canonical_url(url)),
+            )
+
+    def done(self, url: str, result_id: Optional[str] = None) -> None:
+        now = _now()
+        with self._lock, self.conn:
+            self.conn.execute(
+                """
+                UPDATE urls SET status = ?, last_error = NULL, result_id = ?, last_scraped_at = ?, updated_at = ?
+                WHERE url = ?
+                """,
+                (DONE, result_id, now, now, canonical_url(url)),
+            )
+
+    def failed(self, url: str, error: str) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE urls SET status = ?, last_error = ?, updated_at = ? WHERE url = ?",
+                (FAILED, error[:500], _now(), canonical_url(url)),
+            )
+
+    def retry_failed(self) -> int:
+        """Give exhausted failures a fresh set of attempts"""
+        with self._lock, self.conn:
+            return self.conn.execute(
+                "UPDATE urls SET status = ?, attempts = 0, updated_at = ? WHERE status = ?", (PENDING, _now(), FAILED),
+            ).rowcount
+
+    def stats(self) -> Dict[str, int]:
+        counts = {PENDING: 0, IN_PROGRESS: 0, DONE: 0, FAILED: 0}
+        with self._lock:
+            for status, count in self.conn.execute("SELECT status, COUNT(*) FROM urls GROUP BY status"):
+                counts[status] = count
+            counts["exhausted"] = self.conn.execute(
+                "SELECT COUNT(*) FROM urls WHERE status = ? AND attempts >= ?", (FAILED, self.max_attempts),
+            ).fetchone()[0]
+        return counts
+
+    def failures(self, limit: int = 20) -> List[Dict]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT url, attempts, last_error FROM urls WHERE status = ? ORDER BY updated_at DESC LIMIT ?",
+                (FAILED, limit),
+            )
+            return [{"url": u, "attempts": a, "lastError": e} for u, a, e in rows]